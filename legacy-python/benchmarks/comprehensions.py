@@ -0,0 +1,61 @@
+"""
+Times a list comprehension against a tail-recursive function computing the
+same value, the sum of x * x over the x % 3 == 0 in 0..n, on both backends.
+
+Run from legacy-python/: `python benchmarks/comprehensions.py`. The
+interpreter recurses once per element, so it runs a much smaller n.
+"""
+import os
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.embedding.Module import compile
+
+SOURCE: str = """
+fn comprehension(xs: list[int]) -> int {
+    return sum([x * x for x in xs if x % 3 == 0]);
+}
+
+fn recursive(i: int, n: int, acc: int) -> int {
+    if i >= n { return acc; }
+    if i % 3 == 0 { return recursive(i + 1, n, acc + i * i); }
+    return recursive(i + 1, n, acc);
+}
+"""
+
+# backend -> (n, repetitions)
+RUNS: dict[str, tuple[int, int]] = {
+    "jit": (1_000_000, 20),
+    "interpreter": (500, 50),
+}
+
+
+def timed(function, repetitions: int) -> float:
+    """Mean wall time of a call, in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) / repetitions * 1000
+
+
+def main() -> None:
+    sys.setrecursionlimit(100_000)
+    for backend, (n, repetitions) in RUNS.items():
+        module = compile(SOURCE, backend=backend)
+        # native code takes a buffer of i32 without a copy, the interpreter a list
+        xs = array("i", range(n)) if backend == "jit" else list(range(n))
+
+        expected = module.recursive(0, n, 0)
+        if module.comprehension(xs) != expected:
+            raise AssertionError(f"{backend}: comprehension() returned {module.comprehension(xs)}, recursive() {expected}.")
+
+        comprehension = timed(lambda: module.comprehension(xs), repetitions)
+        recursive = timed(lambda: module.recursive(0, n, 0), repetitions)
+        print(f"{backend}, n = {n:,}: comprehension {comprehension:.1f} ms, recursive {recursive:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,39 @@
 from src.lexer.Lexer import Lexer
 from src.parser.Parser import Parser
-# from src.compiler.Compiler import Compiler
+from src.compiler.Compiler import Compiler
+from src.compiler.Optimizer import Optimizer
+from src.compiler.IncrementalCompiler import IncrementalCompiler
+from src.compiler.ParallelCompiler import ParallelCompiler
+from src.compiler.PerfMap import PerfMap
+from src.compiler.runtime.RuntimeLibrary import register_trap_key
+from src.embedding.NativeFunction import NativeFunction
 from src.ast.Program import Program
 from src.interpreter.Interpreter import Interpreter
+from src.interpreter.Profiler import Profiler
+from src.output.OutputSink import FileSink
 import json
 import time
 
-# from llvmlite import ir
-# import llvmlite.binding as llvm
-from ctypes import CFUNCTYPE, c_int, c_float, c_char_p
+from llvmlite import ir
+import llvmlite.binding as llvm
 
 LEXER_DEBUG: bool = False 
 RUN_CODE = True
-
-with open("tests/printf.line", "r") as f:
+USE_COMPILER: bool = False
+COMPILER_DEBUG: bool = False
+INCREMENTAL: bool = False # cache per-function bitcode in .mylang_cache/
+PARALLEL: bool = False # optimize function partitions on every core
+JIT_THRESHOLD: int | None = None # interpret, then compile functions called this many times
+PROFILE: str | None = None # the interpreter records a profile here, the compiler optimizes with it
+PERF_MAP: bool = False # list JIT-compiled functions in /tmp/perf-<pid>.map for `perf report`
+DEBUG_INFO: bool = False # emit DWARF line tables mapping machine code to .line source lines
+PAR_WORKERS: int | None = None # threads (compiled) or processes (interpreted) of par_map / par_reduce, None for one per core
+PAR_CHUNK_SIZE: int | None = None # elements per par_map / par_reduce task, None for 1/64th of the list
+OUTPUT_POLICY: str | None = None # when printed output is flushed: "line", "size" or "exit" (default: line on a terminal, else size)
+
+SOURCE_PATH: str = "tests/printf.line"
+
+with open(SOURCE_PATH, "r") as f:
     code:str = f.read()
 
 print(f" Source Code: \n {code}")
@@ -43,54 +63,64 @@ with open("debug/ast.json", "w") as f:
 print("Wrote AST To debug/AST.json")
 
 
-if RUN_CODE:
-    interpreter = Interpreter()
+if RUN_CODE and not USE_COMPILER:
+    profiler = Profiler() if PROFILE is not None else None
+    perf_map = PerfMap(source=SOURCE_PATH) if PERF_MAP else None
+    interpreter = Interpreter(jit_threshold=JIT_THRESHOLD, profiler=profiler, output=FileSink(policy=OUTPUT_POLICY), perf_map=perf_map,
+                              par_workers=PAR_WORKERS, par_chunk_size=PAR_CHUNK_SIZE)
     result = interpreter.interpret(program)
     print("Program result:", result)
-
-# compiler: Compiler = Compiler()
-# compiler.compile(node=program)
-
-# module: ir.Module = compiler.module
-# # target architecture
-# module.triple = llvm.get_default_triple()
-
-# if COMPILER_DEBUG:
-#     print("============= COMPILER_DEBUG DEBUG ================= ")
-#     with open("debug/ir.ll", "w") as f:
-#         f.write(str(module))
-#     print("Wrote module To debug/ir.ll")
-
-# if RUN_CODE:
-#     llvm.initialize()
-#     llvm.initialize_native_target()
-#     llvm.initialize_native_asmprinter()
-
-#     try:
-#         llvm_ir_parsed = llvm.parse_assembly(str(module))
-#         llvm_ir_parsed.verify()
-#     except Exception as e:
-#         print(e)
-#         raise
-
-#     target_machine = llvm.Target.from_default_triple().create_target_machine()
-
-#     engine = llvm.create_mcjit_compiler(llvm_ir_parsed, target_machine)
-#     engine.finalize_object()
-
-#     # entry = engine.get_function_address('main') # access point function
-#     # cfunction = CFUNCTYPE(c_int)(entry)
-#     # start_time = time.time()
-#     # result = cfunction() 
-#     # end_time = time.time()
-#     # print(f"\n\n Program Returned : {result} \n === Executed In {round(end_time-start_time*1000, 6)} ms. ===")
-
-#     entry = engine.get_function_address('main')
-#     cfunction = CFUNCTYPE(c_char_p)(entry)
-#     start_time = time.time()
-#     result_ptr = cfunction()
-#     end_time = time.time()
-#     print(result_ptr.decode('utf-8')) 
-
-
-
+    if profiler is not None:
+        profiler.save(PROFILE)
+        print(f"Wrote profile to {PROFILE}")
+
+if USE_COMPILER and INCREMENTAL:
+    incremental: IncrementalCompiler = IncrementalCompiler()
+    llvm_module: llvm.ModuleRef = incremental.compile(program)
+    target_machine: llvm.TargetMachine = Optimizer().target_machine
+    print(f"Compiled {incremental.compiled}, reused {incremental.reused} from cache")
+
+elif USE_COMPILER and PARALLEL:
+    llvm_module: llvm.ModuleRef = ParallelCompiler().compile(program)
+    target_machine: llvm.TargetMachine = Optimizer().target_machine
+
+elif USE_COMPILER:
+    compiler: Compiler = Compiler(profile=Profiler.load(PROFILE) if PROFILE is not None else None, output_policy=OUTPUT_POLICY,
+                                  debug_file=SOURCE_PATH if DEBUG_INFO else None, par_workers=PAR_WORKERS, par_chunk_size=PAR_CHUNK_SIZE)
+    compiler.compile(node=program)
+
+    module: ir.Module = compiler.module
+
+    if COMPILER_DEBUG:
+        print("============= COMPILER_DEBUG DEBUG ================= ")
+        with open("debug/ir.ll", "w") as f:
+            f.write(str(module))
+        print("Wrote module To debug/ir.ll")
+
+    optimizer: Optimizer = Optimizer()
+    llvm_module: llvm.ModuleRef = optimizer.optimize(module)
+    target_machine: llvm.TargetMachine = optimizer.target_machine
+
+if USE_COMPILER and RUN_CODE:
+    register_trap_key()
+    engine = llvm.create_mcjit_compiler(llvm_module, target_machine)
+    perf_map = PerfMap(source=SOURCE_PATH) if PERF_MAP else None
+    if perf_map is not None:
+        perf_map.attach(engine)
+    engine.finalize_object()
+    if perf_map is not None:
+        perf_map.record(engine, [s for s in program.statements if s.type().name == "FunctionStatement"])
+        print(f"Wrote perf map to {perf_map.path}")
+
+    main_statement = next(s for s in program.statements if s.type().name == "FunctionStatement" and s.name.value == "main")
+
+    # strings come back decoded, lists as memoryviews over the runtime's storage
+    entry = engine.get_function_address('main') # access point function
+    # not trapped: a runtime error prints its message and exits, as a native program would
+    cfunction = NativeFunction(entry, [], main_statement.return_type, owner=engine, trapped=False)
+    start_time = time.time()
+    result = cfunction()
+    end_time = time.time()
+    if isinstance(result, memoryview):
+        result = result.tolist()
+    print(f"\n\n Program Returned : {result} \n === Executed In {round((end_time-start_time)*1000, 6)} ms. ===")
@@ -3,6 +3,9 @@ from src.ast.NodeType import NodeType
 
 
 class Node(ABC):
+    # Source line the node starts on, set by the parser on statements (0 if unknown)
+    line_no: int = 0
+
     @abstractmethod
     def type(self) -> NodeType:
         pass
@@ -16,6 +16,8 @@ class NodeType(Enum):
     # Expressions
     InfixExpression = "InfixExpression"
     CallExpression = "CallExpression"
+    PipeExpression = "PipeExpression"
+    ListComprehension = "ListComprehension"
 
     # Literals
     IntegerLiteral = "IntegerLiteral"
@@ -24,6 +26,7 @@ class NodeType(Enum):
     IdentifierLiteral = "IdentifierLiteral"
     BooleanLiteral = "BooleanLiteral"
     ListLiteral = "ListLiteral"
+    MapLiteral = "MapLiteral"
 
 
     # Helper
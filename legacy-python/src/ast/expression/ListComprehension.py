@@ -0,0 +1,28 @@
+from src.ast.expression.Expression import Expression
+from src.ast.NodeType import NodeType
+
+
+class ListComprehension(Expression):
+    """
+    `[element for variable in iterable if condition]`, a new list of
+    `element` evaluated for every value of `iterable` that satisfies the
+    optional `condition`.
+    """
+    def __init__(self, element: Expression = None, variable: str = None,
+                 iterable: Expression = None, condition: Expression = None) -> None:
+        self.element = element
+        self.variable = variable
+        self.iterable = iterable
+        self.condition = condition
+
+    def type(self) -> NodeType:
+        return NodeType.ListComprehension
+
+    def json(self) -> dict:
+        return {
+            "type" : self.type().value,
+            "element" : self.element.json(),
+            "variable" : self.variable,
+            "iterable" : self.iterable.json(),
+            "condition" : self.condition.json() if self.condition is not None else None
+        }
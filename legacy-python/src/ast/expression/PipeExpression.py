@@ -0,0 +1,24 @@
+from src.ast.expression.Expression import Expression
+from src.ast.expression.CallExpression import CallExpression
+from src.ast.NodeType import NodeType
+
+
+class PipeExpression(Expression):
+    """
+    `source |> f(a) |> g(b)`: every stage is a call that receives the value
+    so far as its first argument, so this is `g(f(source, a), b)`. Chained
+    `map`, `filter` and `reduce` stages are evaluated lazily, element by element.
+    """
+    def __init__(self, source: Expression = None, stages: list[CallExpression] = None) -> None:
+        self.source = source
+        self.stages = stages if stages is not None else []
+
+    def type(self) -> NodeType:
+        return NodeType.PipeExpression
+
+    def json(self) -> dict:
+        return {
+            "type" : self.type().value,
+            "source" : self.source.json(),
+            "stages" : [stage.json() for stage in self.stages]
+        }
@@ -0,0 +1,17 @@
+from src.ast.expression.Expression import Expression
+from src.ast.NodeType import NodeType
+
+
+class MapLiteral(Expression):
+    """`[key: value, ...]`, or `[:]` for an empty map."""
+    def __init__(self, entries: list[tuple[Expression, Expression]]) -> None:
+        self.entries = entries
+
+    def type(self) -> NodeType:
+        return NodeType.MapLiteral
+
+    def json(self) -> dict:
+        return {
+            "type": self.type().value,
+            "entries": [{"key": key.json(), "value": value.json()} for key, value in self.entries]
+        }
@@ -0,0 +1,38 @@
+from typing import Any
+
+from src.ast.NodeType import NodeType
+from src.ast.statement.FunctionStatement import FunctionStatement
+
+# Builtins that write to the output
+IO_BUILTINS: set[str] = {"print", "printf"}
+
+
+def called_names(tree: Any) -> set[str]:
+    """
+    Names of every function called anywhere in a node's json() tree, and of
+    identifiers passed to calls, which covers functions passed as values
+    (`par_map(f, xs)`, `xs |> map(f)`).
+    """
+    names: set[str] = set()
+    if isinstance(tree, dict):
+        if tree.get("type") == NodeType.CallExpression.value:
+            names.add(tree["function"]["value"])
+            names |= {arg["value"] for arg in tree["arguments"] if arg.get("type") == NodeType.IdentifierLiteral.value}
+        for value in tree.values():
+            names |= called_names(value)
+    elif isinstance(tree, list):
+        for value in tree:
+            names |= called_names(value)
+    return names
+
+
+def printing_functions(functions: list[FunctionStatement]) -> set[str]:
+    """Names of the `functions` that can reach an IO builtin through their calls, among themselves."""
+    callees = {function.name.value: called_names(function.json()) for function in functions}
+    printing = {name for name, names in callees.items() if names & IO_BUILTINS}
+    changed = True
+    while changed:
+        reached = {name for name, names in callees.items() if names & printing} - printing
+        printing |= reached
+        changed = len(reached) > 0
+    return printing
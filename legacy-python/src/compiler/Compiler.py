@@ -1,3 +1,5 @@
+from contextlib import ExitStack
+
 from llvmlite import ir
 
 from src.ast.Node import Node 
@@ -16,6 +18,8 @@ from src.ast.statement.IfStatement import IfStatement
 from src.ast.statement.FunctionParameter import FunctionParameter
 from src.ast.expression.CallExpression import CallExpression
 from src.ast.expression.InfixExpression import InfixExpression
+from src.ast.expression.PipeExpression import PipeExpression
+from src.ast.expression.ListComprehension import ListComprehension
 from src.ast.expression.Expression import Expression
 from src.ast.expression.literal.IntegerLiteral import IntegerLiteral
 from src.ast.expression.literal.FloatLiteral import FloatLiteral
@@ -23,14 +27,40 @@ from src.ast.expression.literal.IdentifierLiteral import IdentifierLiteral
 from src.ast.expression.literal.BooleanLiteral import BooleanLiteral
 from src.ast.expression.literal.StringLiteral import StringLiteral
 from src.ast.expression.literal.ListLiteral import ListLiteral
+from src.ast.expression.literal.MapLiteral import MapLiteral
 
 
+from src.compiler.CallGraph import printing_functions
 from src.compiler.Environment import Environment
 from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunctionRegistry, PrintBuiltin
 from src.compiler.builtins.ToStrBuiltin import ToStrBuiltin
+from src.compiler.builtins.AddListsBuiltin import AddListsBuiltin
+from src.compiler.builtins.AddListBuiltin_vec import AddListsBuiltin_vec
+from src.compiler.builtins.ReductionBuiltins import SumBuiltin, ProdBuiltin, MinBuiltin, MaxBuiltin, MeanBuiltin, DotBuiltin
+from src.compiler.builtins.MathBuiltins import PowBuiltin, SqrtBuiltin, LogBuiltin, ExpBuiltin
+from src.compiler.builtins.FormatBuiltins import PrintfBuiltin, SprintfBuiltin
+from src.compiler.builtins.ParallelBuiltins import ParMapBuiltin, ParReduceBuiltin
+from src.compiler.builtins.PipelineBuiltins import MapBuiltin, FilterBuiltin, ReduceBuiltin
+from src.compiler.builtins.MapBuiltins import GetBuiltin, SetBuiltin, KeysBuiltin, ValuesBuiltin
+from src.compiler.builtins.SetBuiltins import UnionBuiltin, IntersectionBuiltin, DifferenceBuiltin, ContainsBuiltin, ElementsBuiltin
+from src.compiler.builtins.SortBuiltin import SortBuiltin
+from src.compiler.builtins.FrameBuiltins import VectorBuiltin, FrameBuiltin, ColumnBuiltin, RowsBuiltin, WithColumnBuiltin
+from src.compiler.utils.ListOperations import ListOperations
+from src.compiler.utils.MapOperations import MapOperations
+from src.compiler.utils.SetOperations import SetOperations
+from src.compiler.utils.FrameOperations import FrameOperations
+from src.compiler.utils.StringRuntime import StringRuntime
+from src.compiler.utils.ProfileGuidance import ProfileGuidance
+from src.compiler.utils.MathOperations import MathOperations, CHECKED_OPERATORS
+from src.compiler.utils.DebugInfo import DebugInfo
+from src.compiler.utils.Pipelines import Pipelines, FUSED_STAGES
+from src.compiler.runtime.RuntimeLibrary import RuntimeLibrary, TRAP_TYPE
+from src.output.OutputSink import FLUSH_POLICIES, DEFAULT_BUFFER_SIZE
 
 class Compiler:
-    def __init__(self) -> None:
+    def __init__(self, profile: dict | None = None, output_policy: str | None = None,
+                 output_buffer_size: int = DEFAULT_BUFFER_SIZE, debug_file: str | None = None,
+                 par_workers: int | None = None, par_chunk_size: int | None = None, checked_arithmetic: bool = False) -> None:
         self.type_map: dict[str, ir.Type] = {
             "int" : ir.IntType(32),
             "float" : ir.FloatType(),
@@ -42,7 +72,33 @@ class Compiler:
         self.builder:ir.IRBuilder = ir.IRBuilder()
         self.environment = Environment()
         self.errors: list[str] = []
-        self.builtin_registry = BuiltinFunctionRegistry()
+        self.builtin_registry = BuiltinFunctionRegistry(self)
+        self.runtime = RuntimeLibrary(self)
+        self.lists = ListOperations(self)
+        self.maps = MapOperations(self)
+        self.sets = SetOperations(self)
+        self.frames = FrameOperations(self)
+        self.strings = StringRuntime(self)
+        self.math = MathOperations(self)
+        self.pipelines = Pipelines(self)
+        # interpreter profile (see `Profiler`) guiding branch layout and inlining
+        self.profile = ProfileGuidance(self, profile) if profile is not None else None
+        # flush policy `main` sets for printed output (see `OutputSink`), None keeps the runtime's default
+        if output_policy is not None and output_policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{output_policy}', expected one of {', '.join(FLUSH_POLICIES)}.")
+        self.output_policy = output_policy
+        self.output_buffer_size = output_buffer_size
+        # DWARF line tables pointing into `debug_file`, the .line source being compiled
+        self.debug = DebugInfo(self, debug_file) if debug_file is not None else None
+        # threads and chunk size of `par_map` / `par_reduce`, None for every core / 1/64th of the list
+        if par_chunk_size is not None and par_chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {par_chunk_size}.")
+        self.par_workers = par_workers
+        self.par_chunk_size = par_chunk_size
+        # int arithmetic that would differ from exact arithmetic is a runtime error (see `MathOperations.checked`)
+        self.checked_arithmetic = checked_arithmetic
+        # names of the program's functions that can print, from their source (see `printing_functions`)
+        self.printing: set[str] = set()
 
         self.__initialize_builtins()
 
@@ -50,7 +106,41 @@ class Compiler:
     def __initialize_builtins(self) -> None:
 
         self.builtin_registry.register("print", PrintBuiltin)
+        self.builtin_registry.register("printf", PrintfBuiltin)
+        self.builtin_registry.register("sprintf", SprintfBuiltin)
         self.builtin_registry.register("to_str", ToStrBuiltin)
+        self.builtin_registry.register("add_lists", AddListsBuiltin)
+        self.builtin_registry.register("add_lists_vec", AddListsBuiltin_vec)
+        self.builtin_registry.register("sum", SumBuiltin)
+        self.builtin_registry.register("prod", ProdBuiltin)
+        self.builtin_registry.register("min", MinBuiltin)
+        self.builtin_registry.register("max", MaxBuiltin)
+        self.builtin_registry.register("mean", MeanBuiltin)
+        self.builtin_registry.register("dot", DotBuiltin)
+        self.builtin_registry.register("pow", PowBuiltin)
+        self.builtin_registry.register("sqrt", SqrtBuiltin)
+        self.builtin_registry.register("log", LogBuiltin)
+        self.builtin_registry.register("exp", ExpBuiltin)
+        self.builtin_registry.register("par_map", ParMapBuiltin)
+        self.builtin_registry.register("par_reduce", ParReduceBuiltin)
+        self.builtin_registry.register("map", MapBuiltin)
+        self.builtin_registry.register("filter", FilterBuiltin)
+        self.builtin_registry.register("reduce", ReduceBuiltin)
+        self.builtin_registry.register("sort", SortBuiltin)
+        self.builtin_registry.register("get", GetBuiltin)
+        self.builtin_registry.register("set", SetBuiltin)
+        self.builtin_registry.register("keys", KeysBuiltin)
+        self.builtin_registry.register("values", ValuesBuiltin)
+        self.builtin_registry.register("union", UnionBuiltin)
+        self.builtin_registry.register("intersection", IntersectionBuiltin)
+        self.builtin_registry.register("difference", DifferenceBuiltin)
+        self.builtin_registry.register("contains", ContainsBuiltin)
+        self.builtin_registry.register("elements", ElementsBuiltin)
+        self.builtin_registry.register("vector", VectorBuiltin)
+        self.builtin_registry.register("frame", FrameBuiltin)
+        self.builtin_registry.register("column", ColumnBuiltin)
+        self.builtin_registry.register("rows", RowsBuiltin)
+        self.builtin_registry.register("with_column", WithColumnBuiltin)
 
 
         def __init_booleans()-> tuple[ir.GlobalVariable, ir.GlobalVariable]:
@@ -59,10 +149,12 @@ class Compiler:
             true_var = ir.GlobalVariable(self.module, bool_type, 'true')
             true_var.initializer = ir.Constant(bool_type, 1)
             true_var.global_constant = True
+            true_var.linkage = 'private'
 
             false_var = ir.GlobalVariable(self.module, bool_type, 'false')
             false_var.initializer = ir.Constant(bool_type, 0)
             false_var.global_constant = True
+            false_var.linkage = 'private'
 
             return true_var, false_var
 
@@ -73,6 +165,9 @@ class Compiler:
 
 
     def compile(self, node:Node)->None:
+        if self.debug is not None:
+            self.debug.statement(node)
+
         match node.type():
             case NodeType.Program:
                 self.__visit_program(node)
@@ -99,13 +194,23 @@ class Compiler:
             case NodeType.CallExpression:
                 self.__visit_call_expression(node)
 
+            case NodeType.PipeExpression:
+                self.__visit_pipe_expression(node)
+
             case NodeType.ListLiteral:
                 return self.__visit_list_literal(node)
 
+            case NodeType.ListComprehension:
+                return self.__visit_list_comprehension(node)
+
+            case NodeType.MapLiteral:
+                return self.__visit_map_literal(node)
+
 
     # region Visit Methods (parent region)
 
     def __visit_program(self, node:Program) -> None:
+        self.printing = printing_functions([s for s in node.statements if isinstance(s, FunctionStatement)])
         for statement in node.statements:
             self.compile(statement)
 
@@ -120,27 +225,22 @@ class Compiler:
         value: Expression = node.value 
         value_type: str = node.value_type  # TODO: type checking
 
-        value, Type = self.__resolve_value(node=value)
+        if value.type() == NodeType.MapLiteral:
+            # the declared type is what gives `[:]` its key and value types
+            value, Type = self.__visit_map_literal(value, self.resolve_type(value_type))
+        else:
+            value, Type = self.__resolve_value(node=value)
 
         if self.environment.lookup(name) is None:
             # Define and allocate the variable
-            pointer = self.builder.alloca(Type)
-
-            # For arrays, store the actual array into the allocated memory
-            if isinstance(Type, ir.ArrayType):
-                self.builder.store(self.builder.load(value), pointer)
-            else:
-                # Store the value
-                self.builder.store(value, pointer)
+            pointer = self.alloca(Type, name=name)
+            self.builder.store(value, pointer)
 
             # Add the variable to the environment
             self.environment.define(name, pointer, Type)
         else:
             pointer, _ = self.environment.lookup(name)
-            if isinstance(Type, ir.ArrayType):
-                self.builder.store(self.builder.load(value), pointer)
-            else:
-                self.builder.store(value, pointer)
+            self.builder.store(value, pointer)
 
 
 
@@ -152,6 +252,9 @@ class Compiler:
     def __visit_return_statement(self, node:ReturnStatement) -> None:
         value: Expression = node.return_value
         value, Type = self.__resolve_value(value)
+        # Printed output is buffered, the program ends when `main` returns
+        if self.builder.function.name == "main":
+            self.runtime.call("mylang_output_flush", [])
         self.builder.ret(value)
 
     def __visit_function_statement(self, node:FunctionStatement) -> None:
@@ -160,23 +263,31 @@ class Compiler:
         parameters: list[FunctionParameter] = node.parameters
 
         parameter_names: list[str] = [p.name for p in parameters]
-        parameter_types: list[ir.Type] = [self.type_map[p.value_type] for p in parameters] 
+        parameter_types: list[ir.Type] = [self.resolve_type(p.value_type) for p in parameters] 
 
-        return_type: ir.Type = self.type_map[node.return_type]
+        return_type: ir.Type = self.resolve_type(node.return_type)
 
         function_type: ir.FunctionType = ir.FunctionType(return_type, parameter_types)
         function: ir.Function = ir.Function(self.module, function_type, name=name)
 
         block: ir.Block = function.append_basic_block(f'{name}_entry')
+        if self.profile is not None:
+            self.profile.function(node, function)
 
         previous_builder = self.builder
 
         self.builder = ir.IRBuilder(block)
+        if self.debug is not None:
+            self.debug.function(node, function)
+
+        if name == "main" and self.output_policy is not None:
+            policy = ir.Constant(ir.IntType(32), FLUSH_POLICIES[self.output_policy])
+            self.runtime.call("mylang_output_configure", [policy, ir.Constant(ir.IntType(64), self.output_buffer_size)])
 
         # Storing Pointers To Each Parameter
         parameter_pointer_list = []
         for i, typ in enumerate(parameter_types):
-            pointer = self.builder.alloca(typ=typ)
+            pointer = self.alloca(typ, name=parameter_names[i])
             self.builder.store(function.args[i], pointer)
             parameter_pointer_list.append(pointer)
 
@@ -201,6 +312,8 @@ class Compiler:
 
         # reset builder to previous builder 
         self.builder = previous_builder
+        if self.debug is not None:
+            self.debug.end_function()
 
     def __visit_assignment_statement(self, node: AssignStatement)-> None:
         name: str = node.identifier.value 
@@ -220,6 +333,7 @@ class Compiler:
         alternative: BlockStatement = node.alternative
 
         test, _ = self.__resolve_value(condition)
+        block: ir.Block = self.builder.block
 
         if alternative is None:
             with self.builder.if_then(test):
@@ -232,23 +346,81 @@ class Compiler:
                 with otherwise:
                     self.compile(alternative)
 
+        if self.profile is not None:
+            self.profile.branch(node, block.terminator)
+
 
 
     # endregion
 
     # region Expressions 
 
-    def __visit_infix_expression(self, node:InfixExpression) -> None:
+    def __visit_infix_expression(self, node:InfixExpression) -> tuple[ir.Value, ir.Type]:
         operator: str = node.operator
+        if operator == "+":
+            return self.__visit_sum_chain(node)
+
         left_value, left_type = self.__resolve_value(node.left_node)
         right_value, right_type = self.__resolve_value(node.right_node)
 
+        # lists are applied elementwise, broadcasting scalars against every element
+        if self.lists.is_list(left_type) or self.lists.is_list(right_type):
+            return self.lists.elementwise(operator, left_value, left_type, right_value, right_type)
+
+        return self.emit_infix(operator, left_value, left_type, right_value, right_type)
+
+    def __visit_sum_chain(self, node: InfixExpression) -> tuple[ir.Value, ir.Type]:
+        """
+        Resolves a left-associative chain `a + b + c ...` in one go, so string
+        concatenation allocates and copies once for the whole chain.
+        """
+        operands: list[Expression] = [node.right_node]
+        left: Expression = node.left_node
+        while left.type() == NodeType.InfixExpression and left.operator == "+":
+            operands.append(left.right_node)
+            left = left.left_node
+        operands.append(left)
+        operands.reverse()
+
+        values: list[tuple[ir.Value, ir.Type]] = [self.__resolve_value(operand) for operand in operands]
+
+        str_type = self.type_map["str"]
+        if any(Type == str_type for _, Type in values):
+            if not all(Type == str_type for _, Type in values):
+                raise TypeError("'+' on strings expects every operand to be a str, use to_str() to convert.")
+            return self.strings.concat([value for value, _ in values]), str_type
+
+        value, Type = values[0]
+        for right_value, right_type in values[1:]:
+            if self.lists.is_list(Type) or self.lists.is_list(right_type):
+                value, Type = self.lists.elementwise("+", value, Type, right_value, right_type)
+            else:
+                value, Type = self.emit_infix("+", value, Type, right_value, right_type)
+        return value, Type
+
+    def emit_infix(self, operator: str,
+                   left_value: ir.Value, left_type: ir.Type,
+                   right_value: ir.Value, right_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """
+        Emits a scalar infix operation on already resolved operands.
+        Mixing int and float promotes the int side to float.
+        """
+        # `float ^ int` keeps its integer exponent for llvm.powi
+        if operator == "^":
+            return self.math.power(left_value, left_type, right_value, right_type)
+
+        if isinstance(left_type, ir.IntType) and isinstance(right_type, ir.FloatType):
+            left_value, left_type = self.builder.sitofp(left_value, right_type), right_type
+        elif isinstance(left_type, ir.FloatType) and isinstance(right_type, ir.IntType):
+            right_value, right_type = self.builder.sitofp(right_value, left_type), left_type
+
         value = None 
         Type = None
         
-        # todo: float x int? 
         if isinstance(right_type, ir.IntType) and isinstance(left_type, ir.IntType):
             Type = self.type_map["int"]
+            if self.checked_arithmetic and operator in CHECKED_OPERATORS:
+                return self.math.checked(operator, left_value, right_value), Type
             match operator:
                 case "+":
                     value = self.builder.add(left_value, right_value)
@@ -260,9 +432,6 @@ class Compiler:
                     value = self.builder.sdiv(left_value, right_value)
                 case "%":
                     value = self.builder.srem(left_value, right_value)
-                case "^":
-                    # todo
-                    value = self.builder.sdiv(left_value, right_value)
                 case "<":
                     value = self.builder.icmp_signed('<', left_value, right_value)
                     Type = ir.IntType(1)
@@ -295,9 +464,6 @@ class Compiler:
                     value = self.builder.fdiv(left_value, right_value)
                 case "%":
                     value = self.builder.frem(left_value, right_value)
-                case "^":
-                    # todo
-                    value = self.builder.sdiv(left_value, right_value)                                        
                 case "<":
                     value = self.builder.fcmp_ordered('<', left_value, right_value)
                     Type = ir.IntType(1)
@@ -337,11 +503,43 @@ class Compiler:
             args.append(arg_val)
             types.append(arg_type)
 
+        return self.__call(name, args, types, node)
+
+    def __visit_pipe_expression(self, node: PipeExpression) -> tuple[ir.Value, ir.Type]:
+        """
+        Lowers `source |> stage |> ...`, every stage receiving the value so far
+        as its first argument. Consecutive `map` / `filter` stages, optionally
+        ended by a `reduce`, are fused into one loop by `Pipelines`.
+        """
+        value, Type = self.__resolve_value(node.source)
+        run: list[tuple[str, list[ir.Value], list[ir.Type]]] = []
+        for stage in node.stages:
+            name: str = stage.function.value
+            resolved = [self.__resolve_value(argument) for argument in stage.arguments]
+            args, types = [v for v, _ in resolved], [t for _, t in resolved]
+
+            if name in FUSED_STAGES:
+                run.append((name, args, types))
+                if name == "reduce":
+                    value, Type = self.pipelines.fuse(value, Type, run)
+                    run = []
+                continue
+
+            if len(run) > 0:
+                value, Type = self.pipelines.fuse(value, Type, run)
+                run = []
+            value, Type = self.__call(name, [value] + args, [Type] + types, stage)
+
+        if len(run) > 0:
+            value, Type = self.pipelines.fuse(value, Type, run)
+        return value, Type
+
+    def __call(self, name: str, args: list[ir.Value], types: list[ir.Type], node: CallExpression) -> tuple[ir.Value, ir.Type]:
+        """Emits a call to a builtin or user function with resolved arguments."""
         # Check if this is a built-in function
-        builtin_handler_class = self.builtin_registry.get(name)
-        if builtin_handler_class:
-            # Instantiate the handler and call 'handle'
-            handler = builtin_handler_class(self)
+        # (one handler per module, created on first use)
+        handler = self.builtin_registry.get(name)
+        if handler is not None:
             return handler.handle(args, types)
 
         # Otherwise, assume it's a user-defined function
@@ -350,8 +548,16 @@ class Compiler:
         except KeyError:
             raise ValueError(f"Function '{name}' not found in the current scope.")
 
+        # Frames are passed as the frame each parameter declares, which may be fewer of their columns
+        args = [
+            self.frames.project(arg, parameter) if self.frames.is_frame(Type) and self.frames.is_frame(parameter) else arg
+            for arg, Type, parameter in zip(args, types, function.function_type.args)
+        ]
+
         # Emit a call to the user-defined function
         ret = self.builder.call(function, args)
+        if self.profile is not None:
+            self.profile.call_site(node, function)
         return ret, return_type
 
 
@@ -362,6 +568,124 @@ class Compiler:
 
     # region Helper Methods
 
+    def declare_function(self, name: str, parameter_types: list[str], return_type: str) -> ir.Function:
+        """
+        Declares a function that is defined in another module, so calls to it
+        compile here and are resolved when the modules are linked.
+        """
+        function_type = ir.FunctionType(self.resolve_type(return_type), [self.resolve_type(t) for t in parameter_types])
+        function = ir.Function(self.module, function_type, name=name)
+        self.environment.define(name, function, function_type.return_type)
+        return function
+
+    def define_batch(self, name: str) -> ir.Function:
+        """
+        Defines `mylang.batch.<name>`, which applies the scalar function `name`
+        to every row of its parameter columns and writes the results into a
+        column of the same length:
+
+            list[R] mylang.batch.<name>(list[T1] c1, ..., list[Tn] cn, list[R] out)
+
+        Rows are `out`'s length, the columns must be at least as long. `out` is
+        returned. The function call is inlined into the loop, so LLVM can
+        vectorize the whole row loop instead of dispatching per row.
+        """
+        function, return_type = self.environment.lookup(name)
+        parameter_types: list[ir.Type] = list(function.function_type.args)
+        column_types = [self.lists.list_type(t) for t in parameter_types + [return_type]]
+
+        batch = ir.Function(self.module, ir.FunctionType(column_types[-1], column_types), name=f"mylang.batch.{name}")
+
+        previous_builder = self.builder
+        self.builder = ir.IRBuilder(batch.append_basic_block("entry"))
+        columns = [self.lists.data(argument) for argument in batch.args]
+        rows = self.lists.length(batch.args[-1])
+        with self.lists.for_range(rows) as i:
+            row = [self.builder.load(self.builder.gep(column, [i])) for column in columns[:-1]]
+            result = self.builder.call(function, row, attrs=("alwaysinline",))
+            self.builder.store(result, self.builder.gep(columns[-1], [i]))
+        self.builder.ret(batch.args[-1])
+        self.builder = previous_builder
+        return batch
+
+    def define_trap(self, name: str) -> ir.Function:
+        """
+        Defines `mylang.trap.<name>`, which calls the function `name` (any
+        function of the module, batch wrappers included) with a trap set, so
+        a runtime error returns to it instead of terminating the process:
+
+            R mylang.trap.<name>(T1 a1, ..., Tn an, i8** error)
+
+        Without an error, `*error` is untouched and the result is returned.
+        After one, `*error` points to the panic message and the result is zero.
+        """
+        function: ir.Function = self.module.globals[name]
+        function_type = function.function_type
+        error_type = self.type_map["str"].as_pointer()
+        trap_function = ir.Function(self.module, ir.FunctionType(function_type.return_type, [*function_type.args, error_type]),
+                                    name=f"mylang.trap.{name}")
+
+        previous_builder = self.builder
+        self.builder = ir.IRBuilder(trap_function.append_basic_block("entry"))
+        call_block = trap_function.append_basic_block("call")
+        failed_block = trap_function.append_basic_block("failed")
+        trap = self.builder.alloca(TRAP_TYPE, name="trap")
+        trap.align = 16
+        buffer = self.builder.bitcast(trap, self.type_map["str"])
+        previous = self.runtime.call("mylang_trap_push", [buffer])
+        jumped = self.runtime.call("_setjmp", [buffer])
+        self.builder.cbranch(self.builder.icmp_signed("==", jumped, ir.Constant(jumped.type, 0)), call_block, failed_block)
+
+        self.builder.position_at_end(call_block)
+        result = self.builder.call(function, trap_function.args[:-1])
+        self.runtime.call("mylang_trap_pop", [previous])
+        self.builder.ret(result)
+
+        self.builder.position_at_end(failed_block)
+        self.runtime.call("mylang_trap_pop", [previous])
+        message = self.builder.gep(trap, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 1)])
+        self.builder.store(self.builder.load(message), trap_function.args[-1])
+        self.builder.ret(ir.Constant(function_type.return_type, None))
+        self.builder = previous_builder
+        return trap_function
+
+    def resolve_type(self, name: str) -> ir.Type:
+        """
+        LLVM type of a source type name: a name in `type_map`, `list[T]`
+        for a list of T, which is a `{T*, i64}` slice, `vector[T]` for a
+        vector of T, `frame[a: T, ...]` for a frame (see `FrameOperations`),
+        `set[T]` for a set (see `SetOperations`) or `map[K, V]` for a map
+        (see `MapOperations`).
+        """
+        if name.startswith("list[") and name.endswith("]"):
+            return self.lists.list_type(self.resolve_type(name[5:-1]))
+        if name.startswith("vector[") and name.endswith("]"):
+            return self.frames.vector_type(self.resolve_type(name[7:-1]))
+        if name.startswith("frame[") and name.endswith("]"):
+            # column types are scalars, so commas only separate columns
+            columns = [column.split(":", 1) for column in name[6:-1].split(",")]
+            return self.frames.frame_type([(column.strip(), self.resolve_type(Type.strip())) for column, Type in columns])
+        if name.startswith("set[") and name.endswith("]"):
+            return self.sets.set_type(self.resolve_type(name[4:-1]))
+        if name.startswith("map[") and name.endswith("]"):
+            # keys are scalars, so the first comma ends the key type
+            key, value = name[4:-1].split(",", 1)
+            return self.maps.map_type(self.resolve_type(key.strip()), self.resolve_type(value.strip()))
+        if name not in self.type_map:
+            raise TypeError(f"Unknown type '{name}', expected one of {', '.join(self.type_map)}, list[T], vector[T], set[T], map[K, V] or frame[a: T, ...].")
+        return self.type_map[name]
+
+    def alloca(self, Type: ir.Type, name: str = "") -> ir.AllocaInstr:
+        """
+        Allocates a stack slot in the entry block of the current function, wherever
+        the builder currently is. Entry block allocas are allocated once per call
+        (not once per loop iteration) and are what mem2reg/SROA promote to registers.
+        """
+        # goto_entry_block inserts before the entry terminator (or at its end) and
+        # returns the builder to the end of the current block afterwards
+        with self.builder.goto_entry_block():
+            return self.builder.alloca(Type, name=name)
+
     def __resolve_value(self, node: Expression, value_type: str = None) -> tuple[ir.Value, ir.Type]:
         match node.type():
             case NodeType.IntegerLiteral:
@@ -375,13 +699,16 @@ class Compiler:
             case NodeType.IdentifierLiteral:
                 node: IdentifierLiteral = node 
                 pointer, Type = self.environment.lookup(node.value)
+                # a function used as a value, e.g. passed to `par_map`
+                if isinstance(pointer, ir.Function):
+                    return pointer, pointer.type
                 return self.builder.load(pointer), Type
             case NodeType.BooleanLiteral:
                 node: BooleanLiteral = node 
                 return ir.Constant(ir.IntType(1), 1 if node.value else 0), ir.IntType(1)
             case NodeType.StringLiteral: 
                 node: StringLiteral = node
-                str_pointer = self.__create_string_constant(node.value)
+                str_pointer = self.create_string_constant(node.value)
                 # type is i8* (i.e., "str")
                 return str_pointer, self.type_map["str"]            
 
@@ -390,39 +717,105 @@ class Compiler:
 
             case NodeType.CallExpression:
                 return self.__visit_call_expression(node)
+
+            case NodeType.PipeExpression:
+                return self.__visit_pipe_expression(node)
             
             case NodeType.ListLiteral:
                 return self.__visit_list_literal(node)
-    # endregion
 
-    def __create_string_constant(self, text: str) -> ir.Constant:
-        byte_array = bytearray(text.encode("utf-8"))
-        byte_array.append(0)
+            case NodeType.ListComprehension:
+                return self.__visit_list_comprehension(node)
 
-        str_type = ir.ArrayType(ir.IntType(8), len(byte_array))
-        count = len(self.module.global_values)  # ALL global values, including functions
-        name = f".str_{count}"
-
-        global_var = ir.GlobalVariable(self.module, str_type, name=name)
-        global_var.linkage = 'private'
-        global_var.global_constant = True
-        global_var.initializer = ir.Constant(str_type, byte_array)
+            case NodeType.MapLiteral:
+                return self.__visit_map_literal(node)
+    # endregion
 
-        return global_var.bitcast(ir.IntType(8).as_pointer())
+    def create_string_constant(self, text: str) -> ir.Constant:
+        return self.strings.constant(text)
     
     def __visit_list_literal(self, node: ListLiteral) -> tuple[ir.Value, ir.Type]:
+        values: list[tuple[ir.Value, ir.Type]] = [self.__resolve_value(element) for element in node.elements]
+
+        # the element type is float if any element is a float, otherwise the type of the first element
         element_type = self.type_map["int"]
-        list_type = ir.ArrayType(element_type, len(node.elements))
+        if any(isinstance(Type, ir.FloatType) for _, Type in values):
+            element_type = self.type_map["float"]
+        elif len(values) > 0:
+            element_type = values[0][1]
 
-        # Allocate memory for the list => returns a pointer to `[N x int]`
-        array_ptr = self.builder.alloca(list_type, name="mylist")
+        # The elements go to the heap: a list can be returned, or kept in a
+        # frame, and so outlive the function that wrote the literal
+        length = ir.Constant(ir.IntType(64), len(values))
+        data = self.lists.allocate(element_type, length)
 
         # Populate the list
-        for i, element in enumerate(node.elements):
-            value, _ = self.__resolve_value(element)
-            idx = ir.Constant(ir.IntType(32), i)
-            element_ptr = self.builder.gep(array_ptr, [ir.Constant(ir.IntType(32), 0), idx])
-            self.builder.store(value, element_ptr)
-
-        # Here's the fix: return array_ptr and array_ptr.type (which is [N x i32]*)
-        return array_ptr, array_ptr.type
+        for i, (value, Type) in enumerate(values):
+            if Type != element_type:
+                value = self.builder.sitofp(value, element_type)
+            self.builder.store(value, self.builder.gep(data, [ir.Constant(ir.IntType(64), i)]))
+
+        return self.lists.make(data, length), self.lists.list_type(element_type)
+
+    def __visit_list_comprehension(self, node: ListComprehension) -> tuple[ir.Value, ir.Type]:
+        """
+        Lowers `[element for variable in iterable if condition]` to one counted
+        loop over the iterable, storing into a heap list allocated before the
+        loop at the iterable's length, which bounds the result. The condition
+        is a branch around the store, and the result's length is the number
+        of elements stored.
+        """
+        iterable, iterable_type = self.__resolve_value(node.iterable)
+        if not self.lists.is_list(iterable_type):
+            raise TypeError(f"List comprehensions iterate over a list, got '{iterable_type}'.")
+
+        variable_type = self.lists.element_type(iterable_type)
+        variable = self.alloca(variable_type, name=node.variable)
+        size = self.alloca(ir.IntType(64), name="comprehension_size")
+        self.builder.store(ir.Constant(ir.IntType(64), 0), size)
+
+        previous_environment = self.environment
+        self.environment = Environment(parent=self.environment)
+        self.environment.define(node.variable, variable, variable_type)
+
+        count = self.lists.length(iterable)
+        data = self.lists.data(iterable)
+        preheader = self.builder.block
+        with self.lists.for_range(count) as i:
+            self.builder.store(self.builder.load(self.builder.gep(data, [i])), variable)
+            with ExitStack() as kept:
+                if node.condition is not None:
+                    test, _ = self.__resolve_value(node.condition)
+                    kept.enter_context(self.builder.if_then(self.pipelines.truth(test)))
+                value, element_type = self.__resolve_value(node.element)
+                # the element type is only known here, the storage goes before the loop
+                with self.builder.goto_block(preheader):
+                    results = self.lists.allocate(element_type, count)
+                index = self.builder.load(size)
+                self.builder.store(value, self.builder.gep(results, [index]))
+                self.builder.store(self.builder.add(index, ir.Constant(ir.IntType(64), 1)), size)
+
+        self.environment = previous_environment
+        return self.lists.make(results, self.builder.load(size)), self.lists.list_type(element_type)
+
+    def __visit_map_literal(self, node: MapLiteral, map_type: ir.Type = None) -> tuple[ir.Value, ir.Type]:
+        """
+        Builds a map from `[key: value, ...]`. Without a declared `map_type`,
+        the key type is the first key's and the value type is float if any
+        value is a float, otherwise the first value's.
+        """
+        entries = [(self.__resolve_value(key), self.__resolve_value(value)) for key, value in node.entries]
+        if map_type is None:
+            if len(entries) == 0:
+                raise TypeError("An empty map literal needs a declared type, e.g. `let m: map[str, int] = [:];`.")
+            value_type = entries[0][1][1]
+            if any(isinstance(Type, ir.FloatType) for _, (_, Type) in entries):
+                value_type = self.type_map["float"]
+            map_type = self.maps.map_type(entries[0][0][1], value_type)
+        elif not self.maps.is_map(map_type):
+            raise TypeError(f"A map literal can't have type '{map_type}'.")
+
+        value = self.maps.new(map_type)
+        for (key, key_type), (item, item_type) in entries:
+            self.maps.set(value, key, key_type, self.maps.item(item, item_type, self.maps.value_type(map_type), "values"))
+        return value, map_type
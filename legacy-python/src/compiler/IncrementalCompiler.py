@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+
+import llvmlite.binding as llvm
+
+from src.ast.NodeType import NodeType
+from src.ast.Program import Program
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.compiler.CallGraph import called_names, printing_functions
+from src.compiler.Compiler import Compiler
+from src.compiler.Optimizer import Optimizer
+
+# name, parameter types, return type, and whether the function can print
+Signature = tuple[str, tuple[str, ...], str, bool]
+
+
+def compiler_fingerprint() -> str:
+    """
+    Hash of every source under `src/` and the runtime, so changing either
+    invalidates every cache entry. The compiler imports beyond its own
+    package (`src.format`, `src.output`, ...), so all of `src/` is hashed.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for directory, directories, files in os.walk(root):
+        directories.sort()
+        for file in sorted(files):
+            if file.endswith((".py", ".ll")):
+                path = os.path.join(directory, file)
+                digest.update(os.path.relpath(path, root).encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def function_signature(function: FunctionStatement, printing: set[str]) -> Signature:
+    name = function.name.value
+    return (name, tuple(p.value_type for p in function.parameters), function.return_type, name in printing)
+
+
+def program_signatures(functions: list[FunctionStatement]) -> dict[str, Signature]:
+    """The signatures of a program's functions, by name."""
+    printing = printing_functions(functions)
+    return {function.name.value: function_signature(function, printing) for function in functions}
+
+
+def build_functions(functions: list[FunctionStatement], signatures: dict[str, Signature], checked_arithmetic: bool = False) -> Compiler:
+    """
+    Compiles `functions` into one module on their own, without optimizing it.
+    Every other function in `signatures` is declared, so calls resolve at link time.
+    """
+    compiler = Compiler(checked_arithmetic=checked_arithmetic)
+    compiler.printing = {name for name, (*_, prints) in signatures.items() if prints} | printing_functions(functions)
+    defined = {function.name.value for function in functions}
+    for name, (_, parameter_types, return_type, _) in signatures.items():
+        if name not in defined:
+            compiler.declare_function(name, list(parameter_types), return_type)
+
+    for function in functions:
+        compiler.compile(function)
+    if len(compiler.errors) > 0:
+        raise ValueError("\n".join(compiler.errors))
+    return compiler
+
+
+def compile_functions(functions: list[FunctionStatement], signatures: dict[str, Signature], speed_level: int,
+                      cpu: str | None = None, features: str | None = None) -> bytes:
+    """Compiles `functions` with `build_functions` and returns the optimized bitcode."""
+    compiler = build_functions(functions, signatures)
+    return Optimizer(speed_level=speed_level, cpu=cpu, features=features).optimize(compiler.module).as_bitcode()
+
+
+class IncrementalCompiler:
+    """
+    Compiles a program one `FunctionStatement` at a time and caches each function's
+    optimized bitcode on disk.
+
+    The cache key is a hash of the function's AST, the signatures of the functions
+    it calls and the compiler's own sources. Editing a function's body therefore
+    only recompiles that function, while changing its signature also recompiles its
+    callers. Everything else is loaded from the cache and linked.
+    """
+    def __init__(self, cache_dir: str = ".mylang_cache", speed_level: int = 2) -> None:
+        self.cache_dir = cache_dir
+        self.speed_level = speed_level
+        self.fingerprint = compiler_fingerprint()
+
+        # names of the functions compiled / reused by the last call to `compile`
+        self.compiled: list[str] = []
+        self.reused: list[str] = []
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def compile(self, program: Program) -> llvm.ModuleRef:
+        functions: list[FunctionStatement] = []
+        for statement in program.statements:
+            if statement.type() != NodeType.FunctionStatement:
+                raise ValueError(f"Only function statements can be compiled incrementally, got {statement.type().value}.")
+            functions.append(statement)
+
+        signatures = program_signatures(functions)
+
+        self.compiled, self.reused = [], []
+        linked: llvm.ModuleRef | None = None
+        for function in functions:
+            module = llvm.parse_bitcode(self.__function_bitcode(function, signatures))
+            if linked is None:
+                linked = module
+            else:
+                linked.link_in(module)
+
+        if linked is None:
+            raise ValueError("Program has no functions to compile.")
+        linked.verify()
+        return linked
+
+    def key(self, function: FunctionStatement, signatures: dict[str, Signature]) -> str:
+        tree = function.json()
+        callees = sorted(signatures[name] for name in called_names(tree) if name in signatures)
+        # the bitcode is tuned for the host CPU
+        payload = json.dumps([self.fingerprint, self.speed_level, llvm.get_host_cpu_name(), tree, callees], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __function_bitcode(self, function: FunctionStatement, signatures: dict[str, Signature]) -> bytes:
+        name = function.name.value
+        path = os.path.join(self.cache_dir, f"{name}.{self.key(function, signatures)}.bc")
+
+        if os.path.exists(path):
+            self.reused.append(name)
+            with open(path, "rb") as f:
+                return f.read()
+
+        bitcode = compile_functions([function], signatures, self.speed_level)
+        self.compiled.append(name)
+
+        # drop stale entries for this function before writing the new one
+        for file in os.listdir(self.cache_dir):
+            if file.startswith(f"{name}.") and file.endswith(".bc") and file.count(".") == 2:
+                os.remove(os.path.join(self.cache_dir, file))
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(bitcode)
+        os.replace(temporary, path)
+        return bitcode
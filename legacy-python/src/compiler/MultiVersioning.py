@@ -0,0 +1,150 @@
+from llvmlite import ir
+import llvmlite.binding as llvm
+
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.compiler.IncrementalCompiler import Signature, build_functions
+from src.compiler.Optimizer import Optimizer
+
+# CPU every multi-versioned build targets outside of its variants
+BASELINE_CPU: str = "x86-64"
+
+# (suffix, cpu, bits of `__cpu_model.__cpu_features[0]` that must all be set), best first.
+# The bits are libgcc / compiler-rt's `ProcessorFeatures`: AVX2 = 10, FMA = 14, BMI = 16,
+# BMI2 = 17, AVX512F = 15, AVX512VL = 20, AVX512BW = 21, AVX512DQ = 22, AVX512CD = 23.
+VARIANTS: list[tuple[str, str, list[int]]] = [
+    ("avx512", "x86-64-v4", [10, 14, 16, 17, 15, 20, 21, 22, 23]),
+    ("avx2", "x86-64-v3", [10, 14, 16, 17]),
+    ("sse2", BASELINE_CPU, []),
+]
+
+
+class TargetAttributes(ir.FunctionAttributes):
+    """`FunctionAttributes` that also accept LLVM string attributes, e.g. `"target-cpu"="x86-64-v3"`."""
+    def add(self, name: str) -> None:
+        if name.startswith('"'):
+            set.add(self, name)
+        else:
+            super().add(name)
+
+
+def is_vector_heavy(function: FunctionStatement, signatures: dict[str, Signature]) -> bool:
+    """
+    Whether a function loops over list elements, which is where wider vectors
+    pay off, itself or in the helpers it reaches: builtins such as `sum` or
+    `sqrt` on a list loop in their `mylang.*` helper, not in the caller.
+    """
+    module = build_functions([function], signatures).module
+    return any(block.name.startswith("for.cond") for defined in reached_functions(module.get_global(function.name.value))
+               for block in defined.blocks)
+
+
+def reached_functions(function: ir.Function) -> list[ir.Function]:
+    """`function` and every function defined in its module it calls or passes on, such as a `par_map` body."""
+    reached: list[ir.Function] = []
+    queue = [function]
+    while len(queue) > 0:
+        current = queue.pop()
+        if current in reached or current.is_declaration:
+            continue
+        reached.append(current)
+        for block in current.blocks:
+            for instruction in block.instructions:
+                operands = [instruction.callee] if isinstance(instruction, ir.CallInstr) else []
+                operands += instruction.operands
+                # a function passed on is often behind a bitcast
+                operands += [operand.operands[0] for operand in operands if isinstance(operand, ir.CastInstr)]
+                queue.extend(operand for operand in operands if isinstance(operand, ir.Function))
+    return reached
+
+
+def multiversioned_modules(functions: list[FunctionStatement], signatures: dict[str, Signature],
+                           speed_level: int) -> list[llvm.ModuleRef]:
+    """
+    Compiles `functions` for `BASELINE_CPU`, plus one copy per entry of `VARIANTS`
+    of every vector-heavy function. Each of those keeps its name as a dispatcher,
+    which picks the best variant the running CPU supports on its first call.
+
+    Returns optimized modules to be linked together. The dispatchers read
+    `__cpu_model`, so the final link needs libgcc or compiler-rt (any `cc` does).
+    """
+    if not llvm.get_process_triple().startswith("x86_64"):
+        raise ValueError(f"Multi-versioning is only supported on x86_64, not {llvm.get_process_triple()}.")
+
+    heavy = [f for f in functions if is_vector_heavy(f, signatures)]
+    rest = [f for f in functions if f not in heavy]
+
+    base = build_functions(rest, signatures)
+    for function in heavy:
+        emit_dispatcher(base, function)
+    modules = [Optimizer(speed_level=speed_level, cpu=BASELINE_CPU, features="").optimize(base.module)]
+
+    for function in heavy:
+        for suffix, cpu, _ in VARIANTS:
+            modules.append(compile_variant(function, signatures, speed_level, suffix, cpu))
+    return modules
+
+
+def compile_variant(function: FunctionStatement, signatures: dict[str, Signature], speed_level: int,
+                    suffix: str, cpu: str) -> llvm.ModuleRef:
+    """Compiles `function` as `name.suffix` for `cpu`."""
+    compiler = build_functions([function], signatures)
+    defined: ir.Function = compiler.module.get_global(function.name.value)
+    defined.attributes = TargetAttributes(defined.attributes)
+    defined.attributes.add(f'"target-cpu"="{cpu}"')
+
+    module = Optimizer(speed_level=speed_level, cpu=cpu, features="").optimize(compiler.module)
+    module.get_function(function.name.value).name = f"{function.name.value}.{suffix}"
+    return module
+
+
+def emit_dispatcher(compiler, function: FunctionStatement) -> None:
+    """
+    Defines `function` in `compiler`'s module as a dispatcher that resolves the
+    best variant once, caches it in a global, and tail calls it.
+    """
+    module: ir.Module = compiler.module
+    name = function.name.value
+    i32 = ir.IntType(32)
+
+    dispatcher: ir.Function = module.globals.get(name)
+    if dispatcher is None:
+        parameter_types = [p.value_type for p in function.parameters]
+        dispatcher = compiler.declare_function(name, parameter_types, function.return_type)
+    function_type: ir.FunctionType = dispatcher.function_type
+
+    variants = {suffix: ir.Function(module, function_type, name=f"{name}.{suffix}") for suffix, _, _ in VARIANTS}
+
+    resolved = ir.GlobalVariable(module, function_type.as_pointer(), name=f"{name}.resolved")
+    resolved.linkage = "internal"
+    resolved.initializer = ir.Constant(function_type.as_pointer(), None)
+
+    cpu_model_type = ir.LiteralStructType([i32, i32, i32, ir.ArrayType(i32, 1)])
+    cpu_model = module.globals.get("__cpu_model") or ir.GlobalVariable(module, cpu_model_type, name="__cpu_model")
+    cpu_init = module.globals.get("__cpu_indicator_init") or ir.Function(module, ir.FunctionType(i32, []), name="__cpu_indicator_init")
+
+    entry = dispatcher.append_basic_block("entry")
+    resolve = dispatcher.append_basic_block("resolve")
+    call = dispatcher.append_basic_block("call")
+    builder = ir.IRBuilder(entry)
+
+    cached = builder.load(resolved)
+    builder.cbranch(builder.icmp_unsigned("==", cached, ir.Constant(cached.type, None)), resolve, call)
+    builder.block.terminator.set_weights([1, 1000])
+
+    builder.position_at_end(resolve)
+    builder.call(cpu_init, [])
+    features = builder.load(builder.gep(cpu_model, [ir.Constant(i32, 0), ir.Constant(i32, 3), ir.Constant(i32, 0)]))
+    choice = variants[VARIANTS[-1][0]]
+    for suffix, _, bits in reversed(VARIANTS[:-1]):
+        mask = ir.Constant(i32, sum(1 << bit for bit in bits))
+        supported = builder.icmp_unsigned("==", builder.and_(features, mask), mask)
+        choice = builder.select(supported, variants[suffix], choice)
+    builder.store(choice, resolved)
+    builder.branch(call)
+
+    builder.position_at_end(call)
+    target = builder.phi(function_type.as_pointer())
+    target.add_incoming(cached, entry)
+    target.add_incoming(choice, resolve)
+    result = builder.call(target, list(dispatcher.args), tail=True)
+    builder.ret(result)
@@ -0,0 +1,84 @@
+from llvmlite import ir
+import llvmlite.binding as llvm
+
+from src.compiler.runtime.RuntimeLibrary import register_trap_key, runtime_bitcode
+
+
+class Optimizer:
+    """
+    Turns the `ir.Module` built by the `Compiler` into a verified, optimized
+    `llvm.ModuleRef` ready for the JIT or for object code emission.
+
+    The runtime library is linked in before optimizing, so its helpers are
+    inlined and specialized like the program's own functions.
+
+    SROA always runs first, even at speed level 0, so every local the compiler
+    allocated in an entry block is promoted to an SSA register.
+
+    Code is tuned for the host CPU and may use every feature it has (AVX2,
+    AVX-512, ...) unless `cpu` / `features` say otherwise.
+    """
+    def __init__(self, speed_level: int = 2, cpu: str | None = None, features: str | None = None) -> None:
+        self.speed_level = speed_level
+        self.target_machine: llvm.TargetMachine = self.create_target_machine(cpu=cpu, features=features)
+
+    @staticmethod
+    def create_target_machine(cpu: str | None = None, features: str | None = None, reloc: str = "default") -> llvm.TargetMachine:
+        """
+        Creates a target machine for `cpu` with `features` (an LLVM feature string
+        such as "+avx2,+fma"), defaulting to the host CPU and all of its features.
+        """
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+
+        if cpu is None:
+            cpu = llvm.get_host_cpu_name()
+        if features is None:
+            try:
+                features = llvm.get_host_cpu_features().flatten()
+            except RuntimeError:
+                # not every platform can report its features, the CPU name still implies most of them
+                features = ""
+        return llvm.Target.from_default_triple().create_target_machine(cpu=cpu, features=features, reloc=reloc)
+
+    def optimize(self, module: ir.Module) -> llvm.ModuleRef:
+        misplaced = self.find_misplaced_allocas(module)
+        if len(misplaced) > 0:
+            raise ValueError(f"Allocas outside of entry blocks: {', '.join(misplaced)}")
+
+        module.triple = self.target_machine.triple
+        module.data_layout = str(self.target_machine.target_data)
+        llvm_module: llvm.ModuleRef = llvm.parse_assembly(str(module))
+
+        runtime = llvm.parse_bitcode(runtime_bitcode())
+        runtime.triple = llvm_module.triple
+        runtime.data_layout = llvm_module.data_layout
+        llvm_module.link_in(runtime)
+        llvm_module.verify()
+        # the runtime's traps use the process's key, see runtime.ll
+        register_trap_key()
+
+        pass_builder = llvm.create_pass_builder(self.target_machine, llvm.create_pipeline_tuning_options(self.speed_level))
+
+        # mem2reg/SROA
+        promote = llvm.create_new_module_pass_manager()
+        promote.add_sroa_pass()
+        promote.run(llvm_module, pass_builder)
+
+        if self.speed_level > 0:
+            pass_builder.getModulePassManager().run(llvm_module, pass_builder)
+
+        return llvm_module
+
+    @staticmethod
+    def find_misplaced_allocas(module: ir.Module) -> list[str]:
+        """
+        Returns `function:block` for every alloca outside a function's entry block.
+        Those grow the stack on every loop iteration and are never promoted to registers.
+        """
+        misplaced: list[str] = []
+        for function in module.functions:
+            for block in function.blocks[1:]:
+                if any(isinstance(instruction, ir.AllocaInstr) for instruction in block.instructions):
+                    misplaced.append(f"{function.name}:{block.name}")
+        return misplaced
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import llvmlite.binding as llvm
+
+from src.ast.NodeType import NodeType
+from src.ast.Program import Program
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.compiler.IncrementalCompiler import Signature, compile_functions, program_signatures
+from src.compiler.MultiVersioning import BASELINE_CPU, multiversioned_modules
+from src.compiler.Optimizer import Optimizer
+from src.compiler.runtime.RuntimeLibrary import TRAP_KEY_DEFINITION
+
+
+def compile_partition(functions: list[FunctionStatement], signatures: dict[str, Signature], speed_level: int) -> bytes:
+    """Worker: compiles and optimizes one partition, returning its bitcode."""
+    return compile_functions(functions, signatures, speed_level)
+
+
+def emit_partition(functions: list[FunctionStatement], signatures: dict[str, Signature], speed_level: int,
+                   multiversion: bool = False) -> bytes:
+    """
+    Worker: compiles, optimizes and emits one partition as position independent object code,
+    for the host CPU or, with `multiversion`, for every CPU with dispatched variants.
+    """
+    if not multiversion:
+        module = llvm.parse_bitcode(compile_functions(functions, signatures, speed_level))
+        return Optimizer.create_target_machine(reloc="pic").emit_object(module)
+
+    module, *variants = multiversioned_modules(functions, signatures, speed_level)
+    for variant in variants:
+        module.link_in(variant)
+    return Optimizer.create_target_machine(cpu=BASELINE_CPU, features="", reloc="pic").emit_object(module)
+
+
+class ParallelCompiler:
+    """
+    Partitions a program's `FunctionStatement`s into several modules and
+    optimizes / emits them on a process pool, one partition per worker.
+
+    The partitions are linked back together either with the llvmlite linker
+    (`compile`) or as object files with the system linker (`build_shared_library`).
+    Functions only see each other's declarations, so nothing is inlined across
+    partitions.
+
+    Object files target the host CPU. With `multiversion` they target a baseline
+    x86-64 CPU instead, and vector-heavy functions get SSE2, AVX2 and AVX-512
+    variants picked at runtime (see `MultiVersioning`).
+    """
+    def __init__(self, workers: int | None = None, speed_level: int = 2, multiversion: bool = False) -> None:
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.speed_level = speed_level
+        self.multiversion = multiversion
+
+    def compile(self, program: Program) -> llvm.ModuleRef:
+        """Compiles the partitions in parallel and links their bitcode into one module."""
+        linked: llvm.ModuleRef | None = None
+        for bitcode in self.__run(compile_partition, program):
+            module = llvm.parse_bitcode(bitcode)
+            if linked is None:
+                linked = module
+            else:
+                linked.link_in(module)
+        linked.verify()
+        return linked
+
+    def emit_objects(self, program: Program, directory: str) -> list[str]:
+        """
+        Emits one object file per partition into `directory`, plus one defining the
+        runtime's trap key (no Python process provides it there), and returns their paths.
+        """
+        os.makedirs(directory, exist_ok=True)
+        objects: dict[str, bytes] = {
+            f"partition_{i}.o": object_code
+            for i, object_code in enumerate(self.__run(partial(emit_partition, multiversion=self.multiversion), program))
+        }
+        objects["trap_key.o"] = Optimizer.create_target_machine(reloc="pic").emit_object(llvm.parse_assembly(TRAP_KEY_DEFINITION))
+
+        paths: list[str] = []
+        for name, object_code in objects.items():
+            path = os.path.join(directory, name)
+            with open(path, "wb") as f:
+                f.write(object_code)
+            paths.append(path)
+        return paths
+
+    def build_shared_library(self, program: Program, output: str, linker: str = "cc") -> str:
+        """Emits the partitions in parallel and links them into a shared library with the system linker."""
+        objects = self.emit_objects(program, os.path.join(os.path.dirname(os.path.abspath(output)), "objects"))
+        subprocess.run([linker, "-shared", "-o", output, *objects], check=True)
+        return output
+
+    def partition(self, functions: list[FunctionStatement]) -> list[list[FunctionStatement]]:
+        """
+        Splits functions into at most `workers` partitions of similar size, placing the
+        largest functions first (longest processing time first), using the size of
+        the AST as the cost estimate.
+        """
+        count = max(1, min(self.workers, len(functions)))
+        partitions: list[list[FunctionStatement]] = [[] for _ in range(count)]
+        costs: list[int] = [0] * count
+
+        sizes = {id(function): len(json.dumps(function.json())) for function in functions}
+        for function in sorted(functions, key=lambda f: sizes[id(f)], reverse=True):
+            cheapest = costs.index(min(costs))
+            partitions[cheapest].append(function)
+            costs[cheapest] += sizes[id(function)]
+
+        # keep source order inside a partition, so a function is defined before its callers
+        order = {id(function): i for i, function in enumerate(functions)}
+        return [sorted(p, key=lambda f: order[id(f)]) for p in partitions if len(p) > 0]
+
+    def __run(self, worker, program: Program) -> list[bytes]:
+        functions: list[FunctionStatement] = []
+        for statement in program.statements:
+            if statement.type() != NodeType.FunctionStatement:
+                raise ValueError(f"Only function statements can be compiled in parallel, got {statement.type().value}.")
+            functions.append(statement)
+        if len(functions) == 0:
+            raise ValueError("Program has no functions to compile.")
+
+        signatures = program_signatures(functions)
+        partitions = self.partition(functions)
+
+        # a pool is pure overhead for a single partition
+        if len(partitions) == 1:
+            return [worker(partitions[0], signatures, self.speed_level)]
+
+        with ProcessPoolExecutor(max_workers=len(partitions)) as pool:
+            futures = [pool.submit(worker, p, signatures, self.speed_level) for p in partitions]
+            return [future.result() for future in futures]
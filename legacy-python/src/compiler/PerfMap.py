@@ -0,0 +1,88 @@
+import os
+import struct
+
+import llvmlite.binding as llvm
+
+from src.ast.statement.FunctionStatement import FunctionStatement
+
+# ELF constants used to read function symbols out of the JIT's object code
+SHT_SYMTAB: int = 2
+STT_FUNC: int = 2
+STB_LOCAL: int = 0
+
+
+def function_symbols(elf: bytes) -> list[tuple[str, int, int, int, bool]]:
+    """
+    Returns (name, section index, offset, size, is_local) of every function
+    defined in a little-endian ELF64 object, or nothing for other formats.
+    """
+    if elf[:4] != b"\x7fELF" or elf[4] != 2 or elf[5] != 1:
+        return []
+
+    section_offset, = struct.unpack_from("<Q", elf, 0x28)
+    section_size, section_count = struct.unpack_from("<HH", elf, 0x3A)
+    sections = [struct.unpack_from("<IIQQQQIIQQ", elf, section_offset + i * section_size) for i in range(section_count)]
+
+    symbols = []
+    for _, kind, _, _, offset, size, link, _, _, entry_size in sections:
+        if kind != SHT_SYMTAB:
+            continue
+        names_offset = sections[link][4]
+        for start in range(offset, offset + size, entry_size):
+            name_offset, info, _, section, value, symbol_size = struct.unpack_from("<IBBHQQ", elf, start)
+            if info & 0xF != STT_FUNC or section == 0 or symbol_size == 0:
+                continue
+            end = elf.index(b"\0", names_offset + name_offset)
+            name = elf[names_offset + name_offset:end].decode("utf-8")
+            symbols.append((name, section, value, symbol_size, info >> 4 == STB_LOCAL))
+    return symbols
+
+
+class PerfMap:
+    """
+    Writes `/tmp/perf-<pid>.map`, which `perf report` reads to name samples
+    that land in JIT-compiled code: one "START SIZE name" line per function.
+
+    `attach` an engine before its code is generated, so the object code can
+    be captured, then `record` it once `finalize_object` has placed it. User
+    functions are named "name [file:line]" when their source lines are known.
+
+    Only ELF objects (Linux, where perf runs) are read; elsewhere nothing is written.
+    """
+    def __init__(self, path: str | None = None, source: str | None = None) -> None:
+        self.path = path if path is not None else f"/tmp/perf-{os.getpid()}.map"
+        self.source = os.path.basename(source) if source is not None else None
+        # object code per attached engine, by id(engine)
+        self.objects: dict[int, list[bytes]] = {}
+
+    def attach(self, engine: llvm.ExecutionEngine) -> None:
+        objects = self.objects.setdefault(id(engine), [])
+        engine.set_object_cache(lambda module, buffer: objects.append(bytes(buffer)), None)
+
+    def record(self, engine: llvm.ExecutionEngine, functions: list[FunctionStatement] | None = None) -> None:
+        lines = {f.name.value: f.line_no for f in functions or [] if f.line_no > 0}
+
+        entries = []
+        for elf in self.objects.pop(id(engine), []):
+            symbols = function_symbols(elf)
+
+            # Local symbols have no address in the engine, but share their
+            # section's load address with the exported ones
+            bases: dict[int, int] = {}
+            for name, section, offset, _, is_local in symbols:
+                if not is_local and section not in bases:
+                    address = engine.get_function_address(name)
+                    if address != 0:
+                        bases[section] = address - offset
+
+            for name, section, offset, size, _ in symbols:
+                if section in bases:
+                    entries.append(f"{bases[section] + offset:x} {size:x} {self.__label(name, lines)}\n")
+
+        with open(self.path, "a") as f:
+            f.writelines(entries)
+
+    def __label(self, name: str, lines: dict[str, int]) -> str:
+        if name in lines and self.source is not None:
+            return f"{name} [{self.source}:{lines[name]}]"
+        return name
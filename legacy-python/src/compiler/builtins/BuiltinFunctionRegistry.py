@@ -5,53 +5,117 @@ from src.compiler.utils.TypeCoercion import TypeCoercion
 
 
 class BuiltinFunction:
-    """Base class for all built-in function handlers."""
+    """
+    Base class for all built-in function handlers.
+
+    The registry creates one handler per compiler, so per module, and reuses it
+    for every call. Handlers whose lowering is more than a call or two put it in
+    `emit` and return `specialize(...)` from `handle`: the lowering is then
+    emitted once per module and argument types, as an internal helper function
+    such as `mylang.sum.list_int`, and every call site is a single call to it.
+    """
+    name: str = ""
+
     def __init__(self, compiler) -> None:
         self.compiler = compiler
+        # argument types -> helper function emitted for them
+        self.helpers: Dict[tuple[str, ...], ir.Function] = {}
 
     def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
         """Override this in subclasses to handle the built-in function."""
         raise NotImplementedError("Built-in function handler must implement 'handle'.")
 
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        """Override this in subclasses that `specialize`, to emit the body of the helper function."""
+        raise NotImplementedError("Specialized built-in function handler must implement 'emit'.")
+
+    def specialize(self, args: list[ir.Value], types: list[ir.Type], return_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """Calls the helper for `types`, emitting it with `emit` the first time."""
+        key = tuple(str(Type) for Type in types)
+        if key not in self.helpers:
+            self.helpers[key] = self.__emit_helper(types, return_type)
+        return self.compiler.builder.call(self.helpers[key], args), return_type
+
+    def type_name(self, Type: ir.Type) -> str:
+        """Source level name of a type, e.g. `int`, `list_float` or `map_str_int`."""
+        compiler = self.compiler
+        if compiler.lists.is_list(Type):
+            return f"list_{self.type_name(compiler.lists.element_type(Type))}"
+        if compiler.sets.is_set(Type):
+            return f"set_{self.type_name(compiler.sets.element_type(Type))}"
+        if compiler.maps.is_map(Type):
+            return f"map_{self.type_name(compiler.maps.key_type(Type))}_{self.type_name(compiler.maps.value_type(Type))}"
+        return next((name for name, known in self.compiler.type_map.items() if known == Type), str(Type))
+
+    def __emit_helper(self, types: list[ir.Type], return_type: ir.Type) -> ir.Function:
+        compiler = self.compiler
+        name = f"mylang.{self.name}.{'.'.join(self.type_name(Type) for Type in types)}"
+        function = ir.Function(compiler.module, ir.FunctionType(return_type, types), name=name)
+        function.linkage = "internal"
+
+        previous_builder = compiler.builder
+        compiler.builder = ir.IRBuilder(function.append_basic_block(f"{name}_entry"))
+
+        value = self.emit(list(function.args), types)
+        if not compiler.builder.block.is_terminated:
+            if isinstance(return_type, ir.VoidType):
+                compiler.builder.ret_void()
+            else:
+                compiler.builder.ret(value)
+
+        compiler.builder = previous_builder
+        return function
+
 class BuiltinFunctionRegistry:
-    """Registry for managing built-in functions."""
-    def __init__(self) -> None:
+    """Registry for managing built-in functions, with one handler instance per compiler."""
+    def __init__(self, compiler=None) -> None:
+        self.compiler = compiler
         self.registry: Dict[str, Callable] = {}
+        self.handlers: Dict[str, BuiltinFunction] = {}
 
     def register(self, name: str, handler_class: Callable) -> None:
         """Register a built-in function handler."""
         self.registry[name] = handler_class
 
-    def get(self, name: str) -> Callable:
-        """Retrieve the handler class for a built-in function."""
-        return self.registry.get(name)
+    def get(self, name: str) -> BuiltinFunction | None:
+        """Retrieve the handler for a built-in function, creating it on first use."""
+        if name not in self.handlers:
+            handler_class = self.registry.get(name)
+            if handler_class is None:
+                return None
+            self.handlers[name] = handler_class(self.compiler)
+        return self.handlers[name]
 
 
 class PrintBuiltin(BuiltinFunction):
     """Handler for the 'print' built-in function."""
+    name = "print"
+
+    def __init__(self, compiler) -> None:
+        super().__init__(compiler)
+        self.coercion = TypeCoercion(compiler)
+
     def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
         if len(args) != 1:
             raise ValueError("print() expects exactly one argument.")
 
-        value = args[0]
-        value_type = types[0]
-
-        # Coerce the value to a string if necessary
-        if value_type != self.compiler.type_map["str"]:
-            coercion_helper = TypeCoercion(self.compiler)
-            value = coercion_helper.coerce_to_str(value, value_type)
-
-        # Declare or retrieve the 'puts' function
-        if "puts" not in self.compiler.module.globals:
-            voidptr_ty = ir.IntType(8).as_pointer()  # i8*
-            puts_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=False)
-            puts_fn = ir.Function(self.compiler.module, puts_ty, name="puts")
+        # Strings go straight to the runtime, anything else through a helper
+        # that owns the conversion buffer
+        if types[0] != self.compiler.type_map["str"]:
+            self.specialize(args, types, ir.VoidType())
         else:
-            puts_fn = self.compiler.module.globals["puts"]
-
-        # Call 'puts' with the coerced string
-        self.compiler.builder.call(puts_fn, [value])
+            self.emit(args, types)
 
         # Return void (no meaningful return value for 'print')
         return None, ir.VoidType()
 
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> None:
+        value, value_type = args[0], types[0]
+
+        # Coerce the value to a string if necessary
+        if value_type != self.compiler.type_map["str"]:
+            value = self.coercion.coerce_to_str(value, value_type, scratch=True)
+
+        # Write the string and a newline, the runtime reads the length from the string header
+        self.compiler.runtime.call("mylang_print", [value])
+
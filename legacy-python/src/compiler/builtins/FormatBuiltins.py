@@ -0,0 +1,212 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+from src.compiler.utils.TypeCoercion import TypeCoercion
+from src.format.FormatPlan import FormatPlan, FormatSpec
+
+I64 = ir.IntType(64)
+
+# Conversions the compiled backend lowers, and flags it understands
+COMPILED_CONVERSIONS: str = "diufs"
+COMPILED_FLAGS: str = "-0"
+
+# Widest text of a conversion without width: "-2147483648", and "%.*f" of -FLT_MAX
+INT_WIDTH: int = 11
+FLOAT_WIDTH: int = 41
+DEFAULT_PRECISION: int = 6
+
+
+class FormatBuiltin(BuiltinFunction):
+    """
+    Base class for `printf` and `sprintf`.
+
+    The format string must be a literal. It is parsed into a `FormatPlan` at
+    compile time, and every conversion is lowered to a direct call into the
+    runtime (`mylang_format_int_digits`, `mylang_format_fixed`) or a copy,
+    all writing into a single buffer sized for the widest possible result.
+    Nothing parses a format at runtime.
+
+    The heap strings the lowering makes on the way, `to_str` of a list
+    argument, are freed once copied. So is `printf`'s buffer after printing
+    when it is on the heap, which it is whenever a `%s` has a runtime length.
+
+    Supported: `%d`, `%i`, `%u`, `%f` and `%s` with the `-` and `0` flags,
+    a width and a precision. Other conversions are compile errors, the
+    interpreter supports everything Python's `%` does.
+    """
+    def __init__(self, compiler) -> None:
+        super().__init__(compiler)
+        self.coercion = TypeCoercion(compiler)
+
+    def format(self, args: list[ir.Value], types: list[ir.Type], on_stack: bool) -> tuple[ir.Value, bool]:
+        """
+        Emits the formatting and returns the length-prefixed result, and
+        whether it is on the heap. With `on_stack`, results of bounded length
+        are built in a stack buffer.
+        """
+        plan = self.plan(args, types)
+        strings = self.compiler.strings
+        builder = self.compiler.builder
+
+        # Convert the arguments first, so the buffer can be sized in one go
+        temporaries: list[ir.Value] = []
+        values = [self.__convert(spec, value, Type, temporaries) for spec, value, Type in zip(plan.specs, args[1:], types[1:])]
+
+        capacity = sum(len(literal.encode("utf-8")) for literal in plan.literals)
+        capacity += sum(self.__width(spec) for spec in plan.specs)
+        lengths = [length for _, length in values if length is not None]
+        if lengths:
+            total = ir.Constant(I64, capacity)
+            for length in lengths:
+                total = builder.add(total, length)
+            buffer, on_heap = strings.allocate(total), True
+        elif on_stack:
+            buffer, on_heap = strings.stack_buffer(capacity, name=f"{self.name}_buf"), False
+        else:
+            buffer, on_heap = strings.allocate(ir.Constant(I64, capacity)), True
+
+        offset = self.__write_literal(buffer, ir.Constant(I64, 0), plan.literals[0])
+        for spec, value, literal in zip(plan.specs, values, plan.literals[1:]):
+            offset = builder.add(offset, self.__write_conversion(builder.gep(buffer, [offset]), spec, value))
+            offset = self.__write_literal(buffer, offset, literal)
+
+        strings.set_length(buffer, offset)
+        for temporary in temporaries:
+            strings.free(temporary)
+        return buffer, on_heap
+
+    def plan(self, args: list[ir.Value], types: list[ir.Type]) -> FormatPlan:
+        """Parses the literal format of a call and checks it against the arguments."""
+        if len(args) == 0 or types[0] != self.compiler.type_map["str"]:
+            raise ValueError(f"{self.name}() expects a format string as its first argument.")
+
+        format_string = self.compiler.strings.text_of(args[0])
+        if format_string is None:
+            raise ValueError(f"{self.name}() needs a string literal as its format in compiled code.")
+
+        plan = FormatPlan.parse(format_string)
+        for spec in plan.specs:
+            if spec.conversion not in COMPILED_CONVERSIONS or "*" in (spec.width, spec.precision) \
+                    or any(flag not in COMPILED_FLAGS for flag in spec.flags):
+                raise ValueError(f"{self.name}() does not support '{spec}' in compiled code.")
+
+        if plan.arguments > len(args) - 1:
+            raise ValueError(f"{self.name}(): not enough arguments for format string '{format_string}'.")
+        if plan.arguments < len(args) - 1:
+            raise ValueError(f"{self.name}(): not all arguments converted for format string '{format_string}'.")
+        return plan
+
+    # region Lowering
+
+    def __convert(self, spec: FormatSpec, value: ir.Value, Type: ir.Type,
+                  temporaries: list[ir.Value]) -> tuple[ir.Value, ir.Value | None]:
+        """
+        Converts an argument to what `spec` formats: an i32 for integer
+        conversions, a float for `%f` and a string for `%s`. Strings also
+        come with their runtime length, which counts toward the buffer size.
+        Heap strings made here are added to `temporaries`.
+        """
+        builder = self.compiler.builder
+        type_map = self.compiler.type_map
+
+        if spec.conversion == "s":
+            if self.compiler.lists.is_list(Type):
+                value, Type = self.compiler.builtin_registry.get("to_str").handle([value], [Type])
+                temporaries.append(value)
+            elif Type != type_map["str"]:
+                # copied into the result right away, so a scratch buffer will do
+                value, Type = self.coercion.coerce_to_str(value, Type, scratch=True), type_map["str"]
+            return value, self.compiler.strings.length(value)
+
+        if spec.conversion == "f":
+            if Type == type_map["int"]:
+                return builder.sitofp(value, type_map["float"]), None
+            if Type == type_map["bool"]:
+                return builder.uitofp(value, type_map["float"]), None
+        else:
+            if Type == type_map["float"]:
+                return builder.fptosi(value, type_map["int"]), None
+            if Type == type_map["bool"]:
+                return builder.zext(value, type_map["int"]), None
+
+        if Type not in (type_map["int"], type_map["float"]):
+            raise TypeError(f"{self.name}(): '{spec}' needs a number, got '{Type}'.")
+        return value, None
+
+    def __width(self, spec: FormatSpec) -> int:
+        """Most bytes `spec` writes, besides the length of a `%s` argument."""
+        if spec.conversion == "s":
+            text = 0
+        elif spec.conversion == "f":
+            text = FLOAT_WIDTH + self.__precision(spec)
+        else:
+            text = max(INT_WIDTH, 1 + self.__precision(spec))
+        return max(text, spec.width or 0)
+
+    def __precision(self, spec: FormatSpec) -> int:
+        if spec.precision is not None:
+            return spec.precision
+        return DEFAULT_PRECISION if spec.conversion == "f" else 1
+
+    def __write_literal(self, buffer: ir.Value, offset: ir.Value, literal: str) -> ir.Value:
+        if literal == "":
+            return offset
+        strings = self.compiler.strings
+        length = ir.Constant(I64, len(literal.encode("utf-8")))
+        strings.copy(self.compiler.builder.gep(buffer, [offset]), strings.constant(literal), length)
+        return self.compiler.builder.add(offset, length)
+
+    def __write_conversion(self, destination: ir.Value, spec: FormatSpec, value: tuple[ir.Value, ir.Value | None]) -> ir.Value:
+        """Writes one conversion at `destination` and returns the number of bytes written."""
+        builder = self.compiler.builder
+        runtime = self.compiler.runtime
+        text, length = value
+
+        # Padding needs the text first, so it goes through a scratch buffer
+        target = destination
+        if spec.width and spec.conversion != "s":
+            target = self.compiler.strings.stack_buffer(self.__width(spec), name="conversion_buf")
+
+        if spec.conversion == "s":
+            if spec.precision is not None:
+                limit = ir.Constant(I64, spec.precision)
+                length = builder.select(builder.icmp_unsigned("<", length, limit), length, limit)
+        elif spec.conversion == "f":
+            precision = ir.Constant(ir.IntType(32), self.__precision(spec))
+            text, length = target, runtime.call("mylang_format_fixed", [target, value[0], precision])
+        else:
+            min_digits = ir.Constant(I64, self.__precision(spec))
+            text, length = target, runtime.call("mylang_format_int_digits", [target, value[0], min_digits])
+
+        if spec.width:
+            left = ir.Constant(ir.IntType(1), "-" in spec.flags)
+            zeros = ir.Constant(ir.IntType(1), "0" in spec.flags and spec.conversion != "s")
+            width = ir.Constant(I64, spec.width)
+            return runtime.call("mylang_format_padded", [destination, text, length, width, left, zeros])
+
+        if spec.conversion == "s":
+            self.compiler.strings.copy(destination, text, length)
+        return length
+
+    # endregion
+
+
+class PrintfBuiltin(FormatBuiltin):
+    """Handler for `printf(format, ...)`, which prints the formatted text and a newline."""
+    name = "printf"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        text, on_heap = self.format(args, types, on_stack=True)
+        self.compiler.runtime.call("mylang_print", [text])
+        if on_heap:
+            self.compiler.strings.free(text)
+        return None, ir.VoidType()
+
+
+class SprintfBuiltin(FormatBuiltin):
+    """Handler for `sprintf(format, ...)`, which returns the formatted text as a new string."""
+    name = "sprintf"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        text, _ = self.format(args, types, on_stack=False)
+        return text, self.compiler.type_map["str"]
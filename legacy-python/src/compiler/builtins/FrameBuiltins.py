@@ -0,0 +1,75 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+
+class FrameBuiltinBase(BuiltinFunction):
+    """Base class for the frame builtins, whose column names are known at compile time."""
+    def column_name(self, value: ir.Value) -> str:
+        name = self.compiler.strings.text_of(value)
+        if name is None:
+            raise TypeError(f"{self.name}() column names must be string literals.")
+        return name
+
+    def check_frame(self, Type: ir.Type) -> None:
+        if not self.compiler.frames.is_frame(Type):
+            raise TypeError(f"{self.name}() expects a frame as its first argument, got '{Type}'.")
+
+
+class VectorBuiltin(BuiltinFunction):
+    """Handler for `vector(list)`, a new vector of the list's elements."""
+    name = "vector"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 1 or not self.compiler.frames.is_vector(types[0]):
+            raise ValueError("vector() expects one list of int, float or bool.")
+        return self.specialize(args, types, types[0])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        value, _ = self.compiler.frames.vector(args[0], types[0])
+        return value
+
+
+class FrameBuiltin(FrameBuiltinBase):
+    """Handler for `frame("a", xs, "b", ys, ...)`, a frame of the named columns."""
+    name = "frame"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) == 0 or len(args) % 2 != 0:
+            raise ValueError("frame() expects pairs of a column name and its values.")
+        columns = [(self.column_name(args[i]), args[i + 1], types[i + 1]) for i in range(0, len(args), 2)]
+        return self.compiler.frames.frame(columns)
+
+
+class ColumnBuiltin(FrameBuiltinBase):
+    """Handler for `column(frame, "a")`, the column's vector, without a copy."""
+    name = "column"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 2:
+            raise ValueError("column() expects a frame and a column name.")
+        self.check_frame(types[0])
+        return self.compiler.frames.column(args[0], self.column_name(args[1]))
+
+
+class RowsBuiltin(FrameBuiltinBase):
+    """Handler for `rows(frame)`, the length of the frame's columns."""
+    name = "rows"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 1:
+            raise ValueError("rows() expects a frame.")
+        self.check_frame(types[0])
+        int_type = self.compiler.type_map["int"]
+        return self.compiler.builder.trunc(self.compiler.frames.rows(args[0]), int_type), int_type
+
+
+class WithColumnBuiltin(FrameBuiltinBase):
+    """Handler for `with_column(frame, "a", xs)`, a new frame with column `a` added or replaced."""
+    name = "with_column"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 3:
+            raise ValueError("with_column() expects a frame, a column name and its values.")
+        self.check_frame(types[0])
+        return self.compiler.frames.with_column(args[0], self.column_name(args[1]), args[2], types[2])
@@ -0,0 +1,68 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+
+class MapBuiltin(BuiltinFunction):
+    """Base class for the map builtins, which take the map first and lower through `MapOperations`."""
+    arity: tuple[int, ...] = (1,)
+    usage: str = "a map"
+
+    def check(self, args: list[ir.Value], types: list[ir.Type]) -> None:
+        if len(args) not in self.arity or not self.compiler.maps.is_map(types[0]):
+            raise ValueError(f"{self.name}() expects {self.usage}.")
+
+
+class GetBuiltin(MapBuiltin):
+    """Handler for `get(map, key)` and `get(map, key, default)`, a runtime error for a missing key without a default."""
+    name = "get"
+    arity = (2, 3)
+    usage = "a map, a key and an optional default"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        self.check(args, types)
+        maps = self.compiler.maps
+        value_type = maps.value_type(types[0])
+        default = maps.item(args[2], types[2], value_type, "values") if len(args) == 3 else None
+        return maps.get(args[0], args[1], types[1], default), value_type
+
+
+class SetBuiltin(MapBuiltin):
+    """
+    Handler for `set(map, key, value)`, which updates the map in place and
+    returns it, and for `set(list)`, a set of the list's elements (see `SetOperations`).
+    """
+    name = "set"
+    arity = (3,)
+    usage = "a map, a key and a value, or a list"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        lists = self.compiler.lists
+        if len(args) == 1 and lists.is_list(types[0]):
+            return self.specialize(args, types, self.compiler.sets.set_type(lists.element_type(types[0])))
+        self.check(args, types)
+        maps = self.compiler.maps
+        maps.set(args[0], args[1], types[1], maps.item(args[2], types[2], maps.value_type(types[0]), "values"))
+        return args[0], types[0]
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        value, _ = self.compiler.sets.build(args[0], types[0])
+        return value
+
+
+class KeysBuiltin(MapBuiltin):
+    """Handler for `keys(map)`, a new list of the keys in insertion order."""
+    name = "keys"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        self.check(args, types)
+        return self.compiler.maps.keys(args[0])
+
+
+class ValuesBuiltin(MapBuiltin):
+    """Handler for `values(map)`, a new list of the values in insertion order."""
+    name = "values"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        self.check(args, types)
+        return self.compiler.maps.values(args[0])
@@ -0,0 +1,61 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+
+class PowBuiltin(BuiltinFunction):
+    """
+    Handler for `pow(base, exponent)`, the same as `base ^ exponent`, including on lists.
+    The list loop is emitted once per module and argument types.
+    """
+    name = "pow"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 2:
+            raise ValueError("pow() expects exactly 2 arguments.")
+        lists = self.compiler.lists
+        if lists.is_list(types[0]) or lists.is_list(types[1]):
+            elements = [lists.element_type(Type) if lists.is_list(Type) else Type for Type in types]
+            is_float = any(isinstance(Type, ir.FloatType) for Type in elements)
+            result_element = self.compiler.type_map["float" if is_float else "int"]
+            return self.specialize(args, types, lists.list_type(result_element))
+        return self.compiler.math.power(args[0], types[0], args[1], types[1])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        value, _ = self.compiler.lists.elementwise("^", args[0], types[0], args[1], types[1])
+        return value
+
+
+class UnaryMathBuiltin(BuiltinFunction):
+    """
+    Base class for math builtins of one argument, which always return floats.
+    Scalars are a single intrinsic call, the list loop is emitted once per module and list type.
+    """
+    name: str = ""
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 1:
+            raise ValueError(f"{self.name}() expects exactly one argument.")
+        lists = self.compiler.lists
+        if lists.is_list(types[0]):
+            return self.specialize(args, types, lists.list_type(self.compiler.type_map["float"]))
+        return self.compiler.math.unary(self.name, args[0], types[0])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        value, _ = self.compiler.math.unary(self.name, args[0], types[0])
+        return value
+
+
+class SqrtBuiltin(UnaryMathBuiltin):
+    """Handler for `sqrt(x)`. Negative inputs give NaN."""
+    name = "sqrt"
+
+
+class LogBuiltin(UnaryMathBuiltin):
+    """Handler for `log(x)`, the natural logarithm. 0 gives -inf, negative inputs give NaN."""
+    name = "log"
+
+
+class ExpBuiltin(UnaryMathBuiltin):
+    """Handler for `exp(x)`, e raised to `x`. Overflow gives inf."""
+    name = "exp"
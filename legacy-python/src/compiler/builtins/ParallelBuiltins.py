@@ -0,0 +1,184 @@
+import os
+from typing import Callable
+
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+from src.interpreter.WorkerPool import DEFAULT_CHUNKS
+
+I8_PTR = ir.IntType(8).as_pointer()
+I64 = ir.IntType(64)
+
+
+class ParallelBuiltin(BuiltinFunction):
+    """
+    Base class for `par_map` and `par_reduce`.
+
+    The loop over the list is emitted as a body function `void(i8* context,
+    i64 start, i64 end)`, once per module and user function, and run by the
+    runtime's `mylang_parallel_for` on a native thread pool, `par_workers`
+    threads taking chunks of `par_chunk_size` elements. As in the
+    interpreter, workers default to `os.cpu_count()` and chunks to
+    1/`DEFAULT_CHUNKS` of the list. Results are stored per index or per
+    chunk, so they don't depend on scheduling.
+
+    Functions that can print share the runtime's output buffer, so they run
+    on the calling thread alone, in order. Which ones can is decided from
+    the source (`Compiler.printing`), as a function compiled in a module of
+    its own may only be declared in the module calling `par_map` on it.
+    """
+    def callee(self, args: list[ir.Value], arity: int) -> ir.Function:
+        """The user function passed as the first argument, checked to take `arity` parameters."""
+        if len(args) == 0 or not isinstance(args[0], ir.Function):
+            raise ValueError(f"{self.name}() expects a function as its first argument.")
+        function: ir.Function = args[0]
+        if len(function.function_type.args) != arity:
+            raise TypeError(f"{self.name}(): '{function.name}' must take {arity} argument(s).")
+        return function
+
+    def body(self, function: ir.Function, context_type: ir.Type, emit: Callable[[ir.Value, ir.Value, ir.Value], None]) -> ir.Function:
+        """
+        Emits the body function for `function` once, with `emit(context,
+        start, end)` writing the loop over [start, end).
+        """
+        key = (function.name,)
+        if key in self.helpers:
+            return self.helpers[key]
+
+        compiler = self.compiler
+        name = f"mylang.{self.name}.{function.name}"
+        body = ir.Function(compiler.module, ir.FunctionType(ir.VoidType(), [I8_PTR, I64, I64]), name=name)
+        body.linkage = "internal"
+
+        previous_builder = compiler.builder
+        compiler.builder = ir.IRBuilder(body.append_basic_block(f"{name}_entry"))
+        context, start, end = body.args
+        emit(compiler.builder.bitcast(context, context_type.as_pointer()), start, end)
+        compiler.builder.ret_void()
+        compiler.builder = previous_builder
+
+        self.helpers[key] = body
+        return body
+
+    def chunk(self, count: ir.Value) -> ir.Value:
+        """Chunk size for a list of `count` elements: the configured one, or ceil(count / DEFAULT_CHUNKS)."""
+        if self.compiler.par_chunk_size is not None:
+            return ir.Constant(I64, self.compiler.par_chunk_size)
+        builder = self.compiler.builder
+        chunks = ir.Constant(I64, DEFAULT_CHUNKS)
+        size = builder.udiv(builder.add(count, ir.Constant(I64, DEFAULT_CHUNKS - 1)), chunks)
+        one = ir.Constant(I64, 1)
+        return builder.select(builder.icmp_unsigned("<", size, one), one, size)
+
+    def run(self, function: ir.Function, body: ir.Function, context: ir.Value, count: ir.Value, chunk: ir.Value) -> None:
+        workers = 1 if function.name in self.compiler.printing else self.compiler.par_workers or os.cpu_count() or 1
+        builder = self.compiler.builder
+        self.compiler.runtime.call("mylang_parallel_for", [
+            builder.bitcast(body, I8_PTR),
+            builder.bitcast(context, I8_PTR),
+            count,
+            chunk,
+            ir.Constant(ir.IntType(32), workers),
+        ])
+
+    def field(self, pointer: ir.Value, index: int) -> ir.Value:
+        """Pointer to field `index` of the struct at `pointer`."""
+        return self.compiler.builder.gep(pointer, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), index)])
+
+    def element_value(self, value: ir.Value, Type: ir.Type, expected: ir.Type) -> ir.Value:
+        """`value` as an `expected` value, converting ints to floats."""
+        if Type == expected:
+            return value
+        if Type == self.compiler.type_map["int"] and expected == self.compiler.type_map["float"]:
+            return self.compiler.builder.sitofp(value, expected)
+        raise TypeError(f"{self.name}(): expected '{expected}', got '{Type}'.")
+
+
+class ParMapBuiltin(ParallelBuiltin):
+    """Handler for `par_map(f, list)`, a new list of `f(x)` for every element, computed in parallel."""
+    name = "par_map"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        lists = self.compiler.lists
+        if len(args) != 2 or not lists.is_list(types[1]):
+            raise ValueError("par_map() expects a function and a list.")
+
+        function = self.callee(args, 1)
+        element_type = lists.element_type(types[1])
+        if function.function_type.args[0] != element_type:
+            raise TypeError(f"par_map(): '{function.name}' doesn't take '{element_type}' elements.")
+        result_type = function.function_type.return_type
+        # { elements, results }
+        context_type = ir.LiteralStructType([element_type.as_pointer(), result_type.as_pointer()])
+
+        def emit(context: ir.Value, start: ir.Value, end: ir.Value) -> None:
+            builder = self.compiler.builder
+            elements = builder.load(self.field(context, 0))
+            results = builder.load(self.field(context, 1))
+            with lists.for_range(end, start=start) as i:
+                value = builder.call(function, [builder.load(builder.gep(elements, [i]))])
+                builder.store(value, builder.gep(results, [i]))
+
+        body = self.body(function, context_type, emit)
+
+        builder = self.compiler.builder
+        count = lists.length(args[1])
+        results = lists.allocate(result_type, count)
+        context = self.compiler.alloca(context_type, name="par_map_context")
+        builder.store(lists.data(args[1]), self.field(context, 0))
+        builder.store(results, self.field(context, 1))
+        self.run(function, body, context, count, self.chunk(count))
+        return lists.make(results, count), lists.list_type(result_type)
+
+
+class ParReduceBuiltin(ParallelBuiltin):
+    """
+    Handler for `par_reduce(f, list, initial)`, which reduces the list with an
+    associative `f(a, b)`. Every chunk is reduced in parallel, then the
+    chunks' results are folded into `initial` in order on the calling thread.
+    """
+    name = "par_reduce"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        lists = self.compiler.lists
+        if len(args) != 3 or not lists.is_list(types[1]):
+            raise ValueError("par_reduce() expects a function, a list and an initial value.")
+
+        function = self.callee(args, 2)
+        element_type = lists.element_type(types[1])
+        if list(function.function_type.args) != [element_type, element_type] or function.function_type.return_type != element_type:
+            raise TypeError(f"par_reduce(): '{function.name}' must take two '{element_type}' values and return one.")
+        initial = self.element_value(args[2], types[2], element_type)
+        # { elements, chunk results, chunk size }
+        context_type = ir.LiteralStructType([element_type.as_pointer(), element_type.as_pointer(), I64])
+
+        def emit(context: ir.Value, start: ir.Value, end: ir.Value) -> None:
+            builder = self.compiler.builder
+            elements = builder.load(self.field(context, 0))
+            partials = builder.load(self.field(context, 1))
+            chunk = builder.load(self.field(context, 2))
+            accumulator = self.compiler.alloca(element_type, name="accumulator")
+            builder.store(builder.load(builder.gep(elements, [start])), accumulator)
+            with lists.for_range(end, start=builder.add(start, ir.Constant(I64, 1))) as i:
+                value = builder.call(function, [builder.load(accumulator), builder.load(builder.gep(elements, [i]))])
+                builder.store(value, accumulator)
+            builder.store(builder.load(accumulator), builder.gep(partials, [builder.udiv(start, chunk)]))
+
+        body = self.body(function, context_type, emit)
+
+        builder = self.compiler.builder
+        count = lists.length(args[1])
+        chunk = self.chunk(count)
+        chunks = builder.udiv(builder.add(count, builder.sub(chunk, ir.Constant(I64, 1))), chunk)
+        partials = lists.allocate(element_type, chunks)
+        context = self.compiler.alloca(context_type, name="par_reduce_context")
+        builder.store(lists.data(args[1]), self.field(context, 0))
+        builder.store(partials, self.field(context, 1))
+        builder.store(chunk, self.field(context, 2))
+        self.run(function, body, context, count, chunk)
+
+        result = self.compiler.alloca(element_type, name="par_reduce_result")
+        builder.store(initial, result)
+        with lists.for_range(chunks) as i:
+            builder.store(builder.call(function, [builder.load(result), builder.load(builder.gep(partials, [i]))]), result)
+        return builder.load(result), element_type
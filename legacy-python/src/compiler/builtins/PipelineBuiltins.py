@@ -0,0 +1,29 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+
+class PipelineBuiltin(BuiltinFunction):
+    """
+    Base class for `map(list, f)`, `filter(list, f)` and `reduce(list, f, initial)`.
+    A call is a pipeline of one stage, lowered by `Pipelines.fuse`.
+    """
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) == 0:
+            raise ValueError(f"{self.name}() expects a list as its first argument.")
+        return self.compiler.pipelines.fuse(args[0], types[0], [(self.name, args[1:], types[1:])])
+
+
+class MapBuiltin(PipelineBuiltin):
+    """Handler for `map(list, f)`, a new list of `f(x)` for every element."""
+    name = "map"
+
+
+class FilterBuiltin(PipelineBuiltin):
+    """Handler for `filter(list, f)`, a new list of the elements for which `f(x)` is true."""
+    name = "filter"
+
+
+class ReduceBuiltin(PipelineBuiltin):
+    """Handler for `reduce(list, f, initial)`, which folds the list into `initial` with `f(accumulator, x)`."""
+    name = "reduce"
@@ -0,0 +1,64 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+
+class SetAlgebraBuiltin(BuiltinFunction):
+    """
+    Base class for `union(a, b)`, `intersection(a, b)` and `difference(a, b)`
+    of two sets of the same type, lowered by `SetOperations` once per module
+    and set type.
+    """
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        if len(args) != 2 or not self.compiler.sets.is_set(types[0]) or types[0] != types[1]:
+            raise ValueError(f"{self.name}() expects two sets of the same type.")
+        return self.specialize(args, types, types[0])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        return getattr(self.compiler.sets, self.name)(args[0], args[1])
+
+
+class UnionBuiltin(SetAlgebraBuiltin):
+    """Handler for `union(a, b)`, the elements in either set."""
+    name = "union"
+
+
+class IntersectionBuiltin(SetAlgebraBuiltin):
+    """Handler for `intersection(a, b)`, the elements in both sets."""
+    name = "intersection"
+
+
+class DifferenceBuiltin(SetAlgebraBuiltin):
+    """Handler for `difference(a, b)`, the elements of `a` that are not in `b`."""
+    name = "difference"
+
+
+class ContainsBuiltin(BuiltinFunction):
+    """Handler for `contains(set, element)` and `contains(map, key)`."""
+    name = "contains"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        compiler = self.compiler
+        if len(args) == 2 and compiler.maps.is_map(types[0]):
+            return compiler.maps.contains(args[0], args[1], types[1]), compiler.type_map["bool"]
+        if len(args) != 2 or not compiler.sets.is_set(types[0]):
+            raise ValueError("contains() expects a set or a map, and a value.")
+        return self.specialize(args, types, compiler.type_map["bool"])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        return self.compiler.sets.contains(args[0], args[1], types[1])
+
+
+class ElementsBuiltin(BuiltinFunction):
+    """Handler for `elements(set)`, a new list of the elements: ints ascending, strings in insertion order."""
+    name = "elements"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        sets = self.compiler.sets
+        if len(args) != 1 or not sets.is_set(types[0]):
+            raise ValueError("elements() expects a set.")
+        return self.specialize(args, types, self.compiler.lists.list_type(sets.element_type(types[0])))
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        value, _ = self.compiler.sets.elements(args[0])
+        return value
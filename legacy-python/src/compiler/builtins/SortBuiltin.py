@@ -0,0 +1,89 @@
+from llvmlite import ir
+
+from src.compiler.builtins.BuiltinFunctionRegistry import BuiltinFunction
+
+I64 = ir.IntType(64)
+
+# element type name -> runtime sort for it
+SORTERS: dict[str, str] = {
+    "int": "mylang_sort_i32",
+    "float": "mylang_sort_f32",
+}
+
+
+class SortBuiltin(BuiltinFunction):
+    """
+    Handler for `sort(list)` and `sort(list, key)`, a new list in ascending
+    order, of `key(x)` when a key function is given. Equal elements keep
+    their order.
+
+    The sorting itself is in the runtime, specialized by type instead of
+    calling a comparator: an LSD radix sort for ints and a merge sort for
+    floats. With a key, every key is computed once and sorted along with
+    its element's index, and the sorted indices gather the elements.
+    """
+    name = "sort"
+
+    def handle(self, args: list[ir.Value], types: list[ir.Type]) -> tuple[ir.Value, ir.Type]:
+        lists = self.compiler.lists
+        if len(args) not in (1, 2) or not lists.is_list(types[0]):
+            raise ValueError("sort() expects a list and an optional key function.")
+        if len(args) == 2:
+            return self.compiler.builder.call(self.__by_key(args[1], types[0]), args[:1]), types[0]
+
+        element_type = lists.element_type(types[0])
+        if self.type_name(element_type) not in SORTERS:
+            raise TypeError(f"sort() sorts lists of int or float, '{element_type}' elements need a key function.")
+        return self.specialize(args, types, types[0])
+
+    def emit(self, args: list[ir.Value], types: list[ir.Type]) -> ir.Value:
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        element_type = lists.element_type(types[0])
+        data, count = lists.data(args[0]), lists.length(args[0])
+
+        results = lists.allocate(element_type, count)
+        with lists.for_range(count) as i:
+            builder.store(builder.load(builder.gep(data, [i])), builder.gep(results, [i]))
+        self.compiler.runtime.call(SORTERS[self.type_name(element_type)], [results, ir.Constant(I64.as_pointer(), None), count])
+        return lists.make(results, count)
+
+    def __by_key(self, function: ir.Value, list_type: ir.Type) -> ir.Function:
+        """The helper sorting a `list_type` by `function`, emitted once per module."""
+        compiler = self.compiler
+        lists = compiler.lists
+        element_type = lists.element_type(list_type)
+        if not isinstance(function, ir.Function) or list(function.function_type.args) != [element_type]:
+            raise TypeError(f"sort(): the key must be a function taking one '{element_type}' element.")
+        key_type = function.function_type.return_type
+        if self.type_name(key_type) not in SORTERS:
+            raise TypeError(f"sort(): '{function.name}' must return int or float, got '{key_type}'.")
+
+        key = (str(list_type), function.name)
+        if key in self.helpers:
+            return self.helpers[key]
+
+        name = f"mylang.sort.{self.type_name(list_type)}.by.{function.name}"
+        helper = ir.Function(compiler.module, ir.FunctionType(list_type, [list_type]), name=name)
+        helper.linkage = "internal"
+
+        previous_builder = compiler.builder
+        builder = compiler.builder = ir.IRBuilder(helper.append_basic_block(f"{name}_entry"))
+        data, count = lists.data(helper.args[0]), lists.length(helper.args[0])
+
+        keys = lists.allocate(key_type, count)
+        order = lists.allocate(I64, count)
+        with lists.for_range(count) as i:
+            builder.store(builder.call(function, [builder.load(builder.gep(data, [i]))]), builder.gep(keys, [i]))
+            builder.store(i, builder.gep(order, [i]))
+        compiler.runtime.call(SORTERS[self.type_name(key_type)], [keys, order, count])
+
+        results = lists.allocate(element_type, count)
+        with lists.for_range(count) as i:
+            index = builder.load(builder.gep(order, [i]))
+            builder.store(builder.load(builder.gep(data, [index])), builder.gep(results, [i]))
+        builder.ret(lists.make(results, count))
+
+        compiler.builder = previous_builder
+        self.helpers[key] = helper
+        return helper
@@ -0,0 +1,160 @@
+import ctypes
+import hashlib
+import os
+from functools import lru_cache
+from threading import Lock
+
+from llvmlite import ir
+import llvmlite.binding as llvm
+
+RUNTIME_SOURCE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime.ll")
+# Overrides where assembled bitcode is cached, see `runtime_cache_dir`
+CACHE_DIR_VARIABLE: str = "MYLANG_CACHE_DIR"
+
+I8_PTR = ir.IntType(8).as_pointer()
+I64 = ir.IntType(64)
+
+# `%mylang_trap` of runtime.ll: a jmp_buf, then the message of the panic that jumped to it
+TRAP_TYPE = ir.LiteralStructType([ir.ArrayType(I64, 64), I8_PTR])
+
+# The pthread key runtime.ll keeps the innermost trap of a thread under
+# (`@mylang_trap.key`), one for the process, created by `register_trap_key`
+TRAP_KEY: ctypes.c_uint32 | None = None
+TRAP_KEY_LOCK = Lock()
+
+# Defines `@mylang_trap.key` for code that runs outside of this process, such
+# as a shared library, creating the key when the library is loaded
+TRAP_KEY_DEFINITION: str = """
+@mylang_trap.key = hidden global i32 0
+@llvm.global_ctors = appending global [1 x { i32, ptr, ptr }] [{ i32, ptr, ptr } { i32 0, ptr @mylang_trap_create_key, ptr null }]
+
+declare i32 @pthread_key_create(ptr, ptr)
+
+define internal void @mylang_trap_create_key() {
+entry:
+  %1 = call i32 @pthread_key_create(ptr @mylang_trap.key, ptr null)
+  ret void
+}
+"""
+
+# name -> (return type, parameter types, function attributes) of every runtime.ll helper, or libc
+# function runtime.ll declares, the compiler calls
+SIGNATURES: dict[str, tuple[ir.Type, list[ir.Type], list[str]]] = {
+    "mylang_panic": (ir.VoidType(), [I8_PTR], ["noreturn", "cold"]),
+    "mylang_trap_push": (I8_PTR, [I8_PTR], []),
+    "mylang_trap_pop": (ir.VoidType(), [I8_PTR], []),
+    "_setjmp": (ir.IntType(32), [I8_PTR], ["returns_twice"]),
+    "mylang_alloc": (I8_PTR, [I64], []),
+    "mylang_str_alloc": (I8_PTR, [I64], []),
+    "mylang_str_free": (ir.VoidType(), [I8_PTR], []),
+    "mylang_print": (ir.VoidType(), [I8_PTR], []),
+    "mylang_output_write": (ir.VoidType(), [I8_PTR, I64], []),
+    "mylang_output_flush": (ir.VoidType(), [], []),
+    "mylang_output_configure": (ir.VoidType(), [ir.IntType(32), I64], []),
+    "mylang_parallel_for": (ir.VoidType(), [I8_PTR, I8_PTR, I64, I64, ir.IntType(32)], []),
+    "mylang_map_new": (I8_PTR, [ir.IntType(32), I64], []),
+    "mylang_map_count": (I64, [I8_PTR], []),
+    "mylang_map_keys": (ir.IntType(64).as_pointer(), [I8_PTR], []),
+    "mylang_map_values": (I8_PTR, [I8_PTR], []),
+    "mylang_map_get": (I8_PTR, [I8_PTR, I64], []),
+    "mylang_map_insert": (I8_PTR, [I8_PTR, I64], []),
+    "mylang_sort_i32": (ir.VoidType(), [ir.IntType(32).as_pointer(), I64.as_pointer(), I64], []),
+    "mylang_sort_f32": (ir.VoidType(), [ir.FloatType().as_pointer(), I64.as_pointer(), I64], []),
+    "mylang_int_to_str": (I8_PTR, [I8_PTR, ir.IntType(32)], []),
+    "mylang_float_to_str": (I8_PTR, [I8_PTR, ir.FloatType()], []),
+    "mylang_format_int_digits": (I64, [I8_PTR, ir.IntType(32), I64], []),
+    "mylang_format_fixed": (I64, [I8_PTR, ir.FloatType(), ir.IntType(32)], []),
+    "mylang_format_padded": (I64, [I8_PTR, I8_PTR, I64, I64, ir.IntType(1), ir.IntType(1)], []),
+    "mylang_list_int_to_str": (I8_PTR, [ir.IntType(32).as_pointer(), I64], []),
+    "mylang_list_float_to_str": (I8_PTR, [ir.FloatType().as_pointer(), I64], []),
+    "mylang_list_bool_to_str": (I8_PTR, [ir.IntType(1).as_pointer(), I64], []),
+}
+
+
+def runtime_cache_dir() -> str:
+    """
+    Where assembled bitcode is cached: $MYLANG_CACHE_DIR, else `mylang` in
+    the user's cache directory ($XDG_CACHE_HOME, or ~/.cache). Never next
+    to the source, which may be read-only, nor in the working directory.
+    """
+    if os.environ.get(CACHE_DIR_VARIABLE):
+        return os.environ[CACHE_DIR_VARIABLE]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "mylang")
+
+
+def runtime_bitcode(cache_dir: str | None = None) -> bytes:
+    """
+    Returns the runtime library as bitcode, assembling `runtime.ll` on a
+    cache miss. Bitcode is cached in `cache_dir` (`runtime_cache_dir()` by
+    default) under a hash of the source and the LLVM version; if it can't
+    be written there, only this process keeps it.
+    """
+    return _cached_runtime_bitcode(cache_dir or runtime_cache_dir())
+
+
+@lru_cache(maxsize=None)
+def _cached_runtime_bitcode(cache_dir: str) -> bytes:
+    with open(RUNTIME_SOURCE, "r") as f:
+        source = f.read()
+    payload = f"{llvm.llvm_version_info}\n{source}"
+    path = os.path.join(cache_dir, f"runtime-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}.bc")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    module = llvm.parse_assembly(source)
+    module.verify()
+    bitcode = module.as_bitcode()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(bitcode)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    return bitcode
+
+
+def register_trap_key() -> None:
+    """
+    Creates the process's trap key and makes it the `@mylang_trap.key` of
+    every engine, once. The `Optimizer` calls it when it links the runtime
+    in, so engines never see the symbol undefined.
+    """
+    global TRAP_KEY
+    with TRAP_KEY_LOCK:
+        if TRAP_KEY is not None:
+            return
+        key = ctypes.c_uint32()
+        if ctypes.CDLL(None).pthread_key_create(ctypes.byref(key), None) != 0:
+            raise OSError("Could not create the pthread key of the runtime's traps.")
+        llvm.add_symbol("mylang_trap.key", ctypes.addressof(key))
+        TRAP_KEY = key
+
+
+class RuntimeLibrary:
+    """
+    Helper class for calling into the runtime library (`runtime.ll`).
+
+    Calls only need a declaration here. The definitions come from the runtime
+    bitcode the `Optimizer` links into the module before optimizing it.
+    """
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    def function(self, name: str) -> ir.Function:
+        """Declares a runtime helper in the module being compiled, once."""
+        module = self.compiler.module
+        if name in module.globals:
+            return module.globals[name]
+
+        return_type, parameter_types, attributes = SIGNATURES[name]
+        function = ir.Function(module, ir.FunctionType(return_type, parameter_types), name=name)
+        for attribute in attributes:
+            function.attributes.add(attribute)
+        return function
+
+    def call(self, name: str, args: list[ir.Value]) -> ir.Value:
+        return self.compiler.builder.call(self.function(name), args)
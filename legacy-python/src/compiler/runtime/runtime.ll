@@ -0,0 +1,1390 @@
+; mylang runtime library
+;
+; Helpers the compiled code calls instead of expanding them at every call site.
+; `RuntimeLibrary` assembles this file into bitcode once, and the `Optimizer`
+; links that bitcode into every program module before optimizing, so LLVM can
+; inline and specialize the helpers like any other function.
+;
+; Strings are length-prefixed (see `StringRuntime`): the i64 in the 8 bytes in
+; front of the data holds the length, and the data is null terminated.
+; Every definition is linkonce_odr, so modules that each link the runtime can
+; still be linked together, and unused helpers are dropped.
+
+; Output buffer, see "Output" below
+@mylang_output.data = linkonce_odr global ptr null
+@mylang_output.used = linkonce_odr global i64 0
+@mylang_output.capacity = linkonce_odr global i64 65536
+@mylang_output.policy = linkonce_odr global i32 -1
+
+; Traps, see "Traps" below: jmp_buf (larger than any libc's), panic message
+%mylang_trap = type { [64 x i64], ptr }
+@mylang_trap.key = external global i32
+
+@.fmt.fixed = private unnamed_addr constant [5 x i8] c"%.*f\00"
+@.text.newline = private unnamed_addr constant [1 x i8] c"\0A"
+@.text.nan = private unnamed_addr constant [3 x i8] c"nan"
+@.text.true = private unnamed_addr constant [4 x i8] c"true"
+@.text.false = private unnamed_addr constant [5 x i8] c"false"
+@.text.out_of_memory = private unnamed_addr constant [29 x i8] c"RUNTIME ERROR: out of memory\00"
+
+declare ptr @malloc(i64)
+declare i32 @puts(ptr)
+declare void @exit(i32) noreturn
+declare i32 @snprintf(ptr, i64, ptr, ...)
+declare ptr @realloc(ptr, i64)
+declare void @free(ptr)
+declare i64 @write(i32, ptr, i64)
+declare i32 @isatty(i32)
+declare i32 @pthread_create(ptr, ptr, ptr, ptr)
+declare i32 @pthread_join(i64, ptr)
+declare ptr @pthread_getspecific(i32)
+declare i32 @pthread_setspecific(i32, ptr)
+declare i32 @_setjmp(ptr) returns_twice
+declare void @longjmp(ptr, i32) noreturn
+declare void @llvm.memcpy.p0.p0.i64(ptr, ptr, i64, i1)
+declare void @llvm.memset.p0.i64(ptr, i8, i64, i1)
+declare double @llvm.fabs.f64(double)
+declare double @llvm.rint.f64(double)
+
+; 10^0 .. 10^12, for fixed point formatting
+@.powers_of_ten = private unnamed_addr constant [13 x i64] [i64 1, i64 10, i64 100, i64 1000, i64 10000, i64 100000, i64 1000000, i64 10000000, i64 100000000, i64 1000000000, i64 10000000000, i64 100000000000, i64 1000000000000]
+
+; ---------------------------------------------------------------------------
+; Errors and memory
+; ---------------------------------------------------------------------------
+
+; Hands `message` (a C string) to the innermost trap of the thread, or
+; prints it and terminates the process when there is none.
+define linkonce_odr void @mylang_panic(ptr %message) noreturn cold noinline {
+entry:
+  %trap = call ptr @mylang_trap_current()
+  %trapped = icmp ne ptr %trap, null
+  br i1 %trapped, label %jump, label %exit
+
+jump:
+  %message.field = getelementptr %mylang_trap, ptr %trap, i32 0, i32 1
+  store ptr %message, ptr %message.field
+  call void @longjmp(ptr %trap, i32 1)
+  unreachable
+
+exit:
+  call void @mylang_output_flush()
+  %1 = call i32 @puts(ptr %message)
+  call void @exit(i32 1)
+  unreachable
+}
+
+; malloc that panics instead of returning null.
+define linkonce_odr ptr @mylang_alloc(i64 %size) {
+entry:
+  %memory = call ptr @malloc(i64 %size)
+  %failed = icmp eq ptr %memory, null
+  br i1 %failed, label %oom, label %ok, !prof !0
+
+oom:
+  call void @mylang_panic(ptr @.text.out_of_memory)
+  unreachable
+
+ok:
+  ret ptr %memory
+}
+
+; ---------------------------------------------------------------------------
+; Traps
+;
+; A host that must outlive a runtime error calls compiled code through a
+; trampoline (see `Compiler.define_trap`) which sets a trap, a jmp_buf
+; followed by the slot for the panic message, and makes it the innermost
+; trap of its thread. mylang_panic jumps back to that trap instead of
+; terminating the process. The innermost trap is kept under a pthread key,
+; as MCJIT has no thread local storage. The key is the process's, created
+; by `register_trap_key` as @mylang_trap.key: every engine would get its own
+; copy of a key defined here, and a process only has PTHREAD_KEYS_MAX keys.
+; Shared libraries link in `TRAP_KEY_DEFINITION` instead, which creates a
+; key of their own when they are loaded.
+; ---------------------------------------------------------------------------
+
+; Innermost trap of the calling thread, null if there is none.
+define linkonce_odr ptr @mylang_trap_current() {
+entry:
+  %key = load i32, ptr @mylang_trap.key
+  %trap = call ptr @pthread_getspecific(i32 %key)
+  ret ptr %trap
+}
+
+; Makes `trap` the innermost trap of the thread, returns the one it replaces.
+define linkonce_odr ptr @mylang_trap_push(ptr %trap) {
+entry:
+  %key = load i32, ptr @mylang_trap.key
+  %previous = call ptr @pthread_getspecific(i32 %key)
+  %1 = call i32 @pthread_setspecific(i32 %key, ptr %trap)
+  ret ptr %previous
+}
+
+; Restores the trap mylang_trap_push replaced.
+define linkonce_odr void @mylang_trap_pop(ptr %previous) {
+entry:
+  %key = load i32, ptr @mylang_trap.key
+  %1 = call i32 @pthread_setspecific(i32 %key, ptr %previous)
+  ret void
+}
+
+; ---------------------------------------------------------------------------
+; Strings
+; ---------------------------------------------------------------------------
+
+; Stores the length header and the null terminator of a string.
+define linkonce_odr void @mylang_str_set_length(ptr %string, i64 %length) alwaysinline {
+entry:
+  %header = getelementptr i64, ptr %string, i64 -1
+  store i64 %length, ptr %header
+  %end = getelementptr i8, ptr %string, i64 %length
+  store i8 0, ptr %end
+  ret void
+}
+
+; Allocates a string of `length` bytes on the heap, with header and terminator set.
+define linkonce_odr ptr @mylang_str_alloc(i64 %length) {
+entry:
+  %size = add i64 %length, 9
+  %memory = call ptr @mylang_alloc(i64 %size)
+  %string = getelementptr i8, ptr %memory, i64 8
+  call void @mylang_str_set_length(ptr %string, i64 %length)
+  ret ptr %string
+}
+
+; Frees a string of mylang_str_alloc.
+define linkonce_odr void @mylang_str_free(ptr %string) {
+entry:
+  %memory = getelementptr i8, ptr %string, i64 -8
+  call void @free(ptr %memory)
+  ret void
+}
+
+; ---------------------------------------------------------------------------
+; Output
+;
+; Everything printed goes through one buffer, written to stdout (fd 1) by
+; mylang_output_flush according to the flush policy (`FLUSH_POLICIES` in
+; src/output/OutputSink.py):
+;   0 size: when the buffer is full
+;   1 line: after every line
+;   2 exit: only at exit, the buffer grows as needed
+;  -1 not chosen yet: line for a terminal, size otherwise
+; The compiler flushes before `main` returns, and a panic flushes before
+; printing its message. Hosts calling other functions call mylang_output_flush.
+; ---------------------------------------------------------------------------
+
+; Writes out and empties the buffer.
+define linkonce_odr void @mylang_output_flush() noinline {
+entry:
+  %data = load ptr, ptr @mylang_output.data
+  %used = load i64, ptr @mylang_output.used
+  br label %cond
+
+cond:
+  %done = phi i64 [ 0, %entry ], [ %done.next, %body ]
+  %more = icmp ult i64 %done, %used
+  br i1 %more, label %body, label %end
+
+body:
+  %at = getelementptr i8, ptr %data, i64 %done
+  %rest = sub i64 %used, %done
+  %written = call i64 @write(i32 1, ptr %at, i64 %rest)
+  %failed = icmp sle i64 %written, 0
+  %done.next = add i64 %done, %written
+  br i1 %failed, label %end, label %cond
+
+end:
+  store i64 0, ptr @mylang_output.used
+  ret void
+}
+
+; Sets the flush policy and the buffer capacity, flushing what is buffered.
+define linkonce_odr void @mylang_output_configure(i32 %policy, i64 %capacity) {
+entry:
+  call void @mylang_output_flush()
+  store i32 %policy, ptr @mylang_output.policy
+  %data = load ptr, ptr @mylang_output.data
+  %resized = call ptr @realloc(ptr %data, i64 %capacity)
+  store ptr %resized, ptr @mylang_output.data
+  store i64 %capacity, ptr @mylang_output.capacity
+  ret void
+}
+
+define linkonce_odr i32 @mylang_output_policy() alwaysinline {
+entry:
+  %policy = load i32, ptr @mylang_output.policy
+  %unset = icmp slt i32 %policy, 0
+  br i1 %unset, label %choose, label %known, !prof !0
+
+choose:
+  %terminal = call i32 @isatty(i32 1)
+  %is_terminal = icmp ne i32 %terminal, 0
+  %chosen = zext i1 %is_terminal to i32
+  store i32 %chosen, ptr @mylang_output.policy
+  br label %known
+
+known:
+  %result = phi i32 [ %policy, %entry ], [ %chosen, %choose ]
+  ret i32 %result
+}
+
+; Appends `length` bytes to the buffer. This is the bulk path: unless the
+; policy is exit, a write larger than the whole buffer goes straight to
+; stdout after flushing, without being copied.
+define linkonce_odr void @mylang_output_write(ptr %bytes, i64 %length) {
+entry:
+  %policy = call i32 @mylang_output_policy()
+  %data = load ptr, ptr @mylang_output.data
+  %used = load i64, ptr @mylang_output.used
+  %capacity = load i64, ptr @mylang_output.capacity
+  %needed = add i64 %used, %length
+  %fits = icmp ule i64 %needed, %capacity
+  %allocated = icmp ne ptr %data, null
+  %ready = and i1 %fits, %allocated
+  br i1 %ready, label %copy, label %full, !prof !1
+
+full:
+  %grow = icmp eq i32 %policy, 2
+  br i1 %grow, label %resize, label %drain
+
+resize:
+  ; doubles until `needed` fits
+  %doubled = shl i64 %capacity, 1
+  %enough = icmp ugt i64 %doubled, %needed
+  %new.capacity = select i1 %enough, i64 %doubled, i64 %needed
+  %resized = call ptr @realloc(ptr %data, i64 %new.capacity)
+  store ptr %resized, ptr @mylang_output.data
+  store i64 %new.capacity, ptr @mylang_output.capacity
+  br label %copy
+
+drain:
+  call void @mylang_output_flush()
+  %large = icmp ugt i64 %length, %capacity
+  br i1 %large, label %direct, label %first
+
+first:
+  ; a buffer is only allocated on the first write
+  br i1 %allocated, label %copy, label %allocate
+
+allocate:
+  %allocated.data = call ptr @mylang_alloc(i64 %capacity)
+  store ptr %allocated.data, ptr @mylang_output.data
+  br label %copy
+
+direct:
+  %written = call i64 @write(i32 1, ptr %bytes, i64 %length)
+  ret void
+
+copy:
+  %target = load ptr, ptr @mylang_output.data
+  %offset = load i64, ptr @mylang_output.used
+  %at = getelementptr i8, ptr %target, i64 %offset
+  call void @llvm.memcpy.p0.p0.i64(ptr %at, ptr %bytes, i64 %length, i1 false)
+  %total = add i64 %offset, %length
+  store i64 %total, ptr @mylang_output.used
+  ret void
+}
+
+; Writes a string and a newline, using the length header instead of scanning for the terminator.
+define linkonce_odr void @mylang_print(ptr %string) {
+entry:
+  %header = getelementptr i64, ptr %string, i64 -1
+  %length = load i64, ptr %header
+  call void @mylang_output_write(ptr %string, i64 %length)
+  call void @mylang_output_write(ptr @.text.newline, i64 1)
+  %policy = call i32 @mylang_output_policy()
+  %line = icmp eq i32 %policy, 1
+  br i1 %line, label %flush, label %end
+
+flush:
+  call void @mylang_output_flush()
+  br label %end
+
+end:
+  ret void
+}
+
+; ---------------------------------------------------------------------------
+; Formatting
+;
+; mylang_format_* write the text of a value at `dest`, which must have room
+; for the widest text plus a terminator, and return the number of bytes written.
+; mylang_*_to_str format into a length-prefixed buffer and return it.
+; ---------------------------------------------------------------------------
+
+; Writes the decimal digits of `value`, zero-padded to at least `min_digits`.
+define linkonce_odr i64 @mylang_format_u64(ptr %dest, i64 %value, i64 %min_digits) {
+entry:
+  br label %count
+
+count:
+  %n = phi i64 [ 1, %entry ], [ %n.next, %count ]
+  %rest = phi i64 [ %value, %entry ], [ %rest.next, %count ]
+  %rest.next = udiv i64 %rest, 10
+  %n.next = add i64 %n, 1
+  %more = icmp uge i64 %rest, 10
+  br i1 %more, label %count, label %counted
+
+counted:
+  %wider = icmp ugt i64 %min_digits, %n
+  %digits = select i1 %wider, i64 %min_digits, i64 %n
+  br label %write
+
+write:
+  %i = phi i64 [ %digits, %counted ], [ %i.next, %write ]
+  %left = phi i64 [ %value, %counted ], [ %left.next, %write ]
+  %i.next = sub i64 %i, 1
+  %left.next = udiv i64 %left, 10
+  %tens = mul i64 %left.next, 10
+  %digit = sub i64 %left, %tens
+  %digit.byte = trunc i64 %digit to i8
+  %char = add i8 %digit.byte, 48
+  %at = getelementptr i8, ptr %dest, i64 %i.next
+  store i8 %char, ptr %at
+  %done = icmp eq i64 %i.next, 0
+  br i1 %done, label %end, label %write
+
+end:
+  ret i64 %digits
+}
+
+; Writes `value` in decimal, with at least `min_digits` digits after any "-".
+define linkonce_odr i64 @mylang_format_int_digits(ptr %dest, i32 %value, i64 %min_digits) {
+entry:
+  %negative = icmp slt i32 %value, 0
+  %wide = sext i32 %value to i64
+  %negated = sub i64 0, %wide
+  %magnitude = select i1 %negative, i64 %negated, i64 %wide
+  br i1 %negative, label %sign, label %digits
+
+sign:
+  store i8 45, ptr %dest
+  br label %digits
+
+digits:
+  %skip = zext i1 %negative to i64
+  %at = getelementptr i8, ptr %dest, i64 %skip
+  %written = call i64 @mylang_format_u64(ptr %at, i64 %magnitude, i64 %min_digits)
+  %length = add i64 %written, %skip
+  ret i64 %length
+}
+
+define linkonce_odr i64 @mylang_format_int(ptr %dest, i32 %value) {
+entry:
+  ; "-2147483648" is 11 characters
+  %length = call i64 @mylang_format_int_digits(ptr %dest, i32 %value, i64 1)
+  ret i64 %length
+}
+
+; Writes `value` like "%.*f" with `precision` digits after the point, which
+; needs at most 41 + precision bytes plus a terminator.
+;
+; A float has a 24 bit mantissa and 10^12 fits in 40 bits, so for precision
+; up to 12 `|value| * 10^precision` is exact as a double, and rounding it to
+; an integer (ties to even) gives exactly the digits printf would. Larger
+; precisions, infinities and values too large for an i64 go through snprintf.
+define linkonce_odr i64 @mylang_format_fixed(ptr %dest, float %value, i32 %precision) {
+entry:
+  %double = fpext float %value to double
+  %is_nan = fcmp uno double %double, 0.0
+  br i1 %is_nan, label %nan, label %check, !prof !0
+
+nan:
+  call void @llvm.memcpy.p0.p0.i64(ptr %dest, ptr @.text.nan, i64 3, i1 false)
+  ret i64 3
+
+check:
+  %digits = zext i32 %precision to i64
+  %fast = icmp ule i32 %precision, 12
+  br i1 %fast, label %scale, label %slow, !prof !1
+
+scale:
+  %power.at = getelementptr [13 x i64], ptr @.powers_of_ten, i64 0, i64 %digits
+  %power = load i64, ptr %power.at
+  %power.float = uitofp i64 %power to double
+  %magnitude = call double @llvm.fabs.f64(double %double)
+  %scaled = fmul double %magnitude, %power.float
+  %rounded = call double @llvm.rint.f64(double %scaled)
+  %fits = fcmp olt double %rounded, 1.0e19
+  br i1 %fits, label %fixed, label %slow, !prof !1
+
+fixed:
+  %units = fptoui double %rounded to i64
+  %whole = udiv i64 %units, %power
+  %fraction = urem i64 %units, %power
+  %bits = bitcast float %value to i32
+  %negative = icmp slt i32 %bits, 0
+  br i1 %negative, label %sign, label %integer
+
+sign:
+  store i8 45, ptr %dest
+  br label %integer
+
+integer:
+  %skip = zext i1 %negative to i64
+  %whole.at = getelementptr i8, ptr %dest, i64 %skip
+  %whole.length = call i64 @mylang_format_u64(ptr %whole.at, i64 %whole, i64 1)
+  %point.offset = add i64 %skip, %whole.length
+  %has_fraction = icmp ne i32 %precision, 0
+  br i1 %has_fraction, label %point, label %whole.end
+
+whole.end:
+  ret i64 %point.offset
+
+point:
+  %point.at = getelementptr i8, ptr %dest, i64 %point.offset
+  store i8 46, ptr %point.at
+  %fraction.at = getelementptr i8, ptr %point.at, i64 1
+  %fraction.length = call i64 @mylang_format_u64(ptr %fraction.at, i64 %fraction, i64 %digits)
+  %point.length = add i64 %point.offset, 1
+  %length = add i64 %point.length, %fraction.length
+  ret i64 %length
+
+slow:
+  %capacity = add i64 %digits, 42
+  %written = call i32 (ptr, i64, ptr, ...) @snprintf(ptr %dest, i64 %capacity, ptr @.fmt.fixed, i32 %precision, double %double)
+  %slow.length = sext i32 %written to i64
+  ret i64 %slow.length
+}
+
+define linkonce_odr i64 @mylang_format_float(ptr %dest, float %value) {
+entry:
+  ; "%.2f" of FLT_MAX is 42 characters
+  %length = call i64 @mylang_format_fixed(ptr %dest, float %value, i32 2)
+  ret i64 %length
+}
+
+; Copies `length` bytes of `text` to `dest`, padded to `width` bytes: with
+; spaces in front, spaces behind when `left` is set, or zeros after any "-"
+; when `zeros` is set. Returns the number of bytes written.
+define linkonce_odr i64 @mylang_format_padded(ptr %dest, ptr %text, i64 %length, i64 %width, i1 %left, i1 %zeros) {
+entry:
+  %short = icmp ult i64 %length, %width
+  br i1 %short, label %pad, label %copy
+
+copy:
+  call void @llvm.memcpy.p0.p0.i64(ptr %dest, ptr %text, i64 %length, i1 false)
+  ret i64 %length
+
+pad:
+  %padding = sub i64 %width, %length
+  br i1 %left, label %behind, label %front
+
+behind:
+  call void @llvm.memcpy.p0.p0.i64(ptr %dest, ptr %text, i64 %length, i1 false)
+  %behind.at = getelementptr i8, ptr %dest, i64 %length
+  call void @llvm.memset.p0.i64(ptr %behind.at, i8 32, i64 %padding, i1 false)
+  ret i64 %width
+
+front:
+  br i1 %zeros, label %zero, label %spaces
+
+spaces:
+  call void @llvm.memset.p0.i64(ptr %dest, i8 32, i64 %padding, i1 false)
+  %spaces.at = getelementptr i8, ptr %dest, i64 %padding
+  call void @llvm.memcpy.p0.p0.i64(ptr %spaces.at, ptr %text, i64 %length, i1 false)
+  ret i64 %width
+
+zero:
+  %first = load i8, ptr %text
+  %signed = icmp eq i8 %first, 45
+  %sign.length = zext i1 %signed to i64
+  call void @llvm.memcpy.p0.p0.i64(ptr %dest, ptr %text, i64 %sign.length, i1 false)
+  %zeros.at = getelementptr i8, ptr %dest, i64 %sign.length
+  call void @llvm.memset.p0.i64(ptr %zeros.at, i8 48, i64 %padding, i1 false)
+  %rest.at = getelementptr i8, ptr %zeros.at, i64 %padding
+  %rest.text = getelementptr i8, ptr %text, i64 %sign.length
+  %rest.length = sub i64 %length, %sign.length
+  call void @llvm.memcpy.p0.p0.i64(ptr %rest.at, ptr %rest.text, i64 %rest.length, i1 false)
+  ret i64 %width
+}
+
+define linkonce_odr i64 @mylang_format_bool(ptr %dest, i1 %value) {
+entry:
+  %text = select i1 %value, ptr @.text.true, ptr @.text.false
+  %length = select i1 %value, i64 4, i64 5
+  call void @llvm.memcpy.p0.p0.i64(ptr %dest, ptr %text, i64 %length, i1 false)
+  ret i64 %length
+}
+
+define linkonce_odr ptr @mylang_int_to_str(ptr %buffer, i32 %value) {
+entry:
+  %length = call i64 @mylang_format_int(ptr %buffer, i32 %value)
+  call void @mylang_str_set_length(ptr %buffer, i64 %length)
+  ret ptr %buffer
+}
+
+define linkonce_odr ptr @mylang_float_to_str(ptr %buffer, float %value) {
+entry:
+  %length = call i64 @mylang_format_float(ptr %buffer, float %value)
+  call void @mylang_str_set_length(ptr %buffer, i64 %length)
+  ret ptr %buffer
+}
+
+; ---------------------------------------------------------------------------
+; Lists
+; ---------------------------------------------------------------------------
+
+; Formats `length` elements, `stride` bytes apart, as "[a, b, c]" into a new string.
+; `format` writes one element (given a pointer to it) and `width` is the widest
+; text it produces. Once inlined into a caller with a constant `format`, the
+; indirect call becomes a direct one.
+define linkonce_odr ptr @mylang_list_to_str(ptr %data, i64 %length, i64 %stride, i64 %width, ptr %format) {
+entry:
+  ; "[" + length * (width + ", ") + "]"
+  %per_element = add i64 %width, 2
+  %elements = mul i64 %length, %per_element
+  %capacity = add i64 %elements, 2
+  %string = call ptr @mylang_str_alloc(i64 %capacity)
+  store i8 91, ptr %string
+  br label %cond
+
+cond:
+  %i = phi i64 [ 0, %entry ], [ %i.next, %element ]
+  %offset = phi i64 [ 1, %entry ], [ %offset.next, %element ]
+  %done = icmp sge i64 %i, %length
+  br i1 %done, label %end, label %body
+
+body:
+  %first = icmp eq i64 %i, 0
+  br i1 %first, label %element, label %separator
+
+separator:
+  %comma = getelementptr i8, ptr %string, i64 %offset
+  store i8 44, ptr %comma
+  %space = getelementptr i8, ptr %comma, i64 1
+  store i8 32, ptr %space
+  %offset.separated = add i64 %offset, 2
+  br label %element
+
+element:
+  %at = phi i64 [ %offset, %body ], [ %offset.separated, %separator ]
+  %dest = getelementptr i8, ptr %string, i64 %at
+  %byte_offset = mul i64 %i, %stride
+  %source = getelementptr i8, ptr %data, i64 %byte_offset
+  %written = call i64 %format(ptr %dest, ptr %source)
+  %offset.next = add i64 %at, %written
+  %i.next = add i64 %i, 1
+  br label %cond
+
+end:
+  %close = getelementptr i8, ptr %string, i64 %offset
+  store i8 93, ptr %close
+  %total = add i64 %offset, 1
+  call void @mylang_str_set_length(ptr %string, i64 %total)
+  ret ptr %string
+}
+
+define linkonce_odr i64 @mylang_format_int_at(ptr %dest, ptr %element) {
+entry:
+  %value = load i32, ptr %element
+  %length = call i64 @mylang_format_int(ptr %dest, i32 %value)
+  ret i64 %length
+}
+
+define linkonce_odr i64 @mylang_format_float_at(ptr %dest, ptr %element) {
+entry:
+  %value = load float, ptr %element
+  %length = call i64 @mylang_format_float(ptr %dest, float %value)
+  ret i64 %length
+}
+
+define linkonce_odr i64 @mylang_format_bool_at(ptr %dest, ptr %element) {
+entry:
+  %value = load i1, ptr %element
+  %length = call i64 @mylang_format_bool(ptr %dest, i1 %value)
+  ret i64 %length
+}
+
+define linkonce_odr ptr @mylang_list_int_to_str(ptr %data, i64 %length) {
+entry:
+  %string = call ptr @mylang_list_to_str(ptr %data, i64 %length, i64 4, i64 11, ptr @mylang_format_int_at)
+  ret ptr %string
+}
+
+define linkonce_odr ptr @mylang_list_float_to_str(ptr %data, i64 %length) {
+entry:
+  %string = call ptr @mylang_list_to_str(ptr %data, i64 %length, i64 4, i64 48, ptr @mylang_format_float_at)
+  ret ptr %string
+}
+
+define linkonce_odr ptr @mylang_list_bool_to_str(ptr %data, i64 %length) {
+entry:
+  %string = call ptr @mylang_list_to_str(ptr %data, i64 %length, i64 1, i64 5, ptr @mylang_format_bool_at)
+  ret ptr %string
+}
+
+; ---------------------------------------------------------------------------
+; Parallel loops
+;
+; mylang_parallel_for runs `body(context, start, end)` over [0, count) in
+; chunks of `chunk` indices, on `workers` threads (the compiler passes the
+; core count by default), the calling thread being one of them. Threads take the next chunk
+; from a shared counter until none is left, so which thread runs a chunk
+; depends on scheduling, but the chunks themselves only on `count` and
+; `chunk`: bodies that write results per index or per chunk are
+; deterministic.
+;
+; A panic in a chunk stops the threads from claiming more chunks and is
+; raised again in the calling thread once every thread has been joined, so
+; it reaches that thread's trap, if any, and never one of the task's stack.
+; ---------------------------------------------------------------------------
+
+; body, context, count, chunk, next unclaimed index, first panic message
+%mylang_parallel.task = type { ptr, ptr, i64, i64, i64, ptr }
+
+; Thread entry: runs chunks until the counter passes the end.
+define linkonce_odr ptr @mylang_parallel_worker(ptr %task) {
+entry:
+  %trap = alloca %mylang_trap, align 16
+  %previous = call ptr @mylang_trap_push(ptr %trap)
+  %jumped = call i32 @_setjmp(ptr %trap)
+  %panicked = icmp ne i32 %jumped, 0
+  br i1 %panicked, label %failed, label %ready
+
+ready:
+  %body.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 0
+  %body = load ptr, ptr %body.field
+  %context.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 1
+  %context = load ptr, ptr %context.field
+  %count.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 2
+  %count = load i64, ptr %count.field
+  %chunk.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 3
+  %chunk = load i64, ptr %chunk.field
+  %next = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 4
+  br label %claim
+
+claim:
+  %start = atomicrmw add ptr %next, i64 %chunk monotonic
+  %more = icmp slt i64 %start, %count
+  br i1 %more, label %run, label %done
+
+run:
+  %end.unclamped = add i64 %start, %chunk
+  %past = icmp sgt i64 %end.unclamped, %count
+  %end = select i1 %past, i64 %count, i64 %end.unclamped
+  call void %body(ptr %context, i64 %start, i64 %end)
+  br label %claim
+
+done:
+  call void @mylang_trap_pop(ptr %previous)
+  ret ptr null
+
+failed:
+  call void @mylang_trap_pop(ptr %previous)
+  %message.field = getelementptr %mylang_trap, ptr %trap, i32 0, i32 1
+  %message = load ptr, ptr %message.field
+  ; keep the first message, and move the counter past the end
+  %failure.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 5
+  %kept = cmpxchg ptr %failure.field, ptr null, ptr %message monotonic monotonic
+  %count.stop.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 2
+  %count.stop = load i64, ptr %count.stop.field
+  %next.stop = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 4
+  store atomic i64 %count.stop, ptr %next.stop monotonic, align 8
+  ret ptr null
+}
+
+define linkonce_odr void @mylang_parallel_for(ptr %body, ptr %context, i64 %count, i64 %chunk, i32 %workers) {
+entry:
+  %task = alloca %mylang_parallel.task
+  store ptr %body, ptr %task
+  %context.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 1
+  store ptr %context, ptr %context.field
+  %count.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 2
+  store i64 %count, ptr %count.field
+  %chunk.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 3
+  store i64 %chunk, ptr %chunk.field
+  %next = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 4
+  store i64 0, ptr %next
+  %failure.field = getelementptr %mylang_parallel.task, ptr %task, i32 0, i32 5
+  store ptr null, ptr %failure.field
+
+  ; threads = min(workers, number of chunks)
+  %requested = sext i32 %workers to i64
+  %rounded = add i64 %count, %chunk
+  %rounded.down = sub i64 %rounded, 1
+  %chunks = sdiv i64 %rounded.down, %chunk
+  %fewer = icmp slt i64 %chunks, %requested
+  %limited = select i1 %fewer, i64 %chunks, i64 %requested
+  %extra = sub i64 %limited, 1
+  %spawn = icmp sgt i64 %extra, 0
+  br i1 %spawn, label %create, label %inline, !prof !1
+
+inline:
+  %ignored = call ptr @mylang_parallel_worker(ptr %task)
+  br label %finish
+
+create:
+  %size = shl i64 %extra, 3
+  %threads = call ptr @mylang_alloc(i64 %size)
+  br label %create.cond
+
+create.cond:
+  %i = phi i64 [ 0, %create ], [ %i.next, %create.next ]
+  %creating = icmp slt i64 %i, %extra
+  br i1 %creating, label %create.body, label %work
+
+create.body:
+  %thread = getelementptr i64, ptr %threads, i64 %i
+  %failed.create = call i32 @pthread_create(ptr %thread, ptr null, ptr @mylang_parallel_worker, ptr %task)
+  ; a thread that couldn't start leaves its chunks to the others
+  %failed = icmp ne i32 %failed.create, 0
+  br i1 %failed, label %create.failed, label %create.next
+
+create.failed:
+  store i64 0, ptr %thread
+  br label %create.next
+
+create.next:
+  %i.next = add i64 %i, 1
+  br label %create.cond
+
+work:
+  %ignored.main = call ptr @mylang_parallel_worker(ptr %task)
+  br label %join.cond
+
+join.cond:
+  %j = phi i64 [ 0, %work ], [ %j.next, %join.next ]
+  %joining = icmp slt i64 %j, %extra
+  br i1 %joining, label %join.body, label %joined.all
+
+join.body:
+  %joined = getelementptr i64, ptr %threads, i64 %j
+  %handle = load i64, ptr %joined
+  %started = icmp ne i64 %handle, 0
+  br i1 %started, label %join, label %join.next
+
+join:
+  %result = call i32 @pthread_join(i64 %handle, ptr null)
+  br label %join.next
+
+join.next:
+  %j.next = add i64 %j, 1
+  br label %join.cond
+
+joined.all:
+  call void @free(ptr %threads)
+  br label %finish
+
+finish:
+  %failure = load ptr, ptr %failure.field
+  %panicked = icmp ne ptr %failure, null
+  br i1 %panicked, label %raise, label %end, !prof !0
+
+raise:
+  call void @mylang_panic(ptr %failure)
+  unreachable
+
+end:
+  ret void
+}
+
+; ---------------------------------------------------------------------------
+; Sorting
+; ---------------------------------------------------------------------------
+
+; Both sorts are stable and, when `order` isn't null, move the i64 at the
+; same index of `order` along with every value, so sorting keys can carry
+; the permutation that sorts the elements they were computed from.
+
+; Byte `shift / 8` of an int, with the sign bit flipped so that negative
+; values order before positive ones.
+define linkonce_odr i64 @mylang_sort_digit(i32 %value, i32 %shift) alwaysinline {
+entry:
+  %flipped = xor i32 %value, -2147483648
+  %shifted = lshr i32 %flipped, %shift
+  %byte = and i32 %shifted, 255
+  %digit = zext i32 %byte to i64
+  ret i64 %digit
+}
+
+; Sorts `count` ints ascending in place, with an LSD radix sort: four
+; stable counting passes of one byte each, back and forth between `data`
+; and a scratch buffer, so the last pass leaves the result in `data`.
+define linkonce_odr void @mylang_sort_i32(ptr %data, ptr %order, i64 %count) {
+entry:
+  %counts = alloca [256 x i64]
+  %small = icmp slt i64 %count, 2
+  br i1 %small, label %end, label %setup
+
+setup:
+  %size = shl i64 %count, 2
+  %scratch = call ptr @mylang_alloc(i64 %size)
+  %carry = icmp ne ptr %order, null
+  br i1 %carry, label %setup.order, label %pass.cond
+
+setup.order:
+  %order.size = shl i64 %count, 3
+  %order.scratch = call ptr @mylang_alloc(i64 %order.size)
+  br label %pass.cond
+
+pass.cond:
+  %shift = phi i32 [ 0, %setup ], [ 0, %setup.order ], [ %shift.next, %pass.end ]
+  %from = phi ptr [ %data, %setup ], [ %data, %setup.order ], [ %to, %pass.end ]
+  %to = phi ptr [ %scratch, %setup ], [ %scratch, %setup.order ], [ %from, %pass.end ]
+  %order.from = phi ptr [ null, %setup ], [ %order, %setup.order ], [ %order.to, %pass.end ]
+  %order.to = phi ptr [ null, %setup ], [ %order.scratch, %setup.order ], [ %order.from, %pass.end ]
+  %passing = icmp ult i32 %shift, 32
+  br i1 %passing, label %pass, label %done
+
+pass:
+  call void @llvm.memset.p0.i64(ptr %counts, i8 0, i64 2048, i1 false)
+  br label %histogram.cond
+
+histogram.cond:
+  %i = phi i64 [ 0, %pass ], [ %i.next, %histogram.body ]
+  %counting = icmp ult i64 %i, %count
+  br i1 %counting, label %histogram.body, label %prefix.cond
+
+histogram.body:
+  %value.field = getelementptr i32, ptr %from, i64 %i
+  %value = load i32, ptr %value.field
+  %digit = call i64 @mylang_sort_digit(i32 %value, i32 %shift)
+  %bucket = getelementptr i64, ptr %counts, i64 %digit
+  %bucket.count = load i64, ptr %bucket
+  %bucket.next = add i64 %bucket.count, 1
+  store i64 %bucket.next, ptr %bucket
+  %i.next = add i64 %i, 1
+  br label %histogram.cond
+
+prefix.cond:
+  ; every bucket's count becomes the index its first value goes to
+  %d = phi i64 [ 0, %histogram.cond ], [ %d.next, %prefix.body ]
+  %total = phi i64 [ 0, %histogram.cond ], [ %total.next, %prefix.body ]
+  %summing = icmp ult i64 %d, 256
+  br i1 %summing, label %prefix.body, label %scatter.cond
+
+prefix.body:
+  %start = getelementptr i64, ptr %counts, i64 %d
+  %start.count = load i64, ptr %start
+  store i64 %total, ptr %start
+  %total.next = add i64 %total, %start.count
+  %d.next = add i64 %d, 1
+  br label %prefix.cond
+
+scatter.cond:
+  %j = phi i64 [ 0, %prefix.cond ], [ %j.next, %scatter.next ]
+  %scattering = icmp ult i64 %j, %count
+  br i1 %scattering, label %scatter.body, label %pass.end
+
+scatter.body:
+  %item.field = getelementptr i32, ptr %from, i64 %j
+  %item = load i32, ptr %item.field
+  %item.digit = call i64 @mylang_sort_digit(i32 %item, i32 %shift)
+  %position.field = getelementptr i64, ptr %counts, i64 %item.digit
+  %position = load i64, ptr %position.field
+  %position.next = add i64 %position, 1
+  store i64 %position.next, ptr %position.field
+  %target = getelementptr i32, ptr %to, i64 %position
+  store i32 %item, ptr %target
+  br i1 %carry, label %scatter.order, label %scatter.next
+
+scatter.order:
+  %index.field = getelementptr i64, ptr %order.from, i64 %j
+  %index = load i64, ptr %index.field
+  %index.target = getelementptr i64, ptr %order.to, i64 %position
+  store i64 %index, ptr %index.target
+  br label %scatter.next
+
+scatter.next:
+  %j.next = add i64 %j, 1
+  br label %scatter.cond
+
+pass.end:
+  %shift.next = add i32 %shift, 8
+  br label %pass.cond
+
+done:
+  ; after an even number of passes the scratch buffers are the targets again
+  call void @free(ptr %scratch)
+  call void @free(ptr %order.to)
+  br label %end
+
+end:
+  ret void
+}
+
+; Sorts `count` floats ascending in place, with a bottom-up merge sort:
+; runs of `width` are merged pairwise, back and forth between `data` and a
+; scratch buffer, doubling `width` until one run is left. A value moves
+; ahead of an earlier one only if it is smaller, so equal values, and NaNs,
+; keep their order.
+define linkonce_odr void @mylang_sort_f32(ptr %data, ptr %order, i64 %count) {
+entry:
+  %small = icmp slt i64 %count, 2
+  br i1 %small, label %end, label %setup
+
+setup:
+  %size = shl i64 %count, 2
+  %scratch = call ptr @mylang_alloc(i64 %size)
+  %order.size = shl i64 %count, 3
+  %carry = icmp ne ptr %order, null
+  br i1 %carry, label %setup.order, label %width.cond
+
+setup.order:
+  %order.scratch = call ptr @mylang_alloc(i64 %order.size)
+  br label %width.cond
+
+width.cond:
+  %width = phi i64 [ 1, %setup ], [ 1, %setup.order ], [ %width.next, %run.cond ]
+  %from = phi ptr [ %data, %setup ], [ %data, %setup.order ], [ %to, %run.cond ]
+  %to = phi ptr [ %scratch, %setup ], [ %scratch, %setup.order ], [ %from, %run.cond ]
+  %order.from = phi ptr [ null, %setup ], [ %order, %setup.order ], [ %order.to, %run.cond ]
+  %order.to = phi ptr [ null, %setup ], [ %order.scratch, %setup.order ], [ %order.from, %run.cond ]
+  %merging = icmp ult i64 %width, %count
+  br i1 %merging, label %run.cond, label %done
+
+run.cond:
+  ; merges [low, middle) and [middle, high) into `to`
+  %low = phi i64 [ 0, %width.cond ], [ %high, %merge.cond ]
+  %running = icmp ult i64 %low, %count
+  %width.next = shl i64 %width, 1
+  br i1 %running, label %run, label %width.cond
+
+run:
+  %middle.end = add i64 %low, %width
+  %middle.over = icmp ugt i64 %middle.end, %count
+  %middle = select i1 %middle.over, i64 %count, i64 %middle.end
+  %high.end = add i64 %middle, %width
+  %high.over = icmp ugt i64 %high.end, %count
+  %high = select i1 %high.over, i64 %count, i64 %high.end
+  br label %merge.cond
+
+merge.cond:
+  %k = phi i64 [ %low, %run ], [ %k.next, %merge.next ]
+  %left = phi i64 [ %low, %run ], [ %left.next, %merge.next ]
+  %right = phi i64 [ %middle, %run ], [ %right.next, %merge.next ]
+  %filling = icmp ult i64 %k, %high
+  br i1 %filling, label %merge.body, label %run.cond
+
+merge.body:
+  %left.done = icmp uge i64 %left, %middle
+  br i1 %left.done, label %merge.take, label %merge.left
+
+merge.left:
+  %right.done = icmp uge i64 %right, %high
+  br i1 %right.done, label %merge.take, label %merge.compare
+
+merge.compare:
+  %left.field = getelementptr float, ptr %from, i64 %left
+  %left.value = load float, ptr %left.field
+  %right.field = getelementptr float, ptr %from, i64 %right
+  %right.value = load float, ptr %right.field
+  %less = fcmp olt float %right.value, %left.value
+  br label %merge.take
+
+merge.take:
+  %take.right = phi i1 [ true, %merge.body ], [ false, %merge.left ], [ %less, %merge.compare ]
+  %source = select i1 %take.right, i64 %right, i64 %left
+  %source.field = getelementptr float, ptr %from, i64 %source
+  %source.value = load float, ptr %source.field
+  %target = getelementptr float, ptr %to, i64 %k
+  store float %source.value, ptr %target
+  br i1 %carry, label %merge.order, label %merge.next
+
+merge.order:
+  %index.field = getelementptr i64, ptr %order.from, i64 %source
+  %index = load i64, ptr %index.field
+  %index.target = getelementptr i64, ptr %order.to, i64 %k
+  store i64 %index, ptr %index.target
+  br label %merge.next
+
+merge.next:
+  %right.step = zext i1 %take.right to i64
+  %left.step = sub i64 1, %right.step
+  %left.next = add i64 %left, %left.step
+  %right.next = add i64 %right, %right.step
+  %k.next = add i64 %k, 1
+  br label %merge.cond
+
+done:
+  ; the sorted values are in `from`, copied back when that's the scratch buffer
+  %in.scratch = icmp eq ptr %from, %scratch
+  br i1 %in.scratch, label %copy, label %release
+
+copy:
+  call void @llvm.memcpy.p0.p0.i64(ptr %data, ptr %scratch, i64 %size, i1 false)
+  br i1 %carry, label %copy.order, label %release
+
+copy.order:
+  call void @llvm.memcpy.p0.p0.i64(ptr %order, ptr %order.from, i64 %order.size, i1 false)
+  br label %release
+
+release:
+  %order.release = select i1 %in.scratch, ptr %order.from, ptr %order.to
+  call void @free(ptr %scratch)
+  call void @free(ptr %order.release)
+  br label %end
+
+end:
+  ret void
+}
+
+; ---------------------------------------------------------------------------
+; Hash maps
+;
+; Open addressing with linear probing. The table holds entry numbers (0 for
+; an empty slot, otherwise the entry's index + 1) and the entries are kept
+; densely in insertion order: keys as i64 in one array, values as
+; `value_size` bytes each in another, so `keys`/`values` copy one array and
+; iterate in the same order as the interpreter's dicts. The table has two
+; slots per entry the arrays have room for, so probes always end at an
+; empty slot. When the entries are full, the arrays and the table double in
+; place: the map keeps its address, so every reference to it sees the change.
+;
+; Keys are i64: ints and bools widened (kind 0), or the address of a string
+; (kind 1), hashed and compared by content through its length header.
+; ---------------------------------------------------------------------------
+
+; count, capacity (entries), key kind, value size, table, keys, values
+%mylang_map = type { i64, i64, i32, i64, ptr, ptr, ptr }
+
+; Entries a new map has room for
+@mylang_map.initial_capacity = linkonce_odr constant i64 8
+
+define linkonce_odr ptr @mylang_map_new(i32 %kind, i64 %value_size) {
+entry:
+  %size.end = getelementptr %mylang_map, ptr null, i64 1
+  %size = ptrtoint ptr %size.end to i64
+  %map = call ptr @mylang_alloc(i64 %size)
+  %capacity = load i64, ptr @mylang_map.initial_capacity
+
+  %table.size = shl i64 %capacity, 4
+  %table = call ptr @mylang_alloc(i64 %table.size)
+  call void @llvm.memset.p0.i64(ptr %table, i8 0, i64 %table.size, i1 false)
+  %keys.size = shl i64 %capacity, 3
+  %keys = call ptr @mylang_alloc(i64 %keys.size)
+  %values.size = mul i64 %capacity, %value_size
+  %values = call ptr @mylang_alloc(i64 %values.size)
+
+  store i64 0, ptr %map
+  %capacity.field = getelementptr %mylang_map, ptr %map, i32 0, i32 1
+  store i64 %capacity, ptr %capacity.field
+  %kind.field = getelementptr %mylang_map, ptr %map, i32 0, i32 2
+  store i32 %kind, ptr %kind.field
+  %value_size.field = getelementptr %mylang_map, ptr %map, i32 0, i32 3
+  store i64 %value_size, ptr %value_size.field
+  %table.field = getelementptr %mylang_map, ptr %map, i32 0, i32 4
+  store ptr %table, ptr %table.field
+  %keys.field = getelementptr %mylang_map, ptr %map, i32 0, i32 5
+  store ptr %keys, ptr %keys.field
+  %values.field = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  store ptr %values, ptr %values.field
+  ret ptr %map
+}
+
+define linkonce_odr i64 @mylang_map_count(ptr %map) alwaysinline {
+entry:
+  %count = load i64, ptr %map
+  ret i64 %count
+}
+
+; The keys, in insertion order (`mylang_map_count` of them).
+define linkonce_odr ptr @mylang_map_keys(ptr %map) alwaysinline {
+entry:
+  %keys.field = getelementptr %mylang_map, ptr %map, i32 0, i32 5
+  %keys = load ptr, ptr %keys.field
+  ret ptr %keys
+}
+
+; The values, in insertion order (`mylang_map_count` of them).
+define linkonce_odr ptr @mylang_map_values(ptr %map) alwaysinline {
+entry:
+  %values.field = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  %values = load ptr, ptr %values.field
+  ret ptr %values
+}
+
+define linkonce_odr i64 @mylang_map_hash(i32 %kind, i64 %key) alwaysinline {
+entry:
+  %is_string = icmp eq i32 %kind, 1
+  br i1 %is_string, label %string, label %integer
+
+integer:
+  ; Fibonacci hashing, with the high half folded into the low bits the table uses
+  %product = mul i64 %key, -7046029254386353131
+  %high = lshr i64 %product, 32
+  %mixed = xor i64 %product, %high
+  ret i64 %mixed
+
+string:
+  ; FNV-1a over the string's bytes
+  %data = inttoptr i64 %key to ptr
+  %header = getelementptr i64, ptr %data, i64 -1
+  %length = load i64, ptr %header
+  br label %bytes.cond
+
+bytes.cond:
+  %i = phi i64 [ 0, %string ], [ %i.next, %bytes.body ]
+  %hash = phi i64 [ -3750763034362895579, %string ], [ %hash.next, %bytes.body ]
+  %done = icmp uge i64 %i, %length
+  br i1 %done, label %end, label %bytes.body
+
+bytes.body:
+  %byte.field = getelementptr i8, ptr %data, i64 %i
+  %byte = load i8, ptr %byte.field
+  %byte.wide = zext i8 %byte to i64
+  %xored = xor i64 %hash, %byte.wide
+  %hash.next = mul i64 %xored, 1099511628211
+  %i.next = add i64 %i, 1
+  br label %bytes.cond
+
+end:
+  ret i64 %hash
+}
+
+define linkonce_odr i1 @mylang_map_key_equal(i32 %kind, i64 %left, i64 %right) alwaysinline {
+entry:
+  %identical = icmp eq i64 %left, %right
+  br i1 %identical, label %equal, label %check
+
+check:
+  %is_string = icmp eq i32 %kind, 1
+  br i1 %is_string, label %string, label %different
+
+string:
+  %left.data = inttoptr i64 %left to ptr
+  %right.data = inttoptr i64 %right to ptr
+  %left.header = getelementptr i64, ptr %left.data, i64 -1
+  %left.length = load i64, ptr %left.header
+  %right.header = getelementptr i64, ptr %right.data, i64 -1
+  %right.length = load i64, ptr %right.header
+  %same.length = icmp eq i64 %left.length, %right.length
+  br i1 %same.length, label %bytes.cond, label %different
+
+bytes.cond:
+  %i = phi i64 [ 0, %string ], [ %i.next, %bytes.next ]
+  %done = icmp uge i64 %i, %left.length
+  br i1 %done, label %equal, label %bytes.body
+
+bytes.body:
+  %left.field = getelementptr i8, ptr %left.data, i64 %i
+  %left.byte = load i8, ptr %left.field
+  %right.field = getelementptr i8, ptr %right.data, i64 %i
+  %right.byte = load i8, ptr %right.field
+  %same.byte = icmp eq i8 %left.byte, %right.byte
+  br i1 %same.byte, label %bytes.next, label %different
+
+bytes.next:
+  %i.next = add i64 %i, 1
+  br label %bytes.cond
+
+equal:
+  ret i1 true
+
+different:
+  ret i1 false
+}
+
+; Index of the entry for `key`, or -1.
+define linkonce_odr i64 @mylang_map_find(ptr %map, i64 %key) {
+entry:
+  %capacity.field = getelementptr %mylang_map, ptr %map, i32 0, i32 1
+  %capacity = load i64, ptr %capacity.field
+  %kind.field = getelementptr %mylang_map, ptr %map, i32 0, i32 2
+  %kind = load i32, ptr %kind.field
+  %table.field = getelementptr %mylang_map, ptr %map, i32 0, i32 4
+  %table = load ptr, ptr %table.field
+  %keys.field = getelementptr %mylang_map, ptr %map, i32 0, i32 5
+  %keys = load ptr, ptr %keys.field
+
+  %hash = call i64 @mylang_map_hash(i32 %kind, i64 %key)
+  %slots = shl i64 %capacity, 1
+  %mask = sub i64 %slots, 1
+  %start = and i64 %hash, %mask
+  br label %probe
+
+probe:
+  %slot = phi i64 [ %start, %entry ], [ %slot.next, %next ]
+  %slot.field = getelementptr i64, ptr %table, i64 %slot
+  %number = load i64, ptr %slot.field
+  %empty = icmp eq i64 %number, 0
+  br i1 %empty, label %missing, label %compare
+
+compare:
+  %index = sub i64 %number, 1
+  %key.field = getelementptr i64, ptr %keys, i64 %index
+  %candidate = load i64, ptr %key.field
+  %equal = call i1 @mylang_map_key_equal(i32 %kind, i64 %candidate, i64 %key)
+  br i1 %equal, label %found, label %next
+
+next:
+  %slot.after = add i64 %slot, 1
+  %slot.next = and i64 %slot.after, %mask
+  br label %probe
+
+found:
+  ret i64 %index
+
+missing:
+  ret i64 -1
+}
+
+; Pointer to the value for `key`, or null if the map has no such key.
+define linkonce_odr ptr @mylang_map_get(ptr %map, i64 %key) {
+entry:
+  %index = call i64 @mylang_map_find(ptr %map, i64 %key)
+  %missing = icmp slt i64 %index, 0
+  br i1 %missing, label %none, label %found
+
+none:
+  ret ptr null
+
+found:
+  %value_size.field = getelementptr %mylang_map, ptr %map, i32 0, i32 3
+  %value_size = load i64, ptr %value_size.field
+  %values.field = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  %values = load ptr, ptr %values.field
+  %offset = mul i64 %index, %value_size
+  %value = getelementptr i8, ptr %values, i64 %offset
+  ret ptr %value
+}
+
+; Doubles the room for entries and rebuilds the table for it.
+define linkonce_odr void @mylang_map_grow(ptr %map) noinline {
+entry:
+  %count = load i64, ptr %map
+  %capacity.field = getelementptr %mylang_map, ptr %map, i32 0, i32 1
+  %capacity = load i64, ptr %capacity.field
+  %kind.field = getelementptr %mylang_map, ptr %map, i32 0, i32 2
+  %kind = load i32, ptr %kind.field
+  %value_size.field = getelementptr %mylang_map, ptr %map, i32 0, i32 3
+  %value_size = load i64, ptr %value_size.field
+  %table.field = getelementptr %mylang_map, ptr %map, i32 0, i32 4
+  %table = load ptr, ptr %table.field
+  %keys.field = getelementptr %mylang_map, ptr %map, i32 0, i32 5
+  %keys = load ptr, ptr %keys.field
+  %values.field = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  %values = load ptr, ptr %values.field
+
+  %capacity.new = shl i64 %capacity, 1
+  %keys.size = shl i64 %capacity.new, 3
+  %keys.new = call ptr @realloc(ptr %keys, i64 %keys.size)
+  %values.size = mul i64 %capacity.new, %value_size
+  %values.new = call ptr @realloc(ptr %values, i64 %values.size)
+  %keys.failed = icmp eq ptr %keys.new, null
+  %values.failed = icmp eq ptr %values.new, null
+  %failed = or i1 %keys.failed, %values.failed
+  br i1 %failed, label %oom, label %rehash, !prof !0
+
+oom:
+  call void @mylang_panic(ptr @.text.out_of_memory)
+  unreachable
+
+rehash:
+  %slots = shl i64 %capacity.new, 1
+  %table.size = shl i64 %slots, 3
+  %table.new = call ptr @mylang_alloc(i64 %table.size)
+  call void @llvm.memset.p0.i64(ptr %table.new, i8 0, i64 %table.size, i1 false)
+  %mask = sub i64 %slots, 1
+  br label %entries.cond
+
+entries.cond:
+  %i = phi i64 [ 0, %rehash ], [ %i.next, %placed ]
+  %done = icmp uge i64 %i, %count
+  br i1 %done, label %end, label %entries.body
+
+entries.body:
+  %key.field = getelementptr i64, ptr %keys.new, i64 %i
+  %key = load i64, ptr %key.field
+  %hash = call i64 @mylang_map_hash(i32 %kind, i64 %key)
+  %start = and i64 %hash, %mask
+  br label %probe
+
+probe:
+  %slot = phi i64 [ %start, %entries.body ], [ %slot.next, %occupied ]
+  %slot.field = getelementptr i64, ptr %table.new, i64 %slot
+  %number = load i64, ptr %slot.field
+  %empty = icmp eq i64 %number, 0
+  br i1 %empty, label %placed, label %occupied
+
+occupied:
+  %slot.after = add i64 %slot, 1
+  %slot.next = and i64 %slot.after, %mask
+  br label %probe
+
+placed:
+  %i.next = add i64 %i, 1
+  store i64 %i.next, ptr %slot.field
+  br label %entries.cond
+
+end:
+  call void @free(ptr %table)
+  store i64 %capacity.new, ptr %capacity.field
+  store ptr %table.new, ptr %table.field
+  store ptr %keys.new, ptr %keys.field
+  store ptr %values.new, ptr %values.field
+  ret void
+}
+
+; Pointer to the value for `key`, adding the key first if it's missing. The
+; caller stores the value.
+define linkonce_odr ptr @mylang_map_insert(ptr %map, i64 %key) {
+entry:
+  %value_size.field = getelementptr %mylang_map, ptr %map, i32 0, i32 3
+  %value_size = load i64, ptr %value_size.field
+  %index = call i64 @mylang_map_find(ptr %map, i64 %key)
+  %exists = icmp sge i64 %index, 0
+  br i1 %exists, label %existing, label %insert
+
+existing:
+  %values.field.existing = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  %values.existing = load ptr, ptr %values.field.existing
+  %offset.existing = mul i64 %index, %value_size
+  %value.existing = getelementptr i8, ptr %values.existing, i64 %offset.existing
+  ret ptr %value.existing
+
+insert:
+  %count = load i64, ptr %map
+  %capacity.field = getelementptr %mylang_map, ptr %map, i32 0, i32 1
+  %capacity.old = load i64, ptr %capacity.field
+  %full = icmp eq i64 %count, %capacity.old
+  br i1 %full, label %grow, label %place, !prof !0
+
+grow:
+  call void @mylang_map_grow(ptr %map)
+  br label %place
+
+place:
+  %capacity = load i64, ptr %capacity.field
+  %kind.field = getelementptr %mylang_map, ptr %map, i32 0, i32 2
+  %kind = load i32, ptr %kind.field
+  %table.field = getelementptr %mylang_map, ptr %map, i32 0, i32 4
+  %table = load ptr, ptr %table.field
+  %hash = call i64 @mylang_map_hash(i32 %kind, i64 %key)
+  %slots = shl i64 %capacity, 1
+  %mask = sub i64 %slots, 1
+  %start = and i64 %hash, %mask
+  br label %probe
+
+probe:
+  %slot = phi i64 [ %start, %place ], [ %slot.next, %occupied ]
+  %slot.field = getelementptr i64, ptr %table, i64 %slot
+  %number = load i64, ptr %slot.field
+  %empty = icmp eq i64 %number, 0
+  br i1 %empty, label %placed, label %occupied
+
+occupied:
+  %slot.after = add i64 %slot, 1
+  %slot.next = and i64 %slot.after, %mask
+  br label %probe
+
+placed:
+  %count.next = add i64 %count, 1
+  store i64 %count.next, ptr %slot.field
+  %keys.field = getelementptr %mylang_map, ptr %map, i32 0, i32 5
+  %keys = load ptr, ptr %keys.field
+  %key.field = getelementptr i64, ptr %keys, i64 %count
+  store i64 %key, ptr %key.field
+  store i64 %count.next, ptr %map
+  %values.field = getelementptr %mylang_map, ptr %map, i32 0, i32 6
+  %values = load ptr, ptr %values.field
+  %offset = mul i64 %count, %value_size
+  %value = getelementptr i8, ptr %values, i64 %offset
+  ret ptr %value
+}
+
+!0 = !{!"branch_weights", i32 1, i32 1048575}
+!1 = !{!"branch_weights", i32 1048575, i32 1}
@@ -0,0 +1,72 @@
+import os
+
+from llvmlite import ir
+
+from src.ast.Node import Node
+from src.ast.statement.FunctionStatement import FunctionStatement
+
+I32 = ir.IntType(32)
+
+
+class DebugInfo:
+    """
+    Helper class that emits DWARF line tables mapping the compiled code back
+    to the `.line` source: a `DISubprogram` per function, and a `DILocation`
+    with the statement's `line_no` on every instruction emitted for it.
+
+    Debuggers and `perf report` on AOT builds (see `ParallelCompiler`) then
+    show `.line` functions and lines. Only line tables are emitted, there is
+    no variable or type information.
+    """
+    def __init__(self, compiler, path: str) -> None:
+        self.compiler = compiler
+        module: ir.Module = compiler.module
+
+        self.file = module.add_debug_info("DIFile", {
+            "filename": os.path.basename(path),
+            "directory": os.path.dirname(os.path.abspath(path)),
+        })
+        self.unit = module.add_debug_info("DICompileUnit", {
+            "language": ir.DIToken("DW_LANG_C"),
+            "file": self.file,
+            "producer": "mylang",
+            "runtimeVersion": 0,
+            "isOptimized": True,
+            "emissionKind": ir.DIToken("LineTablesOnly"),
+        }, is_distinct=True)
+        module.add_named_metadata("llvm.dbg.cu", self.unit)
+        self.subroutine_type = module.add_debug_info("DISubroutineType", {"types": module.add_metadata([])})
+
+        # Warning (2) on mismatches, as clang does, so modules with and without it still link
+        module.add_named_metadata("llvm.module.flags", [ir.Constant(I32, 2), "Dwarf Version", ir.Constant(I32, 4)])
+        module.add_named_metadata("llvm.module.flags", [ir.Constant(I32, 2), "Debug Info Version", ir.Constant(I32, 3)])
+
+        # Subprogram of the function being compiled, locations need one as their scope
+        self.scope = None
+
+    def function(self, node: FunctionStatement, function: ir.Function) -> None:
+        """Attaches a subprogram to `function` and points the builder at its first line."""
+        self.scope = self.compiler.module.add_debug_info("DISubprogram", {
+            "name": node.name.value,
+            "file": self.file,
+            "line": node.line_no,
+            "type": self.subroutine_type,
+            "scopeLine": node.line_no,
+            "unit": self.unit,
+            "spFlags": ir.DIToken("DISPFlagDefinition"),
+        }, is_distinct=True)
+        function.set_metadata("dbg", self.scope)
+        self.statement(node)
+
+    def statement(self, node: Node) -> None:
+        """Attributes the instructions emitted from now on to `node`'s line."""
+        if self.scope is None or node.line_no == 0:
+            return
+        self.compiler.builder.debug_metadata = self.compiler.module.add_debug_info("DILocation", {
+            "line": node.line_no,
+            "column": 0,
+            "scope": self.scope,
+        })
+
+    def end_function(self) -> None:
+        self.scope = None
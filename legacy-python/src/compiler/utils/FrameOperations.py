@@ -0,0 +1,167 @@
+from llvmlite import ir
+
+# Element types a vector, and so a frame column, can hold
+VECTOR_ELEMENTS: tuple[str, ...] = ("int", "float", "bool")
+
+
+class FrameOperations:
+    """
+    Helper class for lowering vector and frame values.
+
+    A `vector[T]` has the layout of a `list[T]`, a `{T*, i64}` slice over
+    contiguous elements, so it shares every list operation: arithmetic on
+    vectors is `ListOperations.elementwise`, one loop over the whole columns
+    that LLVM vectorizes. `vector(xs)` copies the elements to the heap, so
+    a vector outlives the list literal it was made from.
+
+    A frame is an identified struct of its columns' slices, named after its
+    schema (`mylang.frame[price: float, qty: int]`), which `frame_type`
+    records so columns are found by name at compile time. Selecting a
+    column extracts its slice and `with_column` builds a new struct from the
+    same slices, so neither copies any elements. The columns have the same
+    length, checked when a frame is built, which is the frame's row count.
+    """
+    # name of the struct -> (column name, element type) of every column
+    types: dict[str, list[tuple[str, ir.Type]]] = {}
+
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    # region Types
+
+    def vector_type(self, element_type: ir.Type) -> ir.LiteralStructType:
+        if element_type not in self.__elements():
+            raise TypeError(f"Vector elements must be int, float or bool, got '{element_type}'.")
+        return self.compiler.lists.list_type(element_type)
+
+    def is_vector(self, Type: ir.Type) -> bool:
+        lists = self.compiler.lists
+        return lists.is_list(Type) and lists.element_type(Type) in self.__elements()
+
+    def frame_type(self, columns: list[tuple[str, ir.Type]]) -> ir.IdentifiedStructType:
+        """The frame with columns of the given names and element types, in order."""
+        names = [name for name, _ in columns]
+        if len(columns) == 0 or len(set(names)) != len(names):
+            raise TypeError(f"A frame needs columns with distinct names, got {', '.join(map(repr, names))}.")
+        schema = ", ".join(f"{name}: {self.__type_name(element_type)}" for name, element_type in columns)
+        name = f"mylang.frame[{schema}]"
+        Type = ir.global_context.get_identified_type(name)
+        if Type.is_opaque:
+            Type.set_body(*[self.vector_type(element_type) for _, element_type in columns])
+        FrameOperations.types[name] = list(columns)
+        return Type
+
+    @staticmethod
+    def is_frame(Type: ir.Type) -> bool:
+        return isinstance(Type, ir.IdentifiedStructType) and Type.name in FrameOperations.types
+
+    @staticmethod
+    def columns(frame_type: ir.IdentifiedStructType) -> list[tuple[str, ir.Type]]:
+        return FrameOperations.types[frame_type.name]
+
+    # endregion
+
+    # region Values
+
+    def vector(self, values: ir.Value, list_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """A new vector with the elements of a list, in heap storage."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        vector_type = self.vector_type(lists.element_type(list_type))
+        data, count = lists.data(values), lists.length(values)
+        elements = lists.allocate(lists.element_type(list_type), count)
+        with lists.for_range(count) as i:
+            builder.store(builder.load(builder.gep(data, [i])), builder.gep(elements, [i]))
+        return lists.make(elements, count), vector_type
+
+    def frame(self, columns: list[tuple[str, ir.Value, ir.Type]]) -> tuple[ir.Value, ir.Type]:
+        """A frame of (name, vector, vector type) columns, which must have the same length."""
+        lists = self.compiler.lists
+        for name, _, Type in columns:
+            if not self.is_vector(Type):
+                raise TypeError(f"Frame column '{name}' must be a list or vector of int, float or bool, got '{Type}'.")
+        frame_type = self.frame_type([(name, lists.element_type(Type)) for name, _, Type in columns])
+
+        rows = lists.length(columns[0][1])
+        for _, values, _ in columns[1:]:
+            self.__check_rows(values, rows)
+        return self.__make(frame_type, [values for _, values, _ in columns]), frame_type
+
+    def column(self, frame: ir.Value, name: str) -> tuple[ir.Value, ir.Type]:
+        """The column `name` of a frame, sharing its elements."""
+        columns = self.columns(frame.type)
+        index = self.__index(columns, name)
+        return self.compiler.builder.extract_value(frame, index), self.vector_type(columns[index][1])
+
+    def rows(self, frame: ir.Value) -> ir.Value:
+        """Row count of a frame, as an i64."""
+        return self.compiler.lists.length(self.compiler.builder.extract_value(frame, 0))
+
+    def with_column(self, frame: ir.Value, name: str, values: ir.Value, Type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """
+        A new frame with `values` as column `name`, added after the others or
+        replacing the column of that name, sharing the other columns.
+        """
+        builder = self.compiler.builder
+        if not self.is_vector(Type):
+            raise TypeError(f"Frame column '{name}' must be a list or vector of int, float or bool, got '{Type}'.")
+        self.__check_rows(values, self.rows(frame))
+
+        columns = self.columns(frame.type)
+        slices = [builder.extract_value(frame, i) for i in range(len(columns))]
+        element_type = self.compiler.lists.element_type(Type)
+        if any(column == name for column, _ in columns):
+            index = self.__index(columns, name)
+            columns = columns[:index] + [(name, element_type)] + columns[index + 1:]
+            slices[index] = values
+        else:
+            columns = columns + [(name, element_type)]
+            slices.append(values)
+
+        frame_type = self.frame_type(columns)
+        return self.__make(frame_type, slices), frame_type
+
+    def project(self, frame: ir.Value, frame_type: ir.IdentifiedStructType) -> ir.Value:
+        """
+        `frame` as a frame of `frame_type`, whose columns it must have (with
+        the same element types), sharing them: a frame with more columns can
+        be passed where fewer are expected.
+        """
+        if frame.type == frame_type:
+            return frame
+        columns = self.columns(frame.type)
+        slices = []
+        for name, element_type in self.columns(frame_type):
+            index = self.__index(columns, name)
+            if columns[index][1] != element_type:
+                raise TypeError(f"Frame column '{name}' is '{columns[index][1]}', expected '{element_type}'.")
+            slices.append(self.compiler.builder.extract_value(frame, index))
+        return self.__make(frame_type, slices)
+
+    # endregion
+
+    def __make(self, frame_type: ir.IdentifiedStructType, slices: list[ir.Value]) -> ir.Value:
+        builder = self.compiler.builder
+        value = ir.Constant(frame_type, ir.Undefined)
+        for i, values in enumerate(slices):
+            value = builder.insert_value(value, values, i)
+        return value
+
+    def __check_rows(self, values: ir.Value, rows: ir.Value) -> None:
+        builder = self.compiler.builder
+        mismatch = builder.icmp_signed("!=", self.compiler.lists.length(values), rows)
+        with builder.if_then(mismatch, likely=False):
+            self.compiler.lists.panic("frame columns must have the same length")
+
+    @staticmethod
+    def __index(columns: list[tuple[str, ir.Type]], name: str) -> int:
+        for i, (column, _) in enumerate(columns):
+            if column == name:
+                return i
+        raise TypeError(f"Frame has no column '{name}', its columns are {', '.join(column for column, _ in columns)}.")
+
+    def __elements(self) -> list[ir.Type]:
+        return [self.compiler.type_map[name] for name in VECTOR_ELEMENTS]
+
+    def __type_name(self, element_type: ir.Type) -> str:
+        return next(name for name in VECTOR_ELEMENTS if self.compiler.type_map[name] == element_type)
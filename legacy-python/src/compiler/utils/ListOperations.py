@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+
+from llvmlite import ir
+
+COMPARISON_OPERATORS: set[str] = {"<", "<=", ">", ">=", "==", "!="}
+
+
+class ListOperations:
+    """
+    Helper class for lowering list values.
+
+    A compiled list is a `{T*, i64}` pair: a pointer to contiguous elements
+    followed by the element count. Elements are in heap storage from
+    `mylang_alloc`, literals included, so lists can outlive the function
+    that made them.
+    """
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    # region Types
+
+    @staticmethod
+    def list_type(element_type: ir.Type) -> ir.LiteralStructType:
+        return ir.LiteralStructType([element_type.as_pointer(), ir.IntType(64)])
+
+    @staticmethod
+    def is_list(value_type: ir.Type) -> bool:
+        return (
+            isinstance(value_type, ir.LiteralStructType)
+            and len(value_type.elements) == 2
+            and isinstance(value_type.elements[0], ir.PointerType)
+            and value_type.elements[1] == ir.IntType(64)
+        )
+
+    @staticmethod
+    def element_type(list_type: ir.LiteralStructType) -> ir.Type:
+        return list_type.elements[0].pointee
+
+    # endregion
+
+    # region Values
+
+    def make(self, data: ir.Value, length: ir.Value) -> ir.Value:
+        """Packs a data pointer and a length into a list value."""
+        builder = self.compiler.builder
+        value = ir.Constant(self.list_type(data.type.pointee), ir.Undefined)
+        value = builder.insert_value(value, data, 0)
+        return builder.insert_value(value, length, 1)
+
+    def data(self, value: ir.Value) -> ir.Value:
+        return self.compiler.builder.extract_value(value, 0)
+
+    def length(self, value: ir.Value) -> ir.Value:
+        return self.compiler.builder.extract_value(value, 1)
+
+    def allocate(self, element_type: ir.Type, length: ir.Value) -> ir.Value:
+        """
+        Allocates heap storage for `length` elements and returns a typed pointer to it.
+        """
+        builder = self.compiler.builder
+        # sizeof(T) * length, computed with the `gep null` idiom so no data layout is needed
+        null = ir.Constant(element_type.as_pointer(), None)
+        size = builder.ptrtoint(builder.gep(null, [length]), ir.IntType(64))
+        raw = self.compiler.runtime.call("mylang_alloc", [size])
+        return builder.bitcast(raw, element_type.as_pointer())
+
+    @contextmanager
+    def for_range(self, count: ir.Value, start: ir.Value = None, step: int = 1):
+        """
+        Emits a counted loop `for (i = start; i < count; i += step)` and yields the i64 index.
+        The loop is in SSA form so LLVM's loop vectorizer can pick it up.
+        """
+        builder = self.compiler.builder
+        function = builder.function
+
+        preheader = builder.block
+        condition_block = function.append_basic_block("for.cond")
+        body_block = function.append_basic_block("for.body")
+        end_block = function.append_basic_block("for.end")
+
+        builder.branch(condition_block)
+        builder.position_at_end(condition_block)
+        index = builder.phi(ir.IntType(64), name="i")
+        index.add_incoming(start if start is not None else ir.Constant(ir.IntType(64), 0), preheader)
+        builder.cbranch(builder.icmp_signed("<", index, count), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        yield index
+
+        next_index = builder.add(index, ir.Constant(ir.IntType(64), step), name="i.next")
+        index.add_incoming(next_index, builder.block)
+        builder.branch(condition_block)
+
+        builder.position_at_end(end_block)
+
+    # endregion
+
+    # region Elementwise
+
+    def elementwise(self, operator: str,
+                    left_value: ir.Value, left_type: ir.Type,
+                    right_value: ir.Value, right_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """
+        Applies an infix operator to every element of one or two lists.
+        A scalar operand is broadcast against every element of the other side.
+        `/` divides as floats, whatever the element types, as the interpreter does.
+        """
+        builder = self.compiler.builder
+
+        left_is_list, right_is_list = self.is_list(left_type), self.is_list(right_type)
+        left_element = self.element_type(left_type) if left_is_list else left_type
+        right_element = self.element_type(right_type) if right_is_list else right_type
+
+        if left_is_list and right_is_list:
+            length = self.length(left_value)
+            mismatch = builder.icmp_signed("!=", length, self.length(right_value))
+            with builder.if_then(mismatch, likely=False):
+                self.panic(f"list operands of '{operator}' must have the same length")
+        else:
+            length = self.length(left_value if left_is_list else right_value)
+
+        result_element = self.__result_element_type(operator, left_element, right_element)
+        result_data = self.allocate(result_element, length)
+
+        left_data = self.data(left_value) if left_is_list else None
+        right_data = self.data(right_value) if right_is_list else None
+
+        with self.for_range(length) as i:
+            left = builder.load(builder.gep(left_data, [i])) if left_is_list else left_value
+            right = builder.load(builder.gep(right_data, [i])) if right_is_list else right_value
+            if operator == "/":
+                left, right = self.__as_float(left, left_element), self.__as_float(right, right_element)
+                value, _ = self.compiler.emit_infix(operator, left, result_element, right, result_element)
+            else:
+                value, _ = self.compiler.emit_infix(operator, left, left_element, right, right_element)
+            builder.store(value, builder.gep(result_data, [i]))
+
+        return self.make(result_data, length), self.list_type(result_element)
+
+    def __result_element_type(self, operator: str, left: ir.Type, right: ir.Type) -> ir.Type:
+        if operator in COMPARISON_OPERATORS:
+            return self.compiler.type_map["bool"]
+        if operator == "/" or isinstance(left, ir.FloatType) or isinstance(right, ir.FloatType):
+            return self.compiler.type_map["float"]
+        if isinstance(left, ir.IntType) and isinstance(right, ir.IntType):
+            return self.compiler.type_map["int"]
+        raise TypeError(f"Unsupported list element types for '{operator}': {left} and {right}")
+
+    def __as_float(self, value: ir.Value, Type: ir.Type) -> ir.Value:
+        float_type = self.compiler.type_map["float"]
+        if Type == self.compiler.type_map["int"]:
+            return self.compiler.builder.sitofp(value, float_type)
+        if Type == self.compiler.type_map["bool"]:
+            return self.compiler.builder.uitofp(value, float_type)
+        return value
+
+    # endregion
+
+    # region Runtime Errors
+
+    def panic(self, message: str) -> None:
+        """Reports `message` as a runtime error (see `mylang_panic` in runtime.ll) and ends the current block."""
+        self.compiler.runtime.call("mylang_panic", [self.compiler.create_string_constant(f"RUNTIME ERROR: {message}")])
+        self.compiler.builder.unreachable()
+
+    # endregion
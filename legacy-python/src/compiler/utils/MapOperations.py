@@ -0,0 +1,152 @@
+from llvmlite import ir
+
+I8_PTR = ir.IntType(8).as_pointer()
+I64 = ir.IntType(64)
+
+# Key kinds of the runtime's maps: hashed as integers, or as strings by content
+INTEGER_KEYS: int = 0
+STRING_KEYS: int = 1
+
+
+class MapOperations:
+    """
+    Helper class for lowering map values.
+
+    A compiled map is a pointer to the runtime's open addressing hash table
+    (`mylang_map` in runtime.ll), so `set` updates it in place for every
+    reference. Its LLVM type is a pointer to an opaque struct named after the
+    key and value types, which `map_type` records so lookups know what they
+    get back. Keys cross into the runtime as i64: ints and bools widened,
+    strings as their address (hashed and compared by content). Values are
+    stored by the compiled code into the slot the runtime returns.
+    """
+    # name of the opaque struct -> (key type, value type)
+    types: dict[str, tuple[ir.Type, ir.Type]] = {}
+
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    # region Types
+
+    def map_type(self, key_type: ir.Type, value_type: ir.Type) -> ir.PointerType:
+        if not self.__is_key(key_type):
+            raise TypeError(f"Map keys must be int, bool or str, got '{key_type}'.")
+        name = f"mylang.map.{key_type}.{value_type}"
+        MapOperations.types[name] = (key_type, value_type)
+        return ir.global_context.get_identified_type(name).as_pointer()
+
+    @staticmethod
+    def is_map(Type: ir.Type) -> bool:
+        return (
+            isinstance(Type, ir.PointerType)
+            and isinstance(Type.pointee, ir.IdentifiedStructType)
+            and Type.pointee.name in MapOperations.types
+        )
+
+    @staticmethod
+    def key_type(map_type: ir.PointerType) -> ir.Type:
+        return MapOperations.types[map_type.pointee.name][0]
+
+    @staticmethod
+    def value_type(map_type: ir.PointerType) -> ir.Type:
+        return MapOperations.types[map_type.pointee.name][1]
+
+    # endregion
+
+    # region Values
+
+    def new(self, map_type: ir.PointerType) -> ir.Value:
+        """Allocates an empty map of `map_type`."""
+        builder = self.compiler.builder
+        key_type, value_type = self.key_type(map_type), self.value_type(map_type)
+        kind = STRING_KEYS if key_type == self.compiler.type_map["str"] else INTEGER_KEYS
+        # sizeof(V), computed with the `gep null` idiom so no data layout is needed
+        null = ir.Constant(value_type.as_pointer(), None)
+        size = builder.ptrtoint(builder.gep(null, [ir.Constant(I64, 1)]), I64)
+        handle = self.compiler.runtime.call("mylang_map_new", [ir.Constant(ir.IntType(32), kind), size])
+        return builder.bitcast(handle, map_type)
+
+    def get(self, value: ir.Value, key: ir.Value, key_type: ir.Type, default: ir.Value = None) -> ir.Value:
+        """The value for `key`, `default` if it's missing, or a runtime error without a default."""
+        builder = self.compiler.builder
+        value_type = self.value_type(value.type)
+        slot = self.compiler.runtime.call("mylang_map_get", [self.__handle(value), self.__key(key, key_type, value.type)])
+        missing = builder.icmp_unsigned("==", slot, ir.Constant(I8_PTR, None))
+        if default is not None:
+            result = self.compiler.alloca(value_type, name="map_get")
+            with builder.if_else(missing) as (absent, present):
+                with absent:
+                    builder.store(default, result)
+                with present:
+                    builder.store(builder.load(builder.bitcast(slot, value_type.as_pointer())), result)
+            return builder.load(result)
+
+        with builder.if_then(missing, likely=False):
+            self.compiler.lists.panic("key not found in map")
+        return builder.load(builder.bitcast(slot, value_type.as_pointer()))
+
+    def contains(self, value: ir.Value, key: ir.Value, key_type: ir.Type) -> ir.Value:
+        """Whether the map has `key`, as an i1."""
+        slot = self.compiler.runtime.call("mylang_map_get", [self.__handle(value), self.__key(key, key_type, value.type)])
+        return self.compiler.builder.icmp_unsigned("!=", slot, ir.Constant(I8_PTR, None))
+
+    def set(self, value: ir.Value, key: ir.Value, key_type: ir.Type, item: ir.Value) -> None:
+        """Associates `item` with `key`, adding the key or replacing its value."""
+        builder = self.compiler.builder
+        slot = self.compiler.runtime.call("mylang_map_insert", [self.__handle(value), self.__key(key, key_type, value.type)])
+        builder.store(item, builder.bitcast(slot, self.value_type(value.type).as_pointer()))
+
+    def keys(self, value: ir.Value) -> tuple[ir.Value, ir.Type]:
+        """A new list of the keys, in insertion order."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        key_type = self.key_type(value.type)
+        count = self.compiler.runtime.call("mylang_map_count", [self.__handle(value)])
+        keys = self.compiler.runtime.call("mylang_map_keys", [self.__handle(value)])
+        results = lists.allocate(key_type, count)
+        with lists.for_range(count) as i:
+            key = builder.load(builder.gep(keys, [i]))
+            if isinstance(key_type, ir.PointerType):
+                key = builder.inttoptr(key, key_type)
+            else:
+                key = builder.trunc(key, key_type)
+            builder.store(key, builder.gep(results, [i]))
+        return lists.make(results, count), lists.list_type(key_type)
+
+    def values(self, value: ir.Value) -> tuple[ir.Value, ir.Type]:
+        """A new list of the values, in insertion order."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        value_type = self.value_type(value.type)
+        count = self.compiler.runtime.call("mylang_map_count", [self.__handle(value)])
+        values = builder.bitcast(self.compiler.runtime.call("mylang_map_values", [self.__handle(value)]), value_type.as_pointer())
+        results = lists.allocate(value_type, count)
+        with lists.for_range(count) as i:
+            builder.store(builder.load(builder.gep(values, [i])), builder.gep(results, [i]))
+        return lists.make(results, count), lists.list_type(value_type)
+
+    def item(self, value: ir.Value, Type: ir.Type, expected: ir.Type, what: str) -> ir.Value:
+        """`value` as a key or value of type `expected`, converting ints to floats."""
+        if Type == expected:
+            return value
+        if Type == self.compiler.type_map["int"] and expected == self.compiler.type_map["float"]:
+            return self.compiler.builder.sitofp(value, expected)
+        raise TypeError(f"Map {what} must be '{expected}', got '{Type}'.")
+
+    # endregion
+
+    def __handle(self, value: ir.Value) -> ir.Value:
+        return self.compiler.builder.bitcast(value, I8_PTR)
+
+    def __key(self, key: ir.Value, Type: ir.Type, map_type: ir.PointerType) -> ir.Value:
+        """`key` as the runtime's i64 key."""
+        builder = self.compiler.builder
+        key = self.item(key, Type, self.key_type(map_type), "keys")
+        if isinstance(key.type, ir.PointerType):
+            return builder.ptrtoint(key, I64)
+        if key.type == ir.IntType(1):
+            return builder.zext(key, I64)
+        return builder.sext(key, I64)
+
+    def __is_key(self, Type: ir.Type) -> bool:
+        return Type in (self.compiler.type_map["int"], self.compiler.type_map["bool"], self.compiler.type_map["str"])
@@ -0,0 +1,201 @@
+from llvmlite import ir
+
+# Elements handled per iteration of the vectorized list loops
+LANES: int = 4
+
+# Integer operators `checked` covers
+CHECKED_OPERATORS: set[str] = {"+", "-", "*", "%"}
+
+# Unary math builtins and the LLVM intrinsic each one lowers to
+UNARY_INTRINSICS: dict[str, str] = {"sqrt": "llvm.sqrt", "log": "llvm.log", "exp": "llvm.exp"}
+
+
+class MathOperations:
+    """
+    Helper class for lowering `^` and the math builtins to LLVM intrinsics.
+
+    - `int ^ int` stays an integer and uses exponentiation by squaring.
+      A negative exponent, or a result that overflows an i32, is a runtime
+      error, as in the interpreter.
+    - `float ^ int` lowers to `llvm.powi`, anything else with a float to `llvm.pow`.
+    - `sqrt`, `log` and `exp` lower to `llvm.sqrt`, `llvm.log` and `llvm.exp`,
+      always on floats, and on lists run `LANES` elements at a time through
+      the vector form of the intrinsic.
+    - With `Compiler.checked_arithmetic`, int `+`, `-`, `*` and `%` are
+      runtime errors where an i32 result would differ from the exact one
+      (see `checked`).
+    """
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    # region Power
+
+    def power(self, base: ir.Value, base_type: ir.Type, exponent: ir.Value, exponent_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        builder = self.compiler.builder
+        module = self.compiler.module
+        int_type, float_type = self.compiler.type_map["int"], self.compiler.type_map["float"]
+
+        if base_type == int_type and exponent_type == int_type:
+            return builder.call(self.__integer_power(), [base, exponent]), int_type
+
+        if base_type == int_type:
+            base = builder.sitofp(base, float_type)
+        if exponent_type == int_type:
+            powi_type = ir.FunctionType(float_type, [float_type, int_type])
+            powi = module.declare_intrinsic("llvm.powi", [float_type, int_type], fnty=powi_type)
+            return builder.call(powi, [base, exponent]), float_type
+
+        pow_fn = module.declare_intrinsic("llvm.pow", [float_type])
+        return builder.call(pow_fn, [base, exponent]), float_type
+
+    def __integer_power(self) -> ir.Function:
+        """Returns `i32 @mylang.ipow(i32 base, i32 exponent)`, emitting it the first time it's needed."""
+        module = self.compiler.module
+        name = "mylang.ipow"
+        if name in module.globals:
+            return module.globals[name]
+
+        int_type = self.compiler.type_map["int"]
+        function = ir.Function(module, ir.FunctionType(int_type, [int_type, int_type]), name=name)
+        function.linkage = "internal"
+        base, exponent = function.args
+
+        entry = function.append_basic_block("entry")
+        loop = function.append_basic_block("loop")
+        step = function.append_basic_block("step")
+        done = function.append_basic_block("done")
+        negative = function.append_basic_block("negative")
+        overflow = function.append_basic_block("overflow")
+
+        previous_builder = self.compiler.builder
+        builder = self.compiler.builder = ir.IRBuilder(entry)
+
+        zero, one = ir.Constant(int_type, 0), ir.Constant(int_type, 1)
+        builder.cbranch(builder.icmp_signed("<", exponent, zero), negative, loop)
+        builder.block.terminator.set_weights([0, 1])
+
+        builder.position_at_end(negative)
+        self.compiler.lists.panic("negative exponent in integer '^', use a float base")
+
+        builder.position_at_end(overflow)
+        self.compiler.lists.panic("integer overflow in '^'")
+
+        # result *= base when the low bit is set, base *= base, exponent >>= 1.
+        # Either product overflowing is an error, except for the square after
+        # the last bit, which is never used
+        builder.position_at_end(loop)
+        result = builder.phi(int_type, name="result")
+        square = builder.phi(int_type, name="square")
+        remaining = builder.phi(int_type, name="remaining")
+        result.add_incoming(one, entry)
+        square.add_incoming(base, entry)
+        remaining.add_incoming(exponent, entry)
+
+        odd = builder.trunc(remaining, ir.IntType(1))
+        product = builder.smul_with_overflow(result, square)
+        next_result = builder.select(odd, builder.extract_value(product, 0), result)
+        next_remaining = builder.lshr(remaining, one)
+        next_square = builder.smul_with_overflow(square, square)
+        finished = builder.icmp_signed("==", next_remaining, zero)
+        overflows = builder.or_(builder.and_(odd, builder.extract_value(product, 1)),
+                                builder.and_(builder.not_(finished), builder.extract_value(next_square, 1)))
+        builder.cbranch(overflows, overflow, step)
+        builder.block.terminator.set_weights([0, 1])
+
+        builder.position_at_end(step)
+        result.add_incoming(next_result, step)
+        square.add_incoming(builder.extract_value(next_square, 0), step)
+        remaining.add_incoming(next_remaining, step)
+        builder.cbranch(finished, done, loop)
+
+        builder.position_at_end(done)
+        builder.ret(next_result)
+
+        self.compiler.builder = previous_builder
+        return function
+
+    # endregion
+
+    # region Unary Functions
+
+    def unary(self, name: str, value: ir.Value, value_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """Applies `sqrt`, `log` or `exp` to a scalar or to every element of a list."""
+        float_type = self.compiler.type_map["float"]
+        if self.compiler.lists.is_list(value_type):
+            return self.__unary_list(name, value, value_type), self.compiler.lists.list_type(float_type)
+
+        if value_type == self.compiler.type_map["int"]:
+            value = self.compiler.builder.sitofp(value, float_type)
+        elif value_type != float_type:
+            raise TypeError(f"{name}() expects an int, a float or a list of them, got '{value_type}'.")
+        return self.__call_intrinsic(name, value), float_type
+
+    def __unary_list(self, name: str, value: ir.Value, value_type: ir.Type) -> ir.Value:
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        float_type = self.compiler.type_map["float"]
+        vector_type = ir.VectorType(float_type, LANES)
+
+        element_type = lists.element_type(value_type)
+        if element_type not in (self.compiler.type_map["int"], float_type):
+            raise TypeError(f"{name}() expects a list of int or float, got '{element_type}'.")
+
+        data, length = lists.data(value), lists.length(value)
+        result = lists.allocate(float_type, length)
+
+        # Largest multiple of LANES that fits in `length`
+        main_count = builder.and_(length, ir.Constant(ir.IntType(64), -LANES), name="main_count")
+        with lists.for_range(main_count, step=LANES) as i:
+            source_type = ir.VectorType(element_type, LANES).as_pointer()
+            lanes = builder.load(builder.bitcast(builder.gep(data, [i]), source_type), align=4)
+            if element_type != float_type:
+                lanes = builder.sitofp(lanes, vector_type)
+            output = builder.bitcast(builder.gep(result, [i]), vector_type.as_pointer())
+            builder.store(self.__call_intrinsic(name, lanes), output, align=4)
+
+        with lists.for_range(length, start=main_count) as i:
+            element = builder.load(builder.gep(data, [i]))
+            if element_type != float_type:
+                element = builder.sitofp(element, float_type)
+            builder.store(self.__call_intrinsic(name, element), builder.gep(result, [i]))
+
+        return lists.make(result, length)
+
+    def __call_intrinsic(self, name: str, value: ir.Value) -> ir.Value:
+        Type = value.type
+        if isinstance(Type, ir.VectorType):
+            suffix = f"v{Type.count}{Type.element.intrinsic_name}"
+        else:
+            suffix = Type.intrinsic_name
+        function_type = ir.FunctionType(Type, [Type])
+        intrinsic = self.compiler.module.declare_intrinsic(f"{UNARY_INTRINSICS[name]}.{suffix}", fnty=function_type)
+        return self.compiler.builder.call(intrinsic, [value])
+
+    # endregion
+
+    # region Checked Arithmetic
+
+    def checked(self, operator: str, left: ir.Value, right: ir.Value) -> ir.Value:
+        """
+        `left <operator> right` on ints, a runtime error on overflow instead of
+        wrapping, and for `%` by zero (or of the smallest int by -1), which
+        would trap.
+        """
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        if operator == "%":
+            int_type = left.type
+            smallest = ir.Constant(int_type, -(1 << (int_type.width - 1)))
+            by_zero = builder.icmp_signed("==", right, ir.Constant(int_type, 0))
+            overflows = builder.and_(builder.icmp_signed("==", left, smallest), builder.icmp_signed("==", right, ir.Constant(int_type, -1)))
+            with builder.if_then(builder.or_(by_zero, overflows), likely=False):
+                lists.panic("integer '%' by zero or overflowing")
+            return builder.srem(left, right)
+
+        emit = {"+": builder.sadd_with_overflow, "-": builder.ssub_with_overflow, "*": builder.smul_with_overflow}[operator]
+        result = emit(left, right)
+        with builder.if_then(builder.extract_value(result, 1), likely=False):
+            lists.panic(f"integer overflow in '{operator}'")
+        return builder.extract_value(result, 0)
+
+    # endregion
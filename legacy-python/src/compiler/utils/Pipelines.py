@@ -0,0 +1,106 @@
+from contextlib import ExitStack
+
+from llvmlite import ir
+
+# Stages `fuse` lowers into one loop, `reduce` ends a fused run
+FUSED_STAGES: set[str] = {"map", "filter", "reduce"}
+
+
+class Pipelines:
+    """
+    Helper class for lowering `map`, `filter` and `reduce`, alone or as a run
+    of pipeline stages (`xs |> map(f) |> filter(g) |> reduce(h, 0)`).
+
+    A run of stages becomes a single loop over the source list: every element
+    is passed through each stage in turn, a filter skips the rest of the
+    stages, and the element is then either folded into the reduction or
+    appended to the result. No list is built between stages; only a run
+    ending in `map` or `filter` allocates its result, sized for the source.
+    """
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    def fuse(self, source: ir.Value, source_type: ir.Type,
+             stages: list[tuple[str, list[ir.Value], list[ir.Type]]]) -> tuple[ir.Value, ir.Type]:
+        """
+        Lowers `stages`, each a stage name with its arguments besides the piped
+        list, over the list `source`. Only the last stage can be a `reduce`.
+        """
+        lists = self.compiler.lists
+        builder = self.compiler.builder
+        if not lists.is_list(source_type):
+            raise TypeError(f"{stages[0][0]}() expects a list, got '{source_type}'.")
+
+        # Check every stage against the element type flowing into it
+        element_type = lists.element_type(source_type)
+        functions: list[ir.Function] = []
+        for name, args, types in stages:
+            function = self.__function(name, args, element_type)
+            functions.append(function)
+            if name == "map":
+                element_type = function.function_type.return_type
+
+        reduction = stages[-1][0] == "reduce"
+        if reduction:
+            _, args, types = stages[-1]
+            result_type = functions[-1].function_type.return_type
+            accumulator = self.compiler.alloca(result_type, name="reduce_accumulator")
+            builder.store(self.__initial(args[1], types[1], result_type), accumulator)
+        else:
+            count = lists.length(source)
+            results = lists.allocate(element_type, count)
+            size = self.compiler.alloca(ir.IntType(64), name="pipeline_size")
+            builder.store(ir.Constant(ir.IntType(64), 0), size)
+
+        data = lists.data(source)
+        with lists.for_range(lists.length(source)) as i:
+            value = builder.load(builder.gep(data, [i]))
+            with ExitStack() as kept:
+                for (name, _, _), function in zip(stages, functions):
+                    if name == "map":
+                        value = builder.call(function, [value])
+                    elif name == "filter":
+                        kept.enter_context(builder.if_then(self.truth(builder.call(function, [value]))))
+                    else:
+                        builder.store(builder.call(function, [builder.load(accumulator), value]), accumulator)
+
+                if not reduction:
+                    index = builder.load(size)
+                    builder.store(value, builder.gep(results, [index]))
+                    builder.store(builder.add(index, ir.Constant(ir.IntType(64), 1)), size)
+
+        if reduction:
+            return builder.load(accumulator), result_type
+        return lists.make(results, builder.load(size)), lists.list_type(element_type)
+
+    def __function(self, name: str, args: list[ir.Value], element_type: ir.Type) -> ir.Function:
+        """The function argument of a stage, checked against the elements it receives."""
+        arity = 2 if name == "reduce" else 1
+        if len(args) != arity or not isinstance(args[0], ir.Function):
+            expected = "a function and an initial value" if name == "reduce" else "a function"
+            raise ValueError(f"{name}() expects {expected} after the list.")
+
+        function: ir.Function = args[0]
+        parameters = list(function.function_type.args)
+        if name == "reduce":
+            if len(parameters) != 2 or parameters[1] != element_type or parameters[0] != function.function_type.return_type:
+                raise TypeError(f"reduce(): '{function.name}' must take the accumulator and a '{element_type}' element, and return the accumulator.")
+        elif parameters != [element_type]:
+            raise TypeError(f"{name}(): '{function.name}' must take one '{element_type}' element.")
+        return function
+
+    def __initial(self, value: ir.Value, Type: ir.Type, expected: ir.Type) -> ir.Value:
+        if Type == expected:
+            return value
+        if Type == self.compiler.type_map["int"] and expected == self.compiler.type_map["float"]:
+            return self.compiler.builder.sitofp(value, expected)
+        raise TypeError(f"reduce(): initial value must be '{expected}', got '{Type}'.")
+
+    def truth(self, value: ir.Value) -> ir.Value:
+        """A filter's result as an i1: bools as they are, numbers compared to zero."""
+        builder = self.compiler.builder
+        if value.type == ir.IntType(1):
+            return value
+        if isinstance(value.type, ir.FloatType):
+            return builder.fcmp_unordered("!=", value, ir.Constant(value.type, 0))
+        return builder.icmp_signed("!=", value, ir.Constant(value.type, 0))
@@ -0,0 +1,103 @@
+from llvmlite import ir
+
+from src.ast.expression.CallExpression import CallExpression
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.ast.statement.IfStatement import IfStatement
+from src.interpreter.Profiler import Profiler
+
+I32 = ir.IntType(32)
+I64 = ir.IntType(64)
+
+# Cutoffs of LLVM's detailed profile summary, in parts per million of all counts
+CUTOFFS: list[int] = [10000, 100000, 200000, 300000, 400000, 500000, 600000, 700000, 800000,
+                      900000, 950000, 990000, 999000, 999900, 999990, 999999]
+# Counts covering this share of the total are hot (LLVM's default hot cutoff)
+HOT_CUTOFF: int = 990000
+
+
+class ProfileGuidance:
+    """
+    Helper class that applies a profile recorded by the interpreter's `Profiler`
+    to the IR being compiled:
+    - `function_entry_count` metadata on every function,
+    - `branch_weights` metadata on the branch of every `IfStatement`,
+    - `inlinehint` on functions called from a hot call site.
+
+    It also adds the module's `ProfileSummary` flag, without which LLVM doesn't
+    trust the entry counts when deciding what is hot or cold.
+    """
+    def __init__(self, compiler, profile: dict) -> None:
+        self.compiler = compiler
+        self.functions: dict[str, int] = profile.get("functions", {})
+        self.calls: dict[str, int] = profile.get("calls", {})
+        self.branches: dict[str, list[int]] = profile.get("branches", {})
+
+        # id(node) -> label, for the functions compiled so far
+        self.labels: dict[int, str] = {}
+
+        self.counts: list[int] = sorted(
+            [*self.functions.values(), *self.calls.values(), *(c for pair in self.branches.values() for c in pair)],
+            reverse=True,
+        )
+        self.hot_count: int = self.__summary_entry(HOT_CUTOFF)[0]
+
+        self.__add_summary()
+
+    def function(self, node: FunctionStatement, function: ir.Function) -> None:
+        """Labels a function's sites and attaches its entry count (0 if it never ran)."""
+        self.labels.update(Profiler.sites(node))
+        count = self.functions.get(node.name.value, 0)
+        function.set_metadata("prof", self.compiler.module.add_metadata(["function_entry_count", ir.Constant(I64, count)]))
+
+    def branch(self, node: IfStatement, branch: ir.Instruction) -> None:
+        """Attaches the taken / not taken counts of an if statement to its conditional branch."""
+        counts = self.branches.get(self.labels.get(id(node)))
+        if counts is None or not isinstance(branch, ir.ConditionalBranch):
+            return
+        branch.set_weights([min(count, 2**32 - 1) for count in counts])
+
+    def call_site(self, node: CallExpression, callee: ir.Function) -> None:
+        """Asks the inliner to favour functions called from hot call sites."""
+        count = self.calls.get(self.labels.get(id(node)), 0)
+        if count > 0 and count >= self.hot_count:
+            callee.attributes.add("inlinehint")
+
+    # region Profile Summary
+
+    def __summary_entry(self, cutoff: int) -> tuple[int, int]:
+        """Returns the smallest count, and how many counts, it takes to cover `cutoff` ppm of the total."""
+        total = sum(self.counts)
+        if total == 0:
+            return 0, 0
+        covered = 0
+        for i, count in enumerate(self.counts):
+            covered += count
+            if covered * 1_000_000 >= cutoff * total:
+                return count, i + 1
+        return self.counts[-1], len(self.counts)
+
+    def __add_summary(self) -> None:
+        module = self.compiler.module
+
+        def field(key: str, value: int) -> ir.MDValue:
+            return module.add_metadata([key, ir.Constant(I64, value)])
+
+        detailed = [
+            module.add_metadata([ir.Constant(I32, cutoff), ir.Constant(I64, min_count), ir.Constant(I32, count)])
+            for cutoff in CUTOFFS
+            for min_count, count in [self.__summary_entry(cutoff)]
+        ]
+        maximum = self.counts[0] if len(self.counts) > 0 else 0
+        summary = module.add_metadata([
+            module.add_metadata(["ProfileFormat", "InstrProf"]),
+            field("TotalCount", sum(self.counts)),
+            field("MaxCount", maximum),
+            field("MaxInternalCount", maximum),
+            field("MaxFunctionCount", max(self.functions.values(), default=0)),
+            field("NumCounts", len(self.counts)),
+            field("NumFunctions", len(self.functions)),
+            module.add_metadata(["DetailedSummary", module.add_metadata(detailed)]),
+        ])
+        module.add_named_metadata("llvm.module.flags", [ir.Constant(I32, 1), "ProfileSummary", summary])
+
+    # endregion
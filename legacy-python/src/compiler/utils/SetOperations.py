@@ -0,0 +1,443 @@
+from contextlib import contextmanager
+from typing import Callable
+
+from llvmlite import ir
+
+from src.interpreter.SetValue import DENSE_BITS_PER_ELEMENT
+
+I32 = ir.IntType(32)
+I64 = ir.IntType(64)
+WORD_BITS: int = 64
+
+# Fields of an int set: { i64* bits, i64 words, i64 base, i32* values, i64 count }
+BITS, WORDS, BASE, VALUES, COUNT = range(5)
+
+
+class SetOperations:
+    """
+    Helper class for lowering set values.
+
+    An int set is a `{i64* bits, i64 words, i64 base, i32* values, i64 count}`
+    struct in one of two representations, chosen when it is built from a
+    list (see `DENSE_BITS_PER_ELEMENT`):
+    - dense, `bits` not null: a bitset of `words` words whose bit i is
+      element `base + i`, `base` a multiple of 64. `union`, `intersection`
+      and `difference` of two bitsets work a word at a time.
+    - sparse, `bits` null: `count` distinct ints in ascending order in
+      `values`. Operations merge the two sorted arrays, a bitset operand
+      being listed in order first.
+    A result keeps the representation its operation produced.
+
+    A str set is a `{map[str, bool]}` struct, a hash set through the
+    runtime's maps, which also keeps the insertion order.
+
+    Sets are values: operations build new sets and never change their operands.
+    """
+    # name of the struct -> element type
+    types: dict[str, ir.Type] = {}
+
+    def __init__(self, compiler):
+        self.compiler = compiler
+
+    # region Types
+
+    def set_type(self, element_type: ir.Type) -> ir.IdentifiedStructType:
+        name = f"mylang.set.{element_type}"
+        Type = ir.global_context.get_identified_type(name)
+        if Type.is_opaque:
+            if element_type == self.compiler.type_map["int"]:
+                Type.set_body(I64.as_pointer(), I64, I64, I32.as_pointer(), I64)
+            elif element_type == self.compiler.type_map["str"]:
+                Type.set_body(self.__table_type())
+            else:
+                raise TypeError(f"Set elements must be int or str, got '{element_type}'.")
+        SetOperations.types[name] = element_type
+        return Type
+
+    @staticmethod
+    def is_set(Type: ir.Type) -> bool:
+        return isinstance(Type, ir.IdentifiedStructType) and Type.name in SetOperations.types
+
+    @staticmethod
+    def element_type(set_type: ir.IdentifiedStructType) -> ir.Type:
+        return SetOperations.types[set_type.name]
+
+    def is_int_set(self, Type: ir.Type) -> bool:
+        return self.is_set(Type) and self.element_type(Type) == self.compiler.type_map["int"]
+
+    # endregion
+
+    # region Building and reading
+
+    def build(self, values: ir.Value, list_type: ir.Type) -> tuple[ir.Value, ir.Type]:
+        """A set of the distinct elements of a list."""
+        lists = self.compiler.lists
+        element_type = lists.element_type(list_type)
+        set_type = self.set_type(element_type)
+        if not self.is_int_set(set_type):
+            table = self.compiler.maps.new(self.__table_type())
+            true = ir.Constant(ir.IntType(1), 1)
+            with lists.for_range(lists.length(values)) as i:
+                element = self.compiler.builder.load(self.compiler.builder.gep(lists.data(values), [i]))
+                self.compiler.maps.set(table, element, element_type, true)
+            return self.__str_set(table), set_type
+
+        builder = self.compiler.builder
+        count = lists.length(values)
+        data = lists.data(values)
+        low = self.compiler.alloca(I64, name="set_low")
+        high = self.compiler.alloca(I64, name="set_high")
+        builder.store(ir.Constant(I64, 2 ** 31), low)
+        builder.store(ir.Constant(I64, -2 ** 31), high)
+        with lists.for_range(count) as i:
+            value = builder.sext(builder.load(builder.gep(data, [i])), I64)
+            builder.store(self.__min(builder.load(low), value), low)
+            builder.store(self.__max(builder.load(high), value), high)
+
+        # a bitset when it takes no more bits than the sorted array
+        span = builder.add(builder.sub(builder.load(high), builder.load(low)), ir.Constant(I64, 1))
+        dense = builder.and_(
+            builder.icmp_signed(">", count, ir.Constant(I64, 0)),
+            builder.icmp_signed("<=", span, builder.mul(count, ir.Constant(I64, DENSE_BITS_PER_ELEMENT))),
+        )
+        result = self.compiler.alloca(set_type, name="set")
+        with builder.if_else(dense) as (bitset, array):
+            with bitset:
+                base = self.__word_floor(builder.load(low))
+                words = builder.add(builder.ashr(builder.sub(builder.load(high), base), ir.Constant(I64, 6)), ir.Constant(I64, 1))
+                bits = self.__zeroed_words(words)
+                with lists.for_range(count) as i:
+                    offset = builder.sub(builder.sext(builder.load(builder.gep(data, [i])), I64), base)
+                    word = builder.gep(bits, [builder.ashr(offset, ir.Constant(I64, 6))])
+                    bit = builder.shl(ir.Constant(I64, 1), builder.and_(offset, ir.Constant(I64, WORD_BITS - 1)))
+                    builder.store(builder.or_(builder.load(word), bit), word)
+                builder.store(self.__dense(set_type, bits, words, base), result)
+            with array:
+                sorted_values = lists.allocate(I32, count)
+                with lists.for_range(count) as i:
+                    builder.store(builder.load(builder.gep(data, [i])), builder.gep(sorted_values, [i]))
+                self.compiler.runtime.call("mylang_sort_i32", [sorted_values, ir.Constant(I64.as_pointer(), None), count])
+                builder.store(self.__sparse(set_type, sorted_values, self.__unique(sorted_values, count)), result)
+        return builder.load(result), set_type
+
+    def contains(self, value: ir.Value, element: ir.Value, Type: ir.Type) -> ir.Value:
+        """Whether `element` is in the set, as an i1."""
+        builder = self.compiler.builder
+        element_type = self.element_type(value.type)
+        if Type != element_type:
+            raise TypeError(f"contains(): expected a '{element_type}' element, got '{Type}'.")
+        if not self.is_int_set(value.type):
+            return self.compiler.maps.contains(builder.extract_value(value, 0), element, Type)
+
+        element = builder.sext(element, I64)
+        found = self.compiler.alloca(ir.IntType(1), name="set_contains")
+        with builder.if_else(self.__is_dense(value)) as (bitset, array):
+            with bitset:
+                builder.store(self.__has_bit(value, element), found)
+            with array:
+                builder.store(self.__search(builder.extract_value(value, VALUES), builder.extract_value(value, COUNT), element), found)
+        return builder.load(found)
+
+    def elements(self, value: ir.Value) -> tuple[ir.Value, ir.Type]:
+        """A new list of the elements: ints ascending, strings in insertion order."""
+        lists = self.compiler.lists
+        if not self.is_int_set(value.type):
+            return self.compiler.maps.keys(self.compiler.builder.extract_value(value, 0))
+
+        builder = self.compiler.builder
+        data, count = self.__sorted(value)
+        copy = lists.allocate(I32, count)
+        with lists.for_range(count) as i:
+            builder.store(builder.load(builder.gep(data, [i])), builder.gep(copy, [i]))
+        return lists.make(copy, count), lists.list_type(I32)
+
+    # endregion
+
+    # region Set algebra
+
+    def union(self, left: ir.Value, right: ir.Value) -> ir.Value:
+        if not self.is_int_set(left.type):
+            return self.__str_algebra(left, right, keep_left=True, keep_both=True, keep_right=True)
+
+        builder = self.compiler.builder
+        low = self.__min(builder.extract_value(left, BASE), builder.extract_value(right, BASE))
+        high = self.__max(self.__end(left), self.__end(right))
+        # two far apart bitsets would make a huge one, they merge as arrays instead
+        count = builder.add(builder.extract_value(left, COUNT), builder.extract_value(right, COUNT))
+        compact = builder.icmp_signed("<=", builder.sub(high, low), builder.mul(count, ir.Constant(I64, DENSE_BITS_PER_ELEMENT)))
+        return self.__algebra(left, right, builder.and_(self.__both_dense(left, right), compact),
+                              low, high, builder.or_, keep_left=True, keep_both=True, keep_right=True)
+
+    def intersection(self, left: ir.Value, right: ir.Value) -> ir.Value:
+        if not self.is_int_set(left.type):
+            return self.__str_algebra(left, right, keep_left=False, keep_both=True, keep_right=False)
+
+        builder = self.compiler.builder
+        low = self.__max(builder.extract_value(left, BASE), builder.extract_value(right, BASE))
+        high = self.__max(low, self.__min(self.__end(left), self.__end(right)))
+        return self.__algebra(left, right, self.__both_dense(left, right), low, high, builder.and_,
+                              keep_left=False, keep_both=True, keep_right=False)
+
+    def difference(self, left: ir.Value, right: ir.Value) -> ir.Value:
+        if not self.is_int_set(left.type):
+            return self.__str_algebra(left, right, keep_left=True, keep_both=False, keep_right=False)
+
+        builder = self.compiler.builder
+        and_not = lambda a, b: builder.and_(a, builder.not_(b))
+        return self.__algebra(left, right, self.__both_dense(left, right),
+                              builder.extract_value(left, BASE), self.__end(left), and_not,
+                              keep_left=True, keep_both=False, keep_right=False)
+
+    def __algebra(self, left: ir.Value, right: ir.Value, words_apart: ir.Value, low: ir.Value, high: ir.Value,
+                  combine: Callable[[ir.Value, ir.Value], ir.Value], keep_left: bool, keep_both: bool, keep_right: bool) -> ir.Value:
+        """
+        Combines two int sets word by word over [low, high) when `words_apart`
+        is true, otherwise by merging their sorted elements, keeping the values
+        found only on the left, on both sides, or only on the right.
+        """
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        result = self.compiler.alloca(left.type, name="set")
+        with builder.if_else(words_apart) as (bitset, array):
+            with bitset:
+                words = builder.ashr(builder.sub(high, low), ir.Constant(I64, 6))
+                bits = lists.allocate(I64, words)
+                with lists.for_range(words) as i:
+                    position = builder.add(low, builder.shl(i, ir.Constant(I64, 6)))
+                    word = combine(self.__word_at(left, position), self.__word_at(right, position))
+                    builder.store(word, builder.gep(bits, [i]))
+                builder.store(self.__dense(left.type, bits, words, low), result)
+            with array:
+                left_values, left_count = self.__sorted(left)
+                right_values, right_count = self.__sorted(right)
+                values, count = self.__merge(left_values, left_count, right_values, right_count, keep_left, keep_both, keep_right)
+                builder.store(self.__sparse(left.type, values, count), result)
+        return builder.load(result)
+
+    def __merge(self, left: ir.Value, left_count: ir.Value, right: ir.Value, right_count: ir.Value,
+                keep_left: bool, keep_both: bool, keep_right: bool) -> tuple[ir.Value, ir.Value]:
+        """Merges two ascending arrays of distinct ints, keeping values by where they were found."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        capacity = builder.add(left_count, right_count) if keep_right else left_count
+        values = lists.allocate(I32, capacity)
+        i = self.compiler.alloca(I64, name="merge_left")
+        j = self.compiler.alloca(I64, name="merge_right")
+        size = self.compiler.alloca(I64, name="merge_size")
+        for index in (i, j, size):
+            builder.store(ir.Constant(I64, 0), index)
+
+        def keep(value: ir.Value) -> None:
+            builder.store(value, builder.gep(values, [builder.load(size)]))
+            builder.store(builder.add(builder.load(size), ir.Constant(I64, 1)), size)
+
+        def advance(index: ir.AllocaInstr) -> None:
+            builder.store(builder.add(builder.load(index), ir.Constant(I64, 1)), index)
+
+        both_left = lambda: builder.and_(builder.icmp_signed("<", builder.load(i), left_count),
+                                         builder.icmp_signed("<", builder.load(j), right_count))
+        with self.__loop(both_left):
+            a = builder.load(builder.gep(left, [builder.load(i)]))
+            b = builder.load(builder.gep(right, [builder.load(j)]))
+            with builder.if_else(builder.icmp_signed("<", a, b)) as (left_only, rest):
+                with left_only:
+                    if keep_left:
+                        keep(a)
+                    advance(i)
+                with rest:
+                    with builder.if_else(builder.icmp_signed("<", b, a)) as (right_only, both):
+                        with right_only:
+                            if keep_right:
+                                keep(b)
+                            advance(j)
+                        with both:
+                            if keep_both:
+                                keep(a)
+                            advance(i)
+                            advance(j)
+
+        if keep_left:
+            with lists.for_range(left_count, start=builder.load(i)) as k:
+                keep(builder.load(builder.gep(left, [k])))
+        if keep_right:
+            with lists.for_range(right_count, start=builder.load(j)) as k:
+                keep(builder.load(builder.gep(right, [k])))
+        return values, builder.load(size)
+
+    def __str_algebra(self, left: ir.Value, right: ir.Value, keep_left: bool, keep_both: bool, keep_right: bool) -> ir.Value:
+        """Combines two str sets through their hash tables, in the left set's insertion order, then the right's."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        maps = self.compiler.maps
+        str_type = self.compiler.type_map["str"]
+        true = ir.Constant(ir.IntType(1), 1)
+        left_table, right_table = builder.extract_value(left, 0), builder.extract_value(right, 0)
+        table = maps.new(self.__table_type())
+
+        for source, other, keep_alone in ((left_table, right_table, keep_left), (right_table, left_table, keep_right)):
+            keep_shared = keep_both and source is left_table
+            if not keep_alone and not keep_shared:
+                continue
+            keys, _ = maps.keys(source)
+            with lists.for_range(lists.length(keys)) as i:
+                key = builder.load(builder.gep(lists.data(keys), [i]))
+                shared = maps.contains(other, key, str_type)
+                keep = shared if not keep_alone else true if keep_shared else builder.not_(shared)
+                with builder.if_then(keep):
+                    maps.set(table, key, str_type, true)
+        return self.__str_set(table)
+
+    # endregion
+
+    # region Helpers
+
+    def __table_type(self) -> ir.Type:
+        return self.compiler.maps.map_type(self.compiler.type_map["str"], self.compiler.type_map["bool"])
+
+    def __str_set(self, table: ir.Value) -> ir.Value:
+        set_type = self.set_type(self.compiler.type_map["str"])
+        return self.compiler.builder.insert_value(ir.Constant(set_type, ir.Undefined), table, 0)
+
+    def __dense(self, set_type: ir.Type, bits: ir.Value, words: ir.Value, base: ir.Value) -> ir.Value:
+        """A bitset set, counting its elements. Without any words it's an empty array set instead."""
+        builder = self.compiler.builder
+        count = self.compiler.alloca(I64, name="set_count")
+        builder.store(ir.Constant(I64, 0), count)
+        with self.compiler.lists.for_range(words) as i:
+            builder.store(builder.add(builder.load(count), builder.ctpop(builder.load(builder.gep(bits, [i])))), count)
+        empty = builder.icmp_signed("<=", words, ir.Constant(I64, 0))
+        bits = builder.select(empty, ir.Constant(bits.type, None), bits)
+        return self.__make(set_type, bits, words, base, ir.Constant(I32.as_pointer(), None), builder.load(count))
+
+    def __sparse(self, set_type: ir.Type, values: ir.Value, count: ir.Value) -> ir.Value:
+        return self.__make(set_type, ir.Constant(I64.as_pointer(), None), ir.Constant(I64, 0), ir.Constant(I64, 0), values, count)
+
+    def __make(self, set_type: ir.Type, *fields: ir.Value) -> ir.Value:
+        value = ir.Constant(set_type, ir.Undefined)
+        for index, field in enumerate(fields):
+            value = self.compiler.builder.insert_value(value, field, index)
+        return value
+
+    def __is_dense(self, value: ir.Value) -> ir.Value:
+        bits = self.compiler.builder.extract_value(value, BITS)
+        return self.compiler.builder.icmp_unsigned("!=", bits, ir.Constant(bits.type, None))
+
+    def __both_dense(self, left: ir.Value, right: ir.Value) -> ir.Value:
+        return self.compiler.builder.and_(self.__is_dense(left), self.__is_dense(right))
+
+    def __end(self, value: ir.Value) -> ir.Value:
+        """One past the last value a bitset's words cover (its base for array sets, which have no words)."""
+        builder = self.compiler.builder
+        return builder.add(builder.extract_value(value, BASE), builder.shl(builder.extract_value(value, WORDS), ir.Constant(I64, 6)))
+
+    def __word_at(self, value: ir.Value, position: ir.Value) -> ir.Value:
+        """The bitset word covering values [position, position + 64), 0 outside the bitset."""
+        builder = self.compiler.builder
+        index = builder.ashr(builder.sub(position, builder.extract_value(value, BASE)), ir.Constant(I64, 6))
+        inside = builder.icmp_unsigned("<", index, builder.extract_value(value, WORDS))
+        word = builder.load(builder.gep(builder.extract_value(value, BITS), [builder.select(inside, index, ir.Constant(I64, 0))]))
+        return builder.select(inside, word, ir.Constant(I64, 0))
+
+    def __has_bit(self, value: ir.Value, element: ir.Value) -> ir.Value:
+        builder = self.compiler.builder
+        offset = builder.sub(element, builder.extract_value(value, BASE))
+        word = self.__word_at(value, builder.sub(element, builder.and_(offset, ir.Constant(I64, WORD_BITS - 1))))
+        bit = builder.lshr(word, builder.and_(offset, ir.Constant(I64, WORD_BITS - 1)))
+        return builder.trunc(bit, ir.IntType(1))
+
+    def __sorted(self, value: ir.Value) -> tuple[ir.Value, ir.Value]:
+        """The elements of an int set as an ascending i32 array and its length, listing a bitset's bits."""
+        builder = self.compiler.builder
+        lists = self.compiler.lists
+        count = builder.extract_value(value, COUNT)
+        data = self.compiler.alloca(I32.as_pointer(), name="set_values")
+        builder.store(builder.extract_value(value, VALUES), data)
+        with builder.if_then(self.__is_dense(value)):
+            values = lists.allocate(I32, count)
+            bits, base = builder.extract_value(value, BITS), builder.extract_value(value, BASE)
+            size = self.compiler.alloca(I64, name="set_size")
+            builder.store(ir.Constant(I64, 0), size)
+            with lists.for_range(builder.extract_value(value, WORDS)) as i:
+                word = self.compiler.alloca(I64, name="set_word")
+                builder.store(builder.load(builder.gep(bits, [i])), word)
+                # one element per set bit, lowest first
+                with self.__loop(lambda: builder.icmp_unsigned("!=", builder.load(word), ir.Constant(I64, 0))):
+                    current = builder.load(word)
+                    bit = builder.cttz(current, ir.Constant(ir.IntType(1), 1))
+                    element = builder.add(builder.add(base, builder.shl(i, ir.Constant(I64, 6))), bit)
+                    builder.store(builder.trunc(element, I32), builder.gep(values, [builder.load(size)]))
+                    builder.store(builder.add(builder.load(size), ir.Constant(I64, 1)), size)
+                    builder.store(builder.and_(current, builder.sub(current, ir.Constant(I64, 1))), word)
+            builder.store(values, data)
+        return builder.load(data), count
+
+    def __unique(self, values: ir.Value, count: ir.Value) -> ir.Value:
+        """Drops repeated values from a sorted array in place, returning the new length."""
+        builder = self.compiler.builder
+        size = self.compiler.alloca(I64, name="unique_size")
+        builder.store(ir.Constant(I64, 0), size)
+        with self.compiler.lists.for_range(count) as i:
+            value = builder.load(builder.gep(values, [i]))
+            kept = builder.load(size)
+            first = builder.icmp_signed("==", kept, ir.Constant(I64, 0))
+            previous = builder.load(builder.gep(values, [builder.select(first, kept, builder.sub(kept, ir.Constant(I64, 1)))]))
+            with builder.if_then(builder.or_(first, builder.icmp_signed("!=", previous, value))):
+                builder.store(value, builder.gep(values, [kept]))
+                builder.store(builder.add(kept, ir.Constant(I64, 1)), size)
+        return builder.load(size)
+
+    def __search(self, values: ir.Value, count: ir.Value, element: ir.Value) -> ir.Value:
+        """Binary search of an ascending i32 array for an i64 `element`."""
+        builder = self.compiler.builder
+        low = self.compiler.alloca(I64, name="search_low")
+        high = self.compiler.alloca(I64, name="search_high")
+        builder.store(ir.Constant(I64, 0), low)
+        builder.store(count, high)
+        with self.__loop(lambda: builder.icmp_signed("<", builder.load(low), builder.load(high))):
+            middle = builder.lshr(builder.add(builder.load(low), builder.load(high)), ir.Constant(I64, 1))
+            below = builder.icmp_signed("<", builder.sext(builder.load(builder.gep(values, [middle])), I64), element)
+            builder.store(builder.select(below, builder.add(middle, ir.Constant(I64, 1)), builder.load(low)), low)
+            builder.store(builder.select(below, builder.load(high), middle), high)
+        # `low` is now the first index whose value isn't below `element`
+        result = self.compiler.alloca(ir.IntType(1), name="search_found")
+        builder.store(ir.Constant(ir.IntType(1), 0), result)
+        with builder.if_then(builder.icmp_signed("<", builder.load(low), count)):
+            value = builder.sext(builder.load(builder.gep(values, [builder.load(low)])), I64)
+            builder.store(builder.icmp_signed("==", value, element), result)
+        return builder.load(result)
+
+    def __zeroed_words(self, words: ir.Value) -> ir.Value:
+        builder = self.compiler.builder
+        bits = self.compiler.lists.allocate(I64, words)
+        with self.compiler.lists.for_range(words) as i:
+            builder.store(ir.Constant(I64, 0), builder.gep(bits, [i]))
+        return bits
+
+    def __word_floor(self, value: ir.Value) -> ir.Value:
+        builder = self.compiler.builder
+        return builder.shl(builder.ashr(value, ir.Constant(I64, 6)), ir.Constant(I64, 6))
+
+    def __min(self, a: ir.Value, b: ir.Value) -> ir.Value:
+        return self.compiler.builder.select(self.compiler.builder.icmp_signed("<", a, b), a, b)
+
+    def __max(self, a: ir.Value, b: ir.Value) -> ir.Value:
+        return self.compiler.builder.select(self.compiler.builder.icmp_signed(">", a, b), a, b)
+
+    @contextmanager
+    def __loop(self, condition: Callable[[], ir.Value]):
+        """Emits `while (condition()) { body }`, the condition emitted in its own block."""
+        builder = self.compiler.builder
+        function = builder.function
+        condition_block = function.append_basic_block("while.cond")
+        body_block = function.append_basic_block("while.body")
+        end_block = function.append_basic_block("while.end")
+
+        builder.branch(condition_block)
+        builder.position_at_end(condition_block)
+        builder.cbranch(condition(), body_block, end_block)
+        builder.position_at_end(body_block)
+        yield
+        builder.branch(condition_block)
+        builder.position_at_end(end_block)
+
+    # endregion
@@ -0,0 +1,120 @@
+from llvmlite import ir
+
+I8_PTR = ir.IntType(8).as_pointer()
+I64 = ir.IntType(64)
+
+
+class StringRuntime:
+    """
+    Helper class for compiled strings.
+
+    A string value is still an `i8*` to null terminated bytes, so it can be handed
+    to `puts`, `sprintf` or returned through `c_char_p`. Every string the compiler
+    creates is also length-prefixed: the 8 bytes in front of the data hold the
+    length as an i64, so reading a length never scans the bytes.
+
+        [ i64 length ][ bytes ... ][ \\0 ]
+                      ^ string value
+
+    Literals are pooled, so identical text shares a single private global.
+    """
+    def __init__(self, compiler):
+        self.compiler = compiler
+        self.pool: dict[str, ir.Constant] = {}
+        self.texts: dict[int, str] = {}
+
+    # region Constants
+
+    def constant(self, text: str) -> ir.Constant:
+        """Returns the pooled, length-prefixed global for `text` as an i8*."""
+        if text in self.pool:
+            return self.pool[text]
+
+        data = bytearray(text.encode("utf-8")) + b"\0"
+        bytes_type = ir.ArrayType(ir.IntType(8), len(data))
+        const_type = ir.LiteralStructType([I64, bytes_type])
+
+        global_var = ir.GlobalVariable(self.compiler.module, const_type, name=f".str_{len(self.pool)}")
+        global_var.linkage = "private"
+        global_var.global_constant = True
+        global_var.unnamed_addr = True
+        global_var.initializer = ir.Constant(const_type, [ir.Constant(I64, len(data) - 1), ir.Constant(bytes_type, data)])
+
+        zero = ir.Constant(ir.IntType(32), 0)
+        pointer = global_var.gep([zero, ir.Constant(ir.IntType(32), 1), zero])
+        self.pool[text] = pointer
+        self.texts[id(pointer)] = text
+        return pointer
+
+    def text_of(self, value: ir.Value) -> str | None:
+        """Returns the source text of a pooled constant, or None for runtime strings."""
+        return self.texts.get(id(value))
+
+    # endregion
+
+    # region Runtime Strings
+
+    def length(self, value: ir.Value) -> ir.Value:
+        """Loads the i64 length stored in front of a string."""
+        builder = self.compiler.builder
+        header = builder.gep(builder.bitcast(value, I64.as_pointer()), [ir.Constant(I64, -1)])
+        return builder.load(header, name="str_len")
+
+    def set_length(self, value: ir.Value, length: ir.Value) -> None:
+        """Stores the length header and the null terminator of a string."""
+        builder = self.compiler.builder
+        header = builder.gep(builder.bitcast(value, I64.as_pointer()), [ir.Constant(I64, -1)])
+        builder.store(length, header)
+        builder.store(ir.Constant(ir.IntType(8), 0), builder.gep(value, [length]))
+
+    def allocate(self, length: ir.Value) -> ir.Value:
+        """
+        Allocates heap storage for a string of `length` bytes, sets its header
+        and terminator, and returns the i8* to its data.
+        """
+        return self.compiler.runtime.call("mylang_str_alloc", [length])
+
+    def free(self, value: ir.Value) -> None:
+        """Frees a string of `allocate` that nothing refers to anymore."""
+        self.compiler.runtime.call("mylang_str_free", [value])
+
+    def stack_buffer(self, capacity: int, name: str = "str_buf") -> ir.Value:
+        """
+        Allocates a stack buffer able to hold `capacity` bytes plus terminator
+        and returns the i8* to its data. The caller sets the length once known.
+
+        The buffer is hoisted to the function's entry block, so every
+        iteration of a loop writes the same one: it is scratch for text used
+        at once (printed or formatted), never for a value that stays alive.
+        Those go to `allocate`.
+        """
+        builder = self.compiler.builder
+        buffer_type = ir.LiteralStructType([I64, ir.ArrayType(ir.IntType(8), capacity + 1)])
+        buffer = self.compiler.alloca(buffer_type, name=name)
+        zero = ir.Constant(ir.IntType(32), 0)
+        return builder.gep(buffer, [zero, ir.Constant(ir.IntType(32), 1), zero])
+
+    def copy(self, destination: ir.Value, source: ir.Value, length: ir.Value) -> None:
+        memcpy = self.compiler.module.declare_intrinsic("llvm.memcpy", [I8_PTR, I8_PTR, I64])
+        self.compiler.builder.call(memcpy, [destination, source, length, ir.Constant(ir.IntType(1), 0)])
+
+    def concat(self, parts: list[ir.Value]) -> ir.Value:
+        """
+        Concatenates any number of strings with a single allocation: the lengths
+        are read from the headers, summed, and every part is copied once.
+        """
+        builder = self.compiler.builder
+
+        lengths = [self.length(part) for part in parts]
+        total = lengths[0]
+        for length in lengths[1:]:
+            total = builder.add(total, length)
+
+        result = self.allocate(total)
+        offset = ir.Constant(I64, 0)
+        for part, length in zip(parts, lengths):
+            self.copy(builder.gep(result, [offset]), part, length)
+            offset = builder.add(offset, length)
+        return result
+
+    # endregion
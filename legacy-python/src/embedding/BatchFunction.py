@@ -0,0 +1,140 @@
+import struct
+from itertools import repeat
+from threading import Lock
+from typing import Any, Callable
+
+from src.ast.NodeType import NodeType
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.embedding.InterpretedFunction import argument_conversion
+from src.embedding.NativeFunction import ELEMENT_FORMATS, column
+
+# Node types whose evaluation means the same per row and over whole columns,
+# given the interpreter's elementwise operators
+COLUMN_NODES: set[str] = {
+    NodeType.BlockStatement.value,
+    NodeType.LetStatement.value,
+    NodeType.AssignStatement.value,
+    NodeType.ReturnStatement.value,
+    NodeType.InfixExpression.value,
+    NodeType.CallExpression.value,
+    NodeType.IdentifierLiteral.value,
+    NodeType.IntegerLiteral.value,
+    NodeType.FloatLiteral.value,
+    NodeType.BooleanLiteral.value,
+}
+
+# Builtins that map over a list argument element by element
+COLUMN_BUILTINS: set[str] = {"pow", "sqrt", "log", "exp"}
+
+
+def batch_signature(statement: FunctionStatement) -> bool:
+    """Whether a function takes and returns only scalars a column can hold."""
+    types = [p.value_type for p in statement.parameters] + [statement.return_type]
+    return all(t in ELEMENT_FORMATS for t in types)
+
+
+def row_lengths(columns: list[Any]) -> int:
+    """Number of rows in `columns`, which must all have the same length."""
+    lengths = {len(c) for c in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns must have the same length, got {', '.join(str(n) for n in sorted(lengths))}.")
+    return lengths.pop() if lengths else 0
+
+
+class NativeBatch:
+    """
+    Applies a compiled scalar function to whole columns in one native call,
+    through its `mylang.batch.<name>` wrapper (see `Compiler.define_batch`).
+
+    Columns are lists or buffers, as for a `NativeFunction`, and buffers are
+    not copied. The result is written into `out` if given, a writable buffer
+    of the return type's format with one element per row, or into a new
+    `bytearray`, and returned as a memoryview.
+    """
+    def __init__(self, wrapper: Callable, statement: FunctionStatement) -> None:
+        self.wrapper = wrapper
+        self.elements = [p.value_type for p in statement.parameters]
+        self.return_type = statement.return_type
+        self.itemsize = struct.calcsize(ELEMENT_FORMATS[self.return_type])
+
+    def __call__(self, *columns: Any, out: Any = None) -> memoryview:
+        if len(columns) != len(self.elements):
+            raise TypeError(f"Expected {len(self.elements)} columns, got {len(columns)}.")
+
+        columns = [column(c, element) for c, element in zip(columns, self.elements)]
+        rows = row_lengths([memoryview(c) for c in columns])
+        if out is None:
+            out = memoryview(bytearray(rows * self.itemsize)).cast(ELEMENT_FORMATS[self.return_type])
+        elif memoryview(out).readonly or len(memoryview(out)) != rows:
+            raise ValueError(f"'out' must be a writable buffer with {rows} elements.")
+
+        return self.wrapper(*columns, out)
+
+
+class InterpretedBatch:
+    """
+    Applies an interpreted function to whole columns.
+
+    Functions built only from arithmetic, comparisons, `let`, `pow`, `sqrt`,
+    `log`, `exp` and calls to such functions run once with every parameter
+    bound to its whole column, so each operator loops over the rows through
+    the interpreter's elementwise path instead of the function being
+    dispatched per row. Anything else, such as a branch on a row's value, is
+    called once per row. The result is a list, or is written into `out`.
+    """
+    def __init__(self, interpreter, statement: FunctionStatement, statements: list[FunctionStatement], lock: Lock) -> None:
+        self.interpreter = interpreter
+        self.function = interpreter.global_env.get(statement.name.value)
+        self.lock = lock
+        self.conversions = [argument_conversion(p.value_type) for p in statement.parameters]
+        self.return_type = statement.return_type
+        functions = {s.name.value: s for s in statements}
+        self.columnar = self.__columnar(statement, functions, frozenset())
+
+    def __call__(self, *columns: Any, out: Any = None) -> list:
+        if len(columns) != len(self.conversions):
+            raise TypeError(f"Expected {len(self.conversions)} columns, got {len(columns)}.")
+
+        columns = [[convert(value) for value in c] for convert, c in zip(self.conversions, columns)]
+        rows = row_lengths(columns)
+        with self.lock:
+            try:
+                if self.columnar and rows > 0:
+                    result = self.interpreter.call_function(self.function, columns)
+                    if not isinstance(result, list):
+                        # the result doesn't depend on any column
+                        result = list(repeat(result, rows))
+                else:
+                    result = [self.interpreter.call_function(self.function, list(row)) for row in zip(*columns)]
+            finally:
+                self.interpreter.output.flush()
+
+        if out is None:
+            return result
+        if isinstance(out, list):
+            out[:] = result
+        else:
+            memoryview(out)[:] = memoryview(column(result, self.return_type))
+        return out
+
+    def __columnar(self, statement: FunctionStatement, functions: dict[str, FunctionStatement], calling: frozenset[str]) -> bool:
+        return self.__columnar_tree(statement.body.json(), functions, calling | {statement.name.value})
+
+    def __columnar_tree(self, tree: Any, functions: dict[str, FunctionStatement], calling: frozenset[str]) -> bool:
+        if isinstance(tree, list):
+            return all(self.__columnar_tree(value, functions, calling) for value in tree)
+        if not isinstance(tree, dict):
+            return True
+        if tree.get("type") not in COLUMN_NODES:
+            return False
+
+        if tree["type"] == NodeType.CallExpression.value:
+            name = tree["function"]["value"]
+            if name in functions:
+                # recursion recurses per row, which a single columnar call can't
+                if name in calling or not self.__columnar(functions[name], functions, calling):
+                    return False
+            elif name not in COLUMN_BUILTINS:
+                return False
+
+        return all(self.__columnar_tree(value, functions, calling) for value in tree.values())
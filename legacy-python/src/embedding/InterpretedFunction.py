@@ -0,0 +1,60 @@
+from threading import Lock
+from typing import Any, Callable
+
+from src.embedding.NativeFunction import list_element
+from src.interpreter.VectorValue import VectorValue
+
+# How a Python argument becomes a value of each scalar type
+SCALAR_CONVERSIONS: dict[str, Callable[[Any], Any]] = {"int": int, "float": float, "bool": bool, "str": str}
+
+
+def argument_conversion(type_name: str) -> Callable[[Any], Any]:
+    """Conversion of a Python argument to a parameter of type `type_name`."""
+    if type_name.startswith("vector[") and type_name.endswith("]"):
+        element = type_name[7:-1]
+        # any iterable or buffer, copied into the interpreter's own typed buffer
+        return lambda values: VectorValue(element, values)
+    element = list_element(type_name)
+    if element is not None:
+        convert = argument_conversion(element)
+        # buffers (memoryview, array.array, ...) and any other iterable become a list
+        return lambda value: [convert(item) for item in value]
+    if type_name.startswith("map[") and type_name.endswith("]"):
+        # keys are scalars, so the first comma ends the key type
+        key, value = (argument_conversion(t.strip()) for t in type_name[4:-1].split(",", 1))
+        return lambda mapping: {key(k): value(v) for k, v in dict(mapping).items()}
+    if type_name in SCALAR_CONVERSIONS:
+        return SCALAR_CONVERSIONS[type_name]
+    raise TypeError(f"Type '{type_name}' can't be passed from Python.")
+
+
+class InterpretedFunction:
+    """
+    A `.line` function run by an `Interpreter`, callable from Python.
+
+    Arguments go through conversions chosen once from the declared parameter
+    types, so they accept the same values as a `NativeFunction` (lists may be
+    any iterable or buffer, maps any mapping). Results are plain Python
+    values, lists and dicts included.
+
+    The interpreter and its output are shared by every function of a module,
+    so calls hold `lock` and flush the output before returning.
+    """
+    def __init__(self, interpreter, function, lock: Lock) -> None:
+        self.interpreter = interpreter
+        self.function = function
+        self.lock = lock
+        self.parameter_types = [p.value_type for p in function.parameters]
+        self.return_type = function.return_type
+        self.conversions = [argument_conversion(t) for t in self.parameter_types]
+
+    def __call__(self, *args: Any) -> Any:
+        if len(args) != len(self.conversions):
+            raise TypeError(f"Expected {len(self.conversions)} arguments, got {len(args)}.")
+
+        values = [convert(arg) for convert, arg in zip(self.conversions, args)]
+        with self.lock:
+            try:
+                return self.interpreter.call_function(self.function, values)
+            finally:
+                self.interpreter.output.flush()
@@ -0,0 +1,167 @@
+import ctypes
+from threading import Lock
+from typing import Any, Callable
+
+import llvmlite.binding as llvm
+
+from src.ast.Program import Program
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.compiler.Compiler import Compiler
+from src.compiler.CallGraph import printing_functions
+from src.compiler.Optimizer import Optimizer
+from src.embedding.BatchFunction import InterpretedBatch, NativeBatch, batch_signature
+from src.embedding.InterpretedFunction import InterpretedFunction
+from src.embedding.NativeFunction import NativeFunction
+from src.interpreter.Interpreter import Interpreter
+from src.lexer.Lexer import Lexer
+from src.output.OutputSink import OutputSink
+from src.parser.Parser import Parser
+
+BACKENDS: tuple[str, ...] = ("auto", "jit", "interpreter")
+
+
+def compile(source: str, backend: str = "auto", speed_level: int = 2, output: OutputSink | None = None) -> 'Module':
+    """Compiles `.line` source into a `Module`, see there for the arguments."""
+    return Module(source, backend=backend, speed_level=speed_level, output=output)
+
+
+class Module:
+    """
+    A `.line` program, lexed, parsed and compiled once, whose top-level
+    functions can be called from Python any number of times:
+
+        module = compile(source)
+        module.scale(array("f", [1.0, 2.0]), 3.0)
+        module.functions["scale"]
+        module.batches["score"](ages, incomes)
+
+    `backend` picks how functions run:
+    - "jit": the whole program is compiled with the `Compiler` and MCJIT, and
+      every function is a `NativeFunction`. Fails if the program doesn't compile.
+    - "interpreter": every function is an `InterpretedFunction`, printing to `output`.
+    - "auto": as "jit", falling back to the interpreter for the whole program
+      if it doesn't compile, and for functions whose signature can't cross
+      into native code.
+
+    Marshalling is set up once per function from its declared types, a call
+    only converts its arguments. Modules are immutable after construction and
+    safe to call from several threads: native calls release the GIL and run
+    in parallel, except for functions that can reach `print` or `printf`,
+    which share the runtime's output buffer and are serialized and flushed
+    after every call. Interpreted calls are always serialized.
+
+    Functions taking and returning only `int`, `float` and `bool` also get a
+    batch version in `batches`, which takes one column per parameter and
+    returns the column of results, without dispatching per row (see
+    `NativeBatch` and `InterpretedBatch`).
+
+    A runtime error in a compiled function raises a `RuntimeError` (see
+    `NativeFunction`) instead of terminating the process.
+
+    Compiled code prints straight to stdout, `output` only applies to
+    interpreted functions.
+    """
+    def __init__(self, source: str, backend: str = "auto", speed_level: int = 2, output: OutputSink | None = None) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}.")
+
+        parser = Parser(lexer=Lexer(source=source))
+        self.program: Program = parser.parse_program()
+        if len(parser.errors) > 0:
+            raise SyntaxError("\n".join(parser.errors))
+
+        self.statements: list[FunctionStatement] = [s for s in self.program.statements if isinstance(s, FunctionStatement)]
+        self.backend = backend
+        self.speed_level = speed_level
+        self.output = output
+        self.lock = Lock()
+
+        self.engine: llvm.ExecutionEngine | None = None
+        self.interpreter: Interpreter | None = None
+        # why the JIT wasn't used, for "auto" modules that fell back to the interpreter
+        self.fallback_reason: str | None = None
+
+        if backend != "interpreter":
+            try:
+                self.__compile()
+            except Exception as e:
+                if backend == "jit":
+                    raise
+                self.fallback_reason = str(e)
+
+        self.functions: dict[str, Callable] = {}
+        self.batches: dict[str, Callable] = {}
+        for statement in self.statements:
+            self.functions[statement.name.value] = self.__function(statement)
+            if batch_signature(statement):
+                self.batches[statement.name.value] = self.__batch(statement)
+
+    def __getattr__(self, name: str) -> Callable:
+        functions = self.__dict__.get("functions", {})
+        if name not in functions:
+            raise AttributeError(f"Module has no function '{name}'.")
+        return functions[name]
+
+    def __getitem__(self, name: str) -> Callable:
+        return self.functions[name]
+
+    # region Backends
+
+    def __compile(self) -> None:
+        compiler = Compiler()
+        compiler.compile(node=self.program)
+        for statement in self.statements:
+            compiler.define_trap(statement.name.value)
+            if batch_signature(statement):
+                compiler.define_batch(statement.name.value)
+                compiler.define_trap(f"mylang.batch.{statement.name.value}")
+        optimizer = Optimizer(speed_level=self.speed_level)
+        self.engine = llvm.create_mcjit_compiler(optimizer.optimize(compiler.module), optimizer.target_machine)
+        self.engine.finalize_object()
+
+        # only present when something prints
+        flush = self.engine.get_function_address("mylang_output_flush")
+        self.flush_output = ctypes.CFUNCTYPE(None)(flush) if flush != 0 else None
+        self.printing = printing_functions(self.statements)
+
+    def __function(self, statement: FunctionStatement) -> Callable:
+        name = statement.name.value
+        if self.engine is not None:
+            try:
+                native = NativeFunction(self.engine.get_function_address(f"mylang.trap.{name}"), [p.value_type for p in statement.parameters],
+                                        statement.return_type, owner=self.engine)
+            except TypeError:
+                if self.backend == "jit":
+                    raise
+            else:
+                return self.__serialized(native) if name in self.printing else native
+
+        interpreter = self.__interpreter()
+        return InterpretedFunction(interpreter, interpreter.global_env.get(name), self.lock)
+
+    def __batch(self, statement: FunctionStatement) -> Callable:
+        name = statement.name.value
+        if isinstance(self.functions[name], InterpretedFunction):
+            return InterpretedBatch(self.__interpreter(), statement, self.statements, self.lock)
+
+        columns = [f"list[{t}]" for t in [p.value_type for p in statement.parameters] + [statement.return_type]]
+        wrapper = NativeFunction(self.engine.get_function_address(f"mylang.trap.mylang.batch.{name}"), columns, columns[-1], owner=self.engine)
+        return NativeBatch(self.__serialized(wrapper) if name in self.printing else wrapper, statement)
+
+    def __interpreter(self) -> Interpreter:
+        if self.interpreter is None:
+            self.interpreter = Interpreter(output=self.output)
+            self.interpreter.load(self.program)
+        return self.interpreter
+
+    def __serialized(self, function: NativeFunction) -> Callable:
+        def call(*args: Any) -> Any:
+            with self.lock:
+                try:
+                    return function(*args)
+                finally:
+                    if self.flush_output is not None:
+                        self.flush_output()
+        return call
+
+    # endregion
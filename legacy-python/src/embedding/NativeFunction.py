@@ -0,0 +1,239 @@
+import ctypes
+import struct
+import weakref
+from array import array
+from contextlib import ExitStack
+from typing import Any
+
+# Scalar types and how they cross the ctypes boundary by value
+SCALAR_CTYPES: dict[str, type] = {"int": ctypes.c_int32, "float": ctypes.c_float, "bool": ctypes.c_bool}
+
+# List element types and the buffer format their storage has, as in `struct` / `array`
+ELEMENT_FORMATS: dict[str, str] = {"int": "i", "float": "f", "bool": "?"}
+
+# Length header in front of every compiled string (see `StringRuntime`)
+STRING_HEADER: int = 8
+
+# Prefix of every runtime error message, see `ListOperations.panic`
+RUNTIME_ERROR: str = "RUNTIME ERROR: "
+
+# Flags of `PyObject_GetBuffer`: a contiguous buffer, writable or not
+PyBUF_SIMPLE: int = 0
+
+
+class ListSlice(ctypes.Structure):
+    """A compiled `list[T]` value, `{T*, i64}`. Passed and returned by value."""
+    _fields_ = [("data", ctypes.c_void_p), ("length", ctypes.c_int64)]
+
+
+class Py_buffer(ctypes.Structure):
+    _fields_ = [
+        ("buf", ctypes.c_void_p),
+        ("obj", ctypes.c_void_p),
+        ("len", ctypes.c_ssize_t),
+        ("itemsize", ctypes.c_ssize_t),
+        ("readonly", ctypes.c_int),
+        ("ndim", ctypes.c_int),
+        ("format", ctypes.c_char_p),
+        ("shape", ctypes.c_void_p),
+        ("strides", ctypes.c_void_p),
+        ("suboffsets", ctypes.c_void_p),
+        ("internal", ctypes.c_void_p),
+    ]
+
+
+ctypes.pythonapi.PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(Py_buffer), ctypes.c_int]
+ctypes.pythonapi.PyBuffer_Release.argtypes = [ctypes.POINTER(Py_buffer)]
+
+# The allocator of the runtime (`mylang_alloc`), which JIT compiled code resolves in the process
+libc = ctypes.CDLL(None)
+libc.free.argtypes = [ctypes.c_void_p]
+libc.free.restype = None
+
+
+def list_element(type_name: str) -> str | None:
+    """Element type of a `list[T]` or `vector[T]` type name (both are slices), None for anything else."""
+    for prefix in ("list[", "vector["):
+        if type_name.startswith(prefix) and type_name.endswith("]"):
+            return type_name[len(prefix):-1]
+    return None
+
+
+def is_buffer(obj: Any) -> bool:
+    try:
+        memoryview(obj).release()
+        return True
+    except TypeError:
+        return False
+
+
+def column(values: Any, element: str) -> Any:
+    """
+    `values` as a buffer of `element` values: buffers are returned as they
+    are, other iterables are copied into new contiguous storage.
+    """
+    if is_buffer(values):
+        return values
+    element_format = ELEMENT_FORMATS[element]
+    if element_format == "?":
+        # `array` has no bool type code
+        return memoryview(bytes(bool(value) for value in values)).cast("?")
+    return array(element_format, values)
+
+
+class BufferView:
+    """
+    Context manager exposing the memory of an object supporting the buffer
+    protocol (`array.array`, `memoryview`, `bytearray`, NumPy arrays, ...)
+    as a `ListSlice` of `element` values, without copying.
+
+    The buffer is held, so the exporter can't resize or free it, until the
+    `with` block exits.
+    """
+    def __init__(self, obj: Any, element: str) -> None:
+        self.obj = obj
+        self.element = element
+        self.view = Py_buffer()
+        self.held = False
+
+    def __enter__(self) -> ListSlice:
+        expected = ELEMENT_FORMATS[self.element]
+        with memoryview(self.obj) as described:
+            buffer_format = described.format.lstrip("@=<")
+            if buffer_format != expected or described.itemsize != struct.calcsize(expected):
+                raise TypeError(f"list[{self.element}] needs a buffer of format '{expected}', got '{described.format}'.")
+            if not described.c_contiguous:
+                raise TypeError(f"list[{self.element}] needs a contiguous buffer.")
+            length = described.nbytes // described.itemsize
+
+        ctypes.pythonapi.PyObject_GetBuffer(self.obj, ctypes.byref(self.view), PyBUF_SIMPLE)
+        self.held = True
+        return ListSlice(self.view.buf, length)
+
+    def __exit__(self, *exc_info) -> None:
+        if self.held:
+            ctypes.pythonapi.PyBuffer_Release(ctypes.byref(self.view))
+            self.held = False
+
+    def contains(self, address: int) -> bool:
+        """Whether `address` lies inside the held buffer, or just past its end (where an empty slice can start)."""
+        return self.view.buf is not None and self.view.buf <= address <= self.view.buf + self.view.len
+
+
+class NativeFunction:
+    """
+    A compiled `.line` function, callable from Python.
+
+    When `trapped`, `address` is that of the function's `mylang.trap.<name>`
+    trampoline (see `Compiler.define_trap`), and a runtime error in the
+    compiled code, such as lists of different lengths, raises a
+    `RuntimeError` instead of terminating the process. Memory the call had
+    allocated before the error is not freed.
+
+    Arguments:
+    - `int`, `float`, `bool`: passed by value (`int` is 32 bits, `float` single precision).
+    - `str`: copied once into a length-prefixed buffer that lives for the call.
+    - `list[T]`, `vector[T]`: any C-contiguous buffer of format "i" (int),
+      "f" (float) or "?" (bool) is passed as pointer + length without
+      copying. Other iterables are copied into contiguous storage first (see
+      `column`).
+
+    Results:
+    - `str`: decoded into a Python `str` (a copy).
+    - `list[T]`, `vector[T]`: a `memoryview` of format "i", "f" or "?" over
+      the memory the compiled code returned, without copying.
+
+    Ownership and lifetime:
+    - Buffers passed in are only borrowed for the duration of the call. Compiled
+      code never writes to a list it was given, except the output column of a
+      batch wrapper (see `NativeBatch`).
+    - A returned list that is (part of) an argument views that argument's
+      buffer, and keeps the argument alive.
+    - Any other returned list is a new allocation of the runtime, owned by the
+      returned view: it is freed once that view and every view made from it
+      are released or collected. It stays valid after the engine holding the
+      code is gone.
+    """
+    def __init__(self, address: int, parameter_types: list[str], return_type: str, owner: Any = None, trapped: bool = True) -> None:
+        self.parameter_types = parameter_types
+        self.return_type = return_type
+        self.trapped = trapped
+        # keeps the execution engine, and with it the code at `address`, alive
+        self.owner = owner
+
+        error_types = [ctypes.POINTER(ctypes.c_char_p)] if trapped else []
+        prototype = ctypes.CFUNCTYPE(self.__ctype(return_type), *[self.__ctype(t) for t in parameter_types], *error_types)
+        self.function = prototype(address)
+
+    def __call__(self, *args: Any) -> Any:
+        if len(args) != len(self.parameter_types):
+            raise TypeError(f"Expected {len(self.parameter_types)} arguments, got {len(args)}.")
+
+        with ExitStack() as stack:
+            buffers: list[tuple[Any, BufferView]] = []
+            native_args = []
+            for arg, type_name in zip(args, self.parameter_types):
+                element = list_element(type_name)
+                if element is not None:
+                    arg = column(arg, element)
+                    view = BufferView(arg, element)
+                    native_args.append(stack.enter_context(view))
+                    buffers.append((arg, view))
+                elif type_name == "str":
+                    native_args.append(self.__string_argument(arg, stack))
+                else:
+                    native_args.append(arg)
+
+            error = ctypes.c_char_p()
+            result = self.function(*native_args, *([ctypes.byref(error)] if self.trapped else []))
+            if error.value is not None:
+                raise RuntimeError(error.value.decode("utf-8").removeprefix(RUNTIME_ERROR))
+            return self.__result(result, buffers)
+
+    # region Conversions
+
+    def __ctype(self, type_name: str) -> type:
+        if list_element(type_name) in ELEMENT_FORMATS:
+            return ListSlice
+        if type_name == "str":
+            return ctypes.c_void_p
+        if type_name in SCALAR_CTYPES:
+            return SCALAR_CTYPES[type_name]
+        raise TypeError(f"Type '{type_name}' can't cross into native code.")
+
+    @staticmethod
+    def __string_argument(value: str | bytes, stack: ExitStack) -> int:
+        data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+        # [ i64 length ][ bytes ][ \0 ], see `StringRuntime`
+        storage = ctypes.create_string_buffer(STRING_HEADER + len(data) + 1)
+        struct.pack_into("<q", storage, 0, len(data))
+        ctypes.memmove(ctypes.addressof(storage) + STRING_HEADER, data, len(data))
+        stack.callback(lambda: storage)
+        return ctypes.addressof(storage) + STRING_HEADER
+
+    def __result(self, result: Any, buffers: list[tuple[Any, BufferView]]) -> Any:
+        if self.return_type == "str":
+            length = ctypes.c_int64.from_address(result - STRING_HEADER).value
+            return ctypes.string_at(result, length).decode("utf-8")
+
+        element = list_element(self.return_type)
+        if element is None:
+            return result
+
+        element_format = ELEMENT_FORMATS[element]
+        size = result.length * struct.calcsize(element_format)
+        if result.data is None:
+            return memoryview(b"").cast(element_format)
+
+        # Views of an argument come from the argument itself, which keeps it alive
+        for arg, view in buffers:
+            if view.contains(result.data):
+                start = result.data - view.view.buf
+                return memoryview(arg).cast("B")[start:start + size].cast(element_format)
+
+        # A new allocation, freed with the last view of `storage`
+        storage = (ctypes.c_char * size).from_address(result.data)
+        weakref.finalize(storage, libc.free, result.data)
+        return memoryview(storage).cast("B").cast(element_format)
+
+    # endregion
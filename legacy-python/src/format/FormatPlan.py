@@ -0,0 +1,135 @@
+from functools import lru_cache
+from typing import Any, Callable
+
+# Conversions Python's `%` operator accepts, `%%` aside
+CONVERSIONS: str = "diouxXeEfFgGcrsa"
+FLAGS: str = "-+ #0"
+LENGTH_MODIFIERS: str = "hlL"
+
+
+class FormatSpec:
+    """
+    One `%` conversion of a format string, e.g. `%-8.2f`.
+
+    `width` and `precision` are None when absent, and "*" when they are
+    taken from the arguments.
+    """
+    def __init__(self, flags: str, width: int | str | None, precision: int | str | None, conversion: str) -> None:
+        self.flags = flags
+        self.width = width
+        self.precision = precision
+        self.conversion = conversion
+        # the conversion on its own, formatting its arguments with `%`
+        self.text = str(self)
+
+    @property
+    def arguments(self) -> int:
+        """Number of arguments the conversion consumes."""
+        return 1 + (self.width == "*") + (self.precision == "*")
+
+    def __str__(self) -> str:
+        width = "" if self.width is None else self.width
+        precision = "" if self.precision is None else f".{self.precision}"
+        return f"%{self.flags}{width}{precision}{self.conversion}"
+
+
+class FormatPlan:
+    """
+    A `printf`/`sprintf` format string, parsed once.
+
+    The text between conversions is kept in `literals`, which always has one
+    more entry than `specs`: the format is `literals[0]`, `specs[0]`,
+    `literals[1]`, ... with `%%` already turned into `%`.
+
+    The interpreter runs a plan with `render`. The compiler lowers `specs`
+    to direct conversions and never parses the format at runtime.
+    """
+    def __init__(self, format_string: str, literals: list[str], specs: list[FormatSpec]) -> None:
+        self.format_string = format_string
+        self.literals = literals
+        self.specs = specs
+        self.arguments = sum(spec.arguments for spec in specs)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def parse(format_string: str) -> 'FormatPlan':
+        """
+        Parses `format_string`, with the same syntax and errors as Python's `%`
+        operator (mapping keys aside). Plans are cached per format string.
+        """
+        literals: list[str] = []
+        specs: list[FormatSpec] = []
+        text: list[str] = []
+
+        i, end = 0, len(format_string)
+        while i < end:
+            percent = format_string.find("%", i)
+            if percent == -1:
+                text.append(format_string[i:])
+                break
+            text.append(format_string[i:percent])
+
+            i = percent + 1
+            if i < end and format_string[i] == "%":
+                text.append("%")
+                i += 1
+                continue
+            if i < end and format_string[i] == "(":
+                raise ValueError("format mapping keys are not supported")
+
+            flags_start = i
+            while i < end and format_string[i] in FLAGS:
+                i += 1
+            flags = format_string[flags_start:i]
+
+            width, i = FormatPlan.__number(format_string, i)
+            precision = None
+            if i < end and format_string[i] == ".":
+                precision, i = FormatPlan.__number(format_string, i + 1)
+                precision = 0 if precision is None else precision
+            while i < end and format_string[i] in LENGTH_MODIFIERS:
+                i += 1
+
+            if i >= end:
+                raise ValueError("incomplete format")
+            conversion = format_string[i]
+            if conversion not in CONVERSIONS:
+                raise ValueError(f"unsupported format character '{conversion}' (0x{ord(conversion):x}) at index {i}")
+            i += 1
+
+            literals.append("".join(text))
+            text = []
+            specs.append(FormatSpec(flags, width, precision, conversion))
+
+        literals.append("".join(text))
+        return FormatPlan(format_string, literals, specs)
+
+    @staticmethod
+    def __number(format_string: str, i: int) -> tuple[int | str | None, int]:
+        """Reads a width or precision at `i`: digits, "*" or nothing."""
+        if i < len(format_string) and format_string[i] == "*":
+            return "*", i + 1
+        start = i
+        while i < len(format_string) and format_string[i].isdigit():
+            i += 1
+        return (int(format_string[start:i]) if i > start else None), i
+
+    def render(self, args: tuple, text: Callable[[Any], str] = str) -> str:
+        """
+        Formats `args` with the plan: the literals as they are, and each
+        conversion on its own arguments, without reading the format again.
+        `%s` formats `text(argument)`, so a backend can print values its own
+        way. Raises a `TypeError` when the plan takes another number of arguments.
+        """
+        if len(args) != self.arguments:
+            raise TypeError(f"the format takes {self.arguments} argument(s), got {len(args)}")
+        parts = [self.literals[0]]
+        i = 0
+        for spec, literal in zip(self.specs, self.literals[1:]):
+            values = args[i:i + spec.arguments]
+            if spec.conversion == "s":
+                values = values[:-1] + (text(values[-1]),)
+            parts.append(spec.text % values)
+            parts.append(literal)
+            i += spec.arguments
+        return "".join(parts)
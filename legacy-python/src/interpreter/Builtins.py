@@ -1,22 +1,328 @@
+import math
+import operator
+from functools import reduce
+
+from src.format.FormatPlan import FormatPlan
+from src.interpreter.FrameValue import FrameValue
+from src.interpreter.SetValue import SetValue
+from src.interpreter.VectorValue import VectorValue
+from src.interpreter.WorkerPool import WorkerPool
+
+
+# --------------------------------------------------------------------
+#  Math
+# --------------------------------------------------------------------
+# Range of the compiled backend's ints, i32
+INT_MIN: int = -(1 << 31)
+INT_MAX: int = (1 << 31) - 1
+
+
+# These follow the compiled backend: integer `^` is an error where the result
+# doesn't fit an i32, everything else gives IEEE results (nan, inf) where
+# Python's `math` would raise.
+def power(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int):
+        if exponent < 0:
+            raise Exception("negative exponent in integer '^', use a float base")
+        # exponentiation by squaring
+        result = 1
+        while exponent > 0:
+            if exponent & 1:
+                result *= base
+                if not INT_MIN <= result <= INT_MAX:
+                    raise Exception("integer overflow in '^'")
+            base *= base
+            exponent >>= 1
+        return result
+    if base == 0 and exponent < 0:
+        return math.inf
+    try:
+        return math.pow(base, exponent)
+    except ValueError:
+        return math.nan
+    except OverflowError:
+        return math.inf
+
+
+def remainder(left, right):
+    """C-like `%`: the result takes the sign of the dividend."""
+    if isinstance(left, int) and isinstance(right, int):
+        result = abs(left) % abs(right)
+        return -result if left < 0 else result
+    return math.fmod(left, right)
+
+
+def sqrt(value):
+    return math.sqrt(value) if value >= 0 else math.nan
+
+
+def log(value):
+    if value > 0:
+        return math.log(value)
+    return -math.inf if value == 0 else math.nan
+
+
+def exp(value):
+    try:
+        return math.exp(value)
+    except OverflowError:
+        return math.inf
+
+
 class Builtins:
-    def __init__(self, interpreter):
+    def __init__(self, interpreter, par_workers=None, par_chunk_size=None):
         self.interpreter = interpreter
+        self.pool = WorkerPool(interpreter, workers=par_workers, chunk_size=par_chunk_size)
 
     def builtin_print(self, *args):
-        print(*args)
+        self.interpreter.output.write_line(" ".join(map(str, args)))
         return None
 
     def builtin_printf(self, format_string: str, *args):
-        print(self.builtin_sprintf(format_string, *args))
+        self.interpreter.output.write_line(self.builtin_sprintf(format_string, *args))
         return None
 
+    def builtin_to_str(self, value):
+        """The text the compiled `to_str` gives: floats with two decimals, bools as true/false."""
+        if isinstance(value, VectorValue) and value.element == "bool":
+            # bool vectors hold bytes, which read back as 0 and 1
+            value = list(map(bool, value))
+        if isinstance(value, (list, VectorValue)):
+            return "[" + ", ".join(map(self.builtin_to_str, value)) + "]"
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
+
     def builtin_sprintf(self, format_string: str, *args):
         if not isinstance(format_string, str):
             raise Exception("First argument to sprintf must be a string.")
 
+        # Each distinct format (literals are the same str object every call)
+        # is parsed and validated once, see `FormatPlan.parse`, and every
+        # call renders from that plan. `%s` prints what `to_str` gives, as
+        # compiled code does
         try:
-            formatted_output = format_string % args
-        except TypeError as e:
+            formatted_output = FormatPlan.parse(format_string).render(args, text=self.builtin_to_str)
+        except (TypeError, ValueError) as e:
             raise Exception(f"Error in sprintf formatting: {e}")
 
         return formatted_output
+
+    # ----------------------------------------------------------------
+    #  Math
+    # ----------------------------------------------------------------
+    def builtin_pow(self, base, exponent):
+        if isinstance(base, (list, VectorValue)) or isinstance(exponent, (list, VectorValue)):
+            return self.interpreter.elementwise(power, "^", base, exponent)
+        return power(base, exponent)
+
+    def builtin_sqrt(self, value):
+        return self.__map_unary(sqrt, value)
+
+    def builtin_log(self, value):
+        return self.__map_unary(log, value)
+
+    def builtin_exp(self, value):
+        return self.__map_unary(exp, value)
+
+    def __map_unary(self, function, value):
+        if isinstance(value, VectorValue):
+            return VectorValue("float", map(function, value))
+        if isinstance(value, list):
+            return list(map(function, value))
+        return function(value)
+
+    # ----------------------------------------------------------------
+    #  Reductions
+    # ----------------------------------------------------------------
+    # Float results use double precision and exact `math.fsum` summation, so
+    # they can differ from the single precision compiled backend by roughly
+    # `n * 2**-24` relative error for `n` elements.
+    def builtin_sum(self, values: list):
+        if self.__has_floats(values):
+            return math.fsum(values)
+        return sum(values)
+
+    def builtin_prod(self, values: list):
+        return math.prod(values)
+
+    def builtin_min(self, values: list):
+        if len(values) == 0:
+            raise Exception("min() of an empty list")
+        return min(values)
+
+    def builtin_max(self, values: list):
+        if len(values) == 0:
+            raise Exception("max() of an empty list")
+        return max(values)
+
+    def builtin_mean(self, values: list):
+        if len(values) == 0:
+            raise Exception("mean() of an empty list")
+        return math.fsum(values) / len(values)
+
+    def builtin_dot(self, left: list, right: list):
+        if len(left) != len(right):
+            raise Exception("dot() operands must have the same length")
+        products = map(operator.mul, left, right)
+        if self.__has_floats(left) or self.__has_floats(right):
+            return math.fsum(products)
+        return sum(products)
+
+    def __has_floats(self, values: list) -> bool:
+        # set(map(type, ...)) keeps the scan in C
+        return float in set(map(type, values))
+
+    # ----------------------------------------------------------------
+    #  Map / Filter / Reduce
+    # ----------------------------------------------------------------
+    # The lazy versions return iterators, which pipelines chain
+    # (`xs |> map(f) |> filter(g)`), see `Interpreter.visit_PipeExpression`.
+    def lazy_map(self, values, function):
+        return map(lambda value: self.interpreter.call_function(function, [value]), values)
+
+    def lazy_filter(self, values, function):
+        return filter(lambda value: self.interpreter.is_truthy(self.interpreter.call_function(function, [value])), values)
+
+    def builtin_map(self, values, function):
+        return list(self.lazy_map(values, function))
+
+    def builtin_filter(self, values, function):
+        return list(self.lazy_filter(values, function))
+
+    def builtin_reduce(self, values, function, initial):
+        return reduce(lambda accumulator, value: self.interpreter.call_function(function, [accumulator, value]), values, initial)
+
+    def builtin_sort(self, values, *key):
+        """A new list in ascending order, of `key(x)` when a key function is given; stable, as compiled."""
+        if len(key) == 0:
+            return sorted(values)
+        function = key[0]
+        return sorted(values, key=lambda value: self.interpreter.call_function(function, [value]))
+
+    # ----------------------------------------------------------------
+    #  Maps
+    # ----------------------------------------------------------------
+    # Maps are dicts, so keys and values come back in insertion order, as in
+    # the compiled backend.
+    def builtin_get(self, mapping: dict, key, *default):
+        self.__check_map("get", mapping)
+        if key in mapping:
+            return mapping[key]
+        if len(default) == 1:
+            return default[0]
+        raise Exception(f"Key {key!r} not found in map")
+
+    def builtin_set(self, target, *entry):
+        """
+        `set(map, key, value)` updates the map in place and returns it,
+        `set(list)` makes a set of the list's elements.
+        """
+        if len(entry) == 0:
+            if not isinstance(target, list):
+                raise Exception(f"set() expects a list, got {target}.")
+            return SetValue.of(target)
+        self.__check_map("set", target)
+        key, value = entry
+        target[key] = value
+        return target
+
+    def builtin_keys(self, mapping: dict):
+        self.__check_map("keys", mapping)
+        return list(mapping)
+
+    def builtin_values(self, mapping: dict):
+        self.__check_map("values", mapping)
+        return list(mapping.values())
+
+    def __check_map(self, name: str, mapping):
+        if not isinstance(mapping, dict):
+            raise Exception(f"{name}() expects a map as its first argument, got {mapping}.")
+
+    # ----------------------------------------------------------------
+    #  Sets
+    # ----------------------------------------------------------------
+    def builtin_union(self, left: SetValue, right: SetValue):
+        self.__check_sets("union", left, right)
+        return left.union(right)
+
+    def builtin_intersection(self, left: SetValue, right: SetValue):
+        self.__check_sets("intersection", left, right)
+        return left.intersection(right)
+
+    def builtin_difference(self, left: SetValue, right: SetValue):
+        self.__check_sets("difference", left, right)
+        return left.difference(right)
+
+    def builtin_contains(self, values: SetValue | dict, value):
+        """Whether a set has an element, or a map has a key."""
+        if not isinstance(values, dict):
+            self.__check_sets("contains", values)
+        return value in values
+
+    def builtin_elements(self, values: SetValue):
+        """Ints in ascending order, strings in insertion order."""
+        self.__check_sets("elements", values)
+        return values.elements()
+
+    def __check_sets(self, name: str, *values):
+        for value in values:
+            if not isinstance(value, SetValue):
+                raise Exception(f"{name}() expects sets, got {value}.")
+
+    # ----------------------------------------------------------------
+    #  Vectors and frames
+    # ----------------------------------------------------------------
+    # Columns are `VectorValue` buffers, shared rather than copied by
+    # `frame`, `column` and `with_column`.
+    def builtin_vector(self, values):
+        """A new vector of the elements of a list (or vector)."""
+        return VectorValue.of(values)
+
+    def builtin_frame(self, *columns):
+        """`frame(name, values, name, values, ...)`, lists becoming vectors."""
+        if len(columns) == 0 or len(columns) % 2 != 0:
+            raise Exception("frame() expects pairs of a column name and its values.")
+        names = columns[0::2]
+        if not all(isinstance(name, str) for name in names) or len(set(names)) != len(names):
+            raise Exception(f"frame() column names must be distinct strings, got {', '.join(map(repr, names))}.")
+        return FrameValue({name: self.__column(values) for name, values in zip(names, columns[1::2])})
+
+    def builtin_column(self, frame: FrameValue, name: str):
+        self.__check_frame("column", frame)
+        return frame.column(name)
+
+    def builtin_rows(self, frame: FrameValue):
+        self.__check_frame("rows", frame)
+        return frame.rows
+
+    def builtin_with_column(self, frame: FrameValue, name: str, values):
+        self.__check_frame("with_column", frame)
+        return frame.with_column(name, self.__column(values))
+
+    def __column(self, values):
+        return values if isinstance(values, VectorValue) else VectorValue.of(values)
+
+    def __check_frame(self, name: str, value):
+        if not isinstance(value, FrameValue):
+            raise Exception(f"{name}() expects a frame, got {value}.")
+
+    # ----------------------------------------------------------------
+    #  Parallel
+    # ----------------------------------------------------------------
+    # `function` must be a top-level function, the worker processes look it
+    # up by name in their own copy of the program (see `WorkerPool`).
+    def builtin_par_map(self, function, values: list):
+        self.__check_callable("par_map", function)
+        return self.pool.map(function, values)
+
+    def builtin_par_reduce(self, function, values: list, initial):
+        """Reduces with an associative `function`, starting from `initial`."""
+        self.__check_callable("par_reduce", function)
+        return self.pool.reduce(function, values, initial)
+
+    def __check_callable(self, name: str, function):
+        if not hasattr(function, "body"):
+            raise Exception(f"{name}() expects a function as its first argument, got {function}.")
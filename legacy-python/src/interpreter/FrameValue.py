@@ -0,0 +1,33 @@
+from src.interpreter.VectorValue import VectorValue
+
+
+class FrameValue:
+    """
+    A `frame` value of the interpreter: named `VectorValue` columns of one
+    length, in the order they were given.
+
+    Frames share their columns: `column` returns the vector itself and
+    `with_column` a new frame holding the same vectors, so neither copies
+    any elements (values are never mutated in place, so sharing is safe).
+    """
+    def __init__(self, columns: dict[str, VectorValue]) -> None:
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise Exception(f"Frame columns must have the same length, got {', '.join(f'{name}: {len(values)}' for name, values in columns.items())}.")
+        self.columns = columns
+
+    @property
+    def rows(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def column(self, name: str) -> VectorValue:
+        if name not in self.columns:
+            raise Exception(f"Frame has no column '{name}', its columns are {', '.join(self.columns)}.")
+        return self.columns[name]
+
+    def with_column(self, name: str, values: VectorValue) -> "FrameValue":
+        """A new frame with `values` as column `name`, added last or replacing the column of that name."""
+        return FrameValue({**self.columns, name: values})
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(f"{name}: {values}" for name, values in self.columns.items()) + "}"
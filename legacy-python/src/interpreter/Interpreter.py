@@ -1,5 +1,31 @@
-from typing import Any, Dict, List, Optional
-from src.interpreter.Builtins import Builtins
+import operator
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from src.interpreter.Builtins import Builtins, power, remainder
+from src.interpreter.Profiler import Profiler
+from src.interpreter.VectorValue import VectorValue
+from src.output.OutputSink import OutputSink, FileSink
+
+# --------------------------------------------------------------------
+#  Infix Operators
+# --------------------------------------------------------------------
+INFIX_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': remainder,
+    '^': power,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+COMPARISON_OPERATORS = {'==', '!=', '<', '>', '<=', '>='}
+# Operands that infix operators apply to elementwise
+ELEMENTWISE_TYPES = (list, VectorValue)
 # --------------------------------------------------------------------
 #  Environment
 # --------------------------------------------------------------------
@@ -38,12 +64,17 @@ class FunctionObject:
     """
     Represents a user-defined function.
     """
-    def __init__(self, name, parameters, body, return_type, defining_env):
+    def __init__(self, name, parameters, body, return_type, defining_env, node=None):
         self.name = name
         self.parameters = parameters
         self.body = body
         self.return_type = return_type
         self.defining_env = defining_env
+        self.node = node
+
+        # JitTier bookkeeping
+        self.calls = 0
+        self.native = None
 
 # --------------------------------------------------------------------
 #  Interpreter
@@ -52,15 +83,74 @@ class Interpreter:
     """
     A tree-walking interpreter that executes the statements
     and expressions in the AST.
+
+    With `jit_threshold` set, functions called that many times are compiled
+    to native code by a `JitTier`. With a `profiler`, every function entry,
+    call site and branch is recorded for profile-guided compilation.
+
+    `perf_map` (a `PerfMap`) lists the functions the JIT tier compiles for `perf`.
+
+    `par_map` and `par_reduce` run on `par_workers` processes (one per core by
+    default), over chunks of `par_chunk_size` elements (see `WorkerPool`).
+
+    Everything printed goes to `output`, a buffered stdout `FileSink` by
+    default, which is flushed when `interpret` returns or fails.
     """
-    def __init__(self):
+    def __init__(self, jit_threshold: Optional[int] = None, profiler: Optional[Profiler] = None,
+                 output: Optional[OutputSink] = None, perf_map=None,
+                 par_workers: Optional[int] = None, par_chunk_size: Optional[int] = None):
         self.global_env = Environment()
+        # the program being run, which parallel workers load too
+        self.program = None
+        self.profiler = profiler
+        self.output = output if output is not None else FileSink()
+
+        self.jit = None
+        if jit_threshold is not None:
+            from src.interpreter.JitTier import JitTier
+            self.jit = JitTier(self, threshold=jit_threshold, perf_map=perf_map)
 
-        self.builtins = Builtins(self)
+        self.builtins = Builtins(self, par_workers=par_workers, par_chunk_size=par_chunk_size)
         self.builtin_functions = {
             "print": self.builtins.builtin_print,
             "printf": self.builtins.builtin_printf,
-            "sprintf" : self.builtins.builtin_sprintf
+            "sprintf" : self.builtins.builtin_sprintf,
+            "to_str": self.builtins.builtin_to_str,
+            "sum": self.builtins.builtin_sum,
+            "prod": self.builtins.builtin_prod,
+            "min": self.builtins.builtin_min,
+            "max": self.builtins.builtin_max,
+            "mean": self.builtins.builtin_mean,
+            "dot": self.builtins.builtin_dot,
+            "pow": self.builtins.builtin_pow,
+            "sqrt": self.builtins.builtin_sqrt,
+            "log": self.builtins.builtin_log,
+            "exp": self.builtins.builtin_exp,
+            "par_map": self.builtins.builtin_par_map,
+            "par_reduce": self.builtins.builtin_par_reduce,
+            "map": self.builtins.builtin_map,
+            "filter": self.builtins.builtin_filter,
+            "reduce": self.builtins.builtin_reduce,
+            "sort": self.builtins.builtin_sort,
+            "get": self.builtins.builtin_get,
+            "set": self.builtins.builtin_set,
+            "keys": self.builtins.builtin_keys,
+            "values": self.builtins.builtin_values,
+            "union": self.builtins.builtin_union,
+            "intersection": self.builtins.builtin_intersection,
+            "difference": self.builtins.builtin_difference,
+            "contains": self.builtins.builtin_contains,
+            "elements": self.builtins.builtin_elements,
+            "vector": self.builtins.builtin_vector,
+            "frame": self.builtins.builtin_frame,
+            "column": self.builtins.builtin_column,
+            "rows": self.builtins.builtin_rows,
+            "with_column": self.builtins.builtin_with_column,
+        }
+        # pipeline stages that are evaluated lazily, see `visit_PipeExpression`
+        self.lazy_stages = {
+            "map": self.builtins.lazy_map,
+            "filter": self.builtins.lazy_filter,
         }
 
     def interpret(self, program):
@@ -68,20 +158,33 @@ class Interpreter:
         Interprets the provided program, starting from the top-level statements.
         If a 'main' function exists, it invokes it.
         """
-        # Execute all top-level statements
+        try:
+            self.load(program)
+
+            # Check for and invoke the 'main' function
+            if "main" in self.global_env.store:
+                main_func = self.global_env.get("main")
+                if isinstance(main_func, FunctionObject):
+                    return self.call_function(main_func, [])
+                else:
+                    raise Exception("'main' is not callable.")
+            else:
+                raise Exception("No 'main' function defined.")
+        finally:
+            self.builtins.pool.shutdown()
+            if self.jit is not None:
+                self.jit.shutdown()
+            self.output.flush()
+
+    def load(self, program):
+        """
+        Executes the top-level statements of the program, defining its
+        functions in the global environment, without invoking 'main'.
+        """
+        self.program = program
         for stmt in program.statements:
             self.visit(stmt, self.global_env)
 
-        # Check for and invoke the 'main' function
-        if "main" in self.global_env.store:
-            main_func = self.global_env.get("main")
-            if isinstance(main_func, FunctionObject):
-                return self.call_function(main_func, [])
-            else:
-                raise Exception("'main' is not callable.")
-        else:
-            raise Exception("No 'main' function defined.")
-
     # ----------------------------------------------------------------
     #  Node Visitors
     # ----------------------------------------------------------------
@@ -132,7 +235,10 @@ class Interpreter:
 
     def visit_IfStatement(self, node, env: Environment):
         condition = self.visit(node.condition, env)
-        if self.is_truthy(condition):
+        taken = self.is_truthy(condition)
+        if self.profiler is not None:
+            self.profiler.branch(node, taken)
+        if taken:
             return self.visit(node.consenquence, env)
         elif node.alternative is not None:
             return self.visit(node.alternative, env)
@@ -144,9 +250,12 @@ class Interpreter:
             parameters=node.parameters,
             body=node.body,
             return_type=node.return_type,
-            defining_env=env
+            defining_env=env,
+            node=node
         )
         env.set(node.name.value, func_obj)
+        if self.profiler is not None:
+            self.profiler.label(node)
         return func_obj
 
     # ----------------------------------------------------------------
@@ -157,41 +266,37 @@ class Interpreter:
         right = self.visit(node.right_node, env)
         op = node.operator
 
-        if op == '+':
-            return left + right
-        elif op == '-':
-            return left - right
-        elif op == '*':
-            return left * right
-        elif op == '/':
-            return left / right
-        elif op == '==':
-            return left == right
-        elif op == '!=':
-            return left != right
-        elif op == '<':
-            return left < right
-        elif op == '>':
-            return left > right
-        elif op == '<=':
-            return left <= right
-        elif op == '>=':
-            return left >= right
-        else:
+        function = INFIX_OPERATORS.get(op)
+        if function is None:
             raise Exception(f"Unsupported operator: {op}")
 
+        if isinstance(left, ELEMENTWISE_TYPES) or isinstance(right, ELEMENTWISE_TYPES):
+            return self.elementwise(function, op, left, right)
+        return function(left, right)
+
     def visit_CallExpression(self, node, env: Environment):
         func = self.visit(node.function, env)
         args = [self.visit(arg, env) for arg in node.arguments]
+        return self.call(func, args, node)
 
-        # Check if the function is a built-in
-        if isinstance(func, str) and func in self.builtin_functions:
-            return self.builtin_functions[func](*args)
-
-        if isinstance(func, FunctionObject):
-            return self.call_function(func, args)
-
-        raise Exception(f"Not a callable object: {func}")
+    def visit_PipeExpression(self, node, env: Environment):
+        """
+        Evaluates `source |> stage |> ...`. Runs of `map` and `filter` stages
+        chain iterators, so each element goes through every stage before the
+        next one is read and no stage builds a list; `reduce` consumes the
+        chain directly. Any other stage receives a list.
+        """
+        value = self.visit(node.source, env)
+        for stage in node.stages:
+            func = self.visit(stage.function, env)
+            args = [self.visit(arg, env) for arg in stage.arguments]
+            if func in self.lazy_stages:
+                value = self.lazy_stages[func](value, *args)
+                continue
+            if isinstance(value, Iterator) and func != "reduce":
+                value = list(value)
+            value = self.call(func, [value] + args, stage)
+        return list(value) if isinstance(value, Iterator) else value
 
     def visit_IdentifierLiteral(self, node, env: Environment):
         if node.value in self.builtin_functions:
@@ -210,10 +315,62 @@ class Interpreter:
     def visit_ListLiteral(self, node, env: Environment):
         return [self.visit(element, env) for element in node.elements]
 
+    def visit_MapLiteral(self, node, env: Environment):
+        return {self.visit(key, env): self.visit(value, env) for key, value in node.entries}
+
+    def visit_ListComprehension(self, node, env: Environment):
+        """
+        Evaluates `[element for variable in iterable if condition]` in one
+        scope whose variable is rebound per value. Without a condition the
+        result has the iterable's length and is allocated once up front;
+        with one it is appended to, which grows it geometrically.
+        """
+        values = self.visit(node.iterable, env)
+        if isinstance(values, Iterator):
+            values = list(values)
+        if not isinstance(values, ELEMENTWISE_TYPES):
+            raise TypeError(f"Can only iterate over a list or vector, got {type(values).__name__}.")
+
+        scope = Environment(parent=env)
+        if node.condition is None:
+            results = [None] * len(values)
+            for i, value in enumerate(values):
+                scope.set(node.variable, value)
+                results[i] = self.visit(node.element, scope)
+            return results
+
+        results = []
+        for value in values:
+            scope.set(node.variable, value)
+            if self.is_truthy(self.visit(node.condition, scope)):
+                results.append(self.visit(node.element, scope))
+        return results
+
     # ----------------------------------------------------------------
     #  Function Execution
     # ----------------------------------------------------------------
+    def call(self, func, args: List[Any], node):
+        """Calls a builtin (by name) or a user function from the call expression `node`."""
+        # Check if the function is a built-in
+        if isinstance(func, str) and func in self.builtin_functions:
+            return self.builtin_functions[func](*args)
+
+        if isinstance(func, FunctionObject):
+            if self.profiler is not None:
+                self.profiler.call_site(node)
+            return self.call_function(func, args)
+
+        raise Exception(f"Not a callable object: {func}")
+
     def call_function(self, func_obj: FunctionObject, args: List[Any]):
+        if self.profiler is not None:
+            self.profiler.enter(func_obj.name)
+
+        if self.jit is not None:
+            handled, result = self.jit.call(func_obj, args)
+            if handled:
+                return result
+
         new_env = Environment(parent=func_obj.defining_env)
 
         if len(args) != len(func_obj.parameters):
@@ -233,3 +390,40 @@ class Interpreter:
     # ----------------------------------------------------------------
     def is_truthy(self, value: Any) -> bool:
         return bool(value)
+
+    def elementwise(self, function: Callable[[Any, Any], Any], op: str, left: Any, right: Any) -> List[Any] | VectorValue:
+        """
+        Applies an infix operator across lists or vectors, broadcasting a
+        scalar operand. `map` over the operator function keeps the
+        per-element loop in C; with a vector operand its results fill a new
+        vector's buffer directly.
+        """
+        left_is_sequence, right_is_sequence = isinstance(left, ELEMENTWISE_TYPES), isinstance(right, ELEMENTWISE_TYPES)
+        if left_is_sequence and right_is_sequence:
+            if len(left) != len(right):
+                raise Exception(f"List operands of '{op}' must have the same length, got {len(left)} and {len(right)}.")
+            results = map(function, left, right)
+        elif left_is_sequence:
+            results = map(function, left, repeat(right, len(left)))
+        else:
+            results = map(function, repeat(left, len(right)), right)
+
+        if isinstance(left, VectorValue) or isinstance(right, VectorValue):
+            return VectorValue(self.__vector_element(op, left, right), results)
+        return list(results)
+
+    def __vector_element(self, op: str, left: Any, right: Any) -> str:
+        """Element type of a vector result: bools for comparisons, floats for `/` or a float operand."""
+        if op in COMPARISON_OPERATORS:
+            return "bool"
+        if op == "/" or any(self.__has_float(operand) for operand in (left, right)):
+            return "float"
+        return "int"
+
+    @staticmethod
+    def __has_float(operand: Any) -> bool:
+        if isinstance(operand, VectorValue):
+            return operand.element == "float"
+        if isinstance(operand, list):
+            return float in set(map(type, operand))
+        return isinstance(operand, float)
@@ -0,0 +1,205 @@
+import ctypes
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+import llvmlite.binding as llvm
+
+from src.ast.NodeType import NodeType
+from src.ast.statement.FunctionStatement import FunctionStatement
+from src.compiler.CallGraph import called_names
+from src.compiler.IncrementalCompiler import build_functions
+from src.compiler.Optimizer import Optimizer
+from src.compiler.PerfMap import PerfMap
+
+# Types the native tier runs, and how they cross the ctypes boundary by value.
+# Compiled floats are single precision, the interpreter's double, so functions
+# using floats stay interpreted.
+CTYPES: dict[str, type] = {"int": ctypes.c_int32, "bool": ctypes.c_bool}
+
+# Range of a compiled int
+INT_MIN: int = -(1 << 31)
+INT_MAX: int = (1 << 31) - 1
+
+# Node types and operators that mean the same compiled as interpreted, given
+# checked int arithmetic. Anything else (`/`, which gives a float on ints in
+# the interpreter, builtins, lists, strings, ...) keeps a function interpreted.
+TIER_NODES: set[str] = {
+    NodeType.FunctionStatement.value,
+    NodeType.FunctionParameter.value,
+    NodeType.BlockStatement.value,
+    NodeType.ExpressionStatement.value,
+    NodeType.LetStatement.value,
+    NodeType.AssignStatement.value,
+    NodeType.ReturnStatement.value,
+    NodeType.IfStatement.value,
+    NodeType.InfixExpression.value,
+    NodeType.CallExpression.value,
+    NodeType.IdentifierLiteral.value,
+    NodeType.IntegerLiteral.value,
+}
+TIER_OPERATORS: set[str] = {"+", "-", "*", "%", "==", "!=", "<", ">", "<=", ">="}
+
+
+class JitTier:
+    """
+    Second execution tier of the `Interpreter`.
+
+    Every `FunctionObject` starts out interpreted and counts its calls. Once a
+    function crosses `threshold` calls, it is compiled together with the
+    functions it calls through the `Compiler` and MCJIT on a background
+    thread. The interpreter keeps running meanwhile; later calls go to the
+    native code through `ctypes`.
+
+    Tiering up never changes a result. Only functions whose compiled meaning
+    is the interpreter's are compiled: `int` and `bool` values, arithmetic
+    other than `/`, comparisons and calls to such functions (see
+    `TIER_NODES`). Int arithmetic is checked: where an i32 would overflow, or
+    `%` would be by zero, the native call stops with a runtime error and the
+    interpreter runs the call again, exactly (the functions can't print, so
+    running them twice is invisible). Arguments outside the native types, such
+    as ints past 32 bits, are interpreted too.
+
+    Anything the compiler rejects leaves the function interpreted for good.
+
+    With a `perf_map`, every compiled function is listed for `perf`.
+    """
+    def __init__(self, interpreter, threshold: int = 1000, speed_level: int = 2, background: bool = True,
+                 perf_map: PerfMap | None = None) -> None:
+        self.interpreter = interpreter
+        self.threshold = threshold
+        self.speed_level = speed_level
+        self.perf_map = perf_map
+        self.executor: ThreadPoolExecutor | None = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jit") if background else None
+
+        # execution engines must outlive the native functions they hold
+        self.engines: list[llvm.ExecutionEngine] = []
+        self.compilations: dict[str, Future] = {}
+        # function name -> reason it stays interpreted
+        self.unsupported: dict[str, str] = {}
+
+    def call(self, function, args: list[Any]) -> tuple[bool, Any]:
+        """
+        Counts a call to `function` and runs it natively when possible.
+        Returns `(True, result)` if the native code handled the call and
+        `(False, None)` if the interpreter should run it.
+        """
+        function.calls += 1
+
+        if function.native is None:
+            if function.name in self.unsupported:
+                return False, None
+            if function.name not in self.compilations:
+                if function.calls >= self.threshold:
+                    self.__submit(function)
+                return False, None
+            if not self.compilations[function.name].done():
+                return False, None
+            self.__install(function)
+            if function.native is None:
+                return False, None
+
+        if not all(self.__fits(arg, p.value_type) for arg, p in zip(args, function.parameters)):
+            return False, None
+        error = ctypes.c_char_p()
+        result = function.native(*args, ctypes.byref(error))
+        return (False, None) if error.value is not None else (True, result)
+
+    def closure(self, function) -> list[FunctionStatement]:
+        """
+        Returns the statements of `function` and every user function it can
+        reach, in source order. Raises ValueError for functions the native tier
+        can't run the way the interpreter does.
+        """
+        functions = {name: value for name, value in self.interpreter.global_env.store.items() if hasattr(value, "node")}
+
+        reached: set[str] = set()
+        queue: list[str] = [function.name]
+        while len(queue) > 0:
+            name = queue.pop()
+            if name in reached:
+                continue
+            reached.add(name)
+            tree = functions[name].node.json()
+            self.__check(tree, name, functions)
+            queue.extend(callee for callee in called_names(tree) if callee in functions)
+
+        return [value.node for name, value in functions.items() if name in reached]
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+    def __submit(self, function) -> None:
+        try:
+            statements = self.closure(function)
+        except ValueError as e:
+            self.unsupported[function.name] = str(e)
+            return
+
+        if self.executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(self.__compile(function, statements))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self.executor.submit(self.__compile, function, statements)
+        self.compilations[function.name] = future
+
+    def __compile(self, function, statements: list[FunctionStatement]) -> tuple[llvm.ExecutionEngine, Callable]:
+        compiler = build_functions(statements, {}, checked_arithmetic=True)
+        compiler.define_trap(function.name)
+        optimizer = Optimizer(speed_level=self.speed_level)
+        # an engine owns, and disposes of, its target machine, so none is shared
+        engine = llvm.create_mcjit_compiler(optimizer.optimize(compiler.module), optimizer.target_machine)
+        if self.perf_map is not None:
+            self.perf_map.attach(engine)
+        engine.finalize_object()
+        if self.perf_map is not None:
+            self.perf_map.record(engine, statements)
+
+        # the trampoline reports runtime errors (see `Compiler.define_trap`)
+        prototype = ctypes.CFUNCTYPE(CTYPES[function.return_type], *[CTYPES[p.value_type] for p in function.parameters],
+                                     ctypes.POINTER(ctypes.c_char_p))
+        return engine, prototype(engine.get_function_address(f"mylang.trap.{function.name}"))
+
+    def __install(self, function) -> None:
+        future = self.compilations[function.name]
+        if future.exception() is not None:
+            self.unsupported[function.name] = str(future.exception())
+            return
+        engine, native = future.result()
+        self.engines.append(engine)
+        function.native = native
+
+    def __check(self, tree: Any, name: str, functions: dict[str, Any]) -> None:
+        """Raises ValueError if `tree`, from function `name`, could mean something else compiled."""
+        if isinstance(tree, list):
+            for value in tree:
+                self.__check(value, name, functions)
+            return
+        if not isinstance(tree, dict):
+            return
+
+        kind = tree.get("type")
+        if kind not in TIER_NODES:
+            raise ValueError(f"'{name}' uses {kind}")
+        if kind == NodeType.InfixExpression.value and tree["operator"] not in TIER_OPERATORS:
+            raise ValueError(f"'{name}' uses '{tree['operator']}'")
+        if kind == NodeType.CallExpression.value and tree["function"]["value"] not in functions:
+            raise ValueError(f"'{name}' calls '{tree['function']['value']}'")
+        if kind == NodeType.IntegerLiteral.value and not INT_MIN <= tree["value"] <= INT_MAX:
+            raise ValueError(f"'{name}' uses {tree['value']}, past 32 bits")
+        for key in ("value_type", "return_type"):
+            if key in tree and tree[key] not in CTYPES:
+                raise ValueError(f"'{name}' uses {tree[key]}")
+
+        for value in tree.values():
+            self.__check(value, name, functions)
+
+    @staticmethod
+    def __fits(value: Any, type_name: str) -> bool:
+        """Whether `value` crosses into a native `type_name` parameter unchanged."""
+        if type_name == "int":
+            return type(value) is int and INT_MIN <= value <= INT_MAX
+        return type(value) is bool
@@ -0,0 +1,85 @@
+import json
+from collections import Counter
+
+from src.ast.Node import Node
+from src.ast.NodeType import NodeType
+
+
+class Profiler:
+    """
+    Records an interpreter run for profile-guided compilation:
+    - how many times every function was entered,
+    - how many times every call site ran,
+    - how many times every `IfStatement` took its consequence / fell through.
+
+    Call sites and if statements are labelled `function/call0`, `function/if1`
+    and so on, numbering them in source order within their function, so the
+    `Compiler` finds the same labels when it compiles the same source. Sites
+    at the top level of a program have no label and are not recorded, as the
+    `Compiler` only compiles functions.
+    """
+    def __init__(self) -> None:
+        self.functions: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.branches: dict[str, list[int]] = {}
+
+        # id(node) -> label, for every function seen so far
+        self.labels: dict[int, str] = {}
+
+    def enter(self, function_name: str) -> None:
+        self.functions[function_name] += 1
+
+    def call_site(self, node: Node) -> None:
+        label = self.labels.get(id(node))
+        if label is not None:
+            self.calls[label] += 1
+
+    def branch(self, node: Node, taken: bool) -> None:
+        label = self.labels.get(id(node))
+        if label is None:
+            return
+        counts = self.branches.setdefault(label, [0, 0])
+        counts[0 if taken else 1] += 1
+
+    def label(self, function: Node) -> None:
+        self.labels.update(self.sites(function))
+
+    def json(self) -> dict:
+        return {
+            "functions": dict(self.functions),
+            "calls": dict(self.calls),
+            "branches": self.branches,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.json(), f, indent=4)
+
+    @staticmethod
+    def load(path: str) -> dict:
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def sites(function: Node) -> dict[int, str]:
+        """Labels every call expression and if statement inside a `FunctionStatement`, by node id."""
+        labels: dict[int, str] = {}
+        counts: Counter = Counter()
+
+        def walk(value) -> None:
+            if isinstance(value, list):
+                for item in value:
+                    walk(item)
+                return
+            if not isinstance(value, Node):
+                return
+
+            kind = {NodeType.CallExpression: "call", NodeType.IfStatement: "if"}.get(value.type())
+            if kind is not None:
+                labels[id(value)] = f"{function.name.value}/{kind}{counts[kind]}"
+                counts[kind] += 1
+            for child in vars(value).values():
+                walk(child)
+
+        walk(function.body)
+        return labels
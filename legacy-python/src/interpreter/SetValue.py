@@ -0,0 +1,98 @@
+from typing import Any, Iterable
+
+# An int set is stored as a bitset when that takes at most this many bits
+# per element (the size of an element in the sorted array), in both backends
+DENSE_BITS_PER_ELEMENT: int = 32
+
+
+class SetValue:
+    """
+    A `set[T]` value of the interpreter.
+
+    Int sets whose range is dense enough (see `DENSE_BITS_PER_ELEMENT`) are a
+    bitset: bit i of the Python int `bits` is element `base + i`, so `union`,
+    `intersection` and `difference` of two bitsets are single big-int
+    operations, which CPython runs a machine word at a time. Other sets keep
+    their elements as the keys of a dict, a hash set that also remembers
+    insertion order.
+
+    `elements` lists ints in ascending order and strings in insertion order
+    (a union keeps the left set's order, then the right's new elements), as
+    the compiled backend does.
+    """
+    def __init__(self, members: dict | None = None, bits: int | None = None, base: int = 0) -> None:
+        self.members = members
+        self.bits = bits
+        self.base = base
+
+    @staticmethod
+    def of(values: Iterable[Any]) -> "SetValue":
+        members = dict.fromkeys(values)
+        if not members or not all(type(value) is int for value in members):
+            return SetValue(members=members)
+
+        low, high = min(members), max(members)
+        if high - low + 1 > DENSE_BITS_PER_ELEMENT * len(members):
+            return SetValue(members=members)
+        bitmap = bytearray((high - low) // 8 + 1)
+        for value in members:
+            offset = value - low
+            bitmap[offset >> 3] |= 1 << (offset & 7)
+        return SetValue(bits=int.from_bytes(bitmap, "little"), base=low)
+
+    @property
+    def dense(self) -> bool:
+        return self.bits is not None
+
+    def __len__(self) -> int:
+        return self.bits.bit_count() if self.dense else len(self.members)
+
+    def __contains__(self, value: Any) -> bool:
+        if self.dense:
+            return type(value) is int and value >= self.base and (self.bits >> (value - self.base)) & 1 == 1
+        return value in self.members
+
+    def elements(self) -> list:
+        if self.dense:
+            # the bits from lowest to highest, as text, which is read in one pass
+            return [self.base + i for i, bit in enumerate(bin(self.bits)[:1:-1]) if bit == "1"]
+        if self.members and type(next(iter(self.members))) is int:
+            return sorted(self.members)
+        return list(self.members)
+
+    def union(self, other: "SetValue") -> "SetValue":
+        if self.dense and other.dense and self.__spans(other) <= DENSE_BITS_PER_ELEMENT * (len(self) + len(other)):
+            base = min(self.base, other.base)
+            return SetValue(bits=self.__aligned(base) | other.__aligned(base), base=base)
+        return self.__result({**self.__members(), **other.__members()})
+
+    def intersection(self, other: "SetValue") -> "SetValue":
+        if self.dense and other.dense:
+            base = min(self.base, other.base)
+            return SetValue(bits=self.__aligned(base) & other.__aligned(base), base=base)
+        return self.__result({value: None for value in self.__members() if value in other})
+
+    def difference(self, other: "SetValue") -> "SetValue":
+        if self.dense and other.dense:
+            base = min(self.base, other.base)
+            return SetValue(bits=self.__aligned(base) & ~other.__aligned(base), base=base)
+        return self.__result({value: None for value in self.__members() if value not in other})
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(repr(value) for value in self.elements()) + "}"
+
+    def __spans(self, other: "SetValue") -> int:
+        """Bits a bitset holding both sets would take."""
+        low = min(self.base, other.base)
+        return max(self.base + self.bits.bit_length(), other.base + other.bits.bit_length()) - low
+
+    def __aligned(self, base: int) -> int:
+        return self.bits << (self.base - base)
+
+    def __members(self) -> dict:
+        return self.members if not self.dense else dict.fromkeys(self.elements())
+
+    @staticmethod
+    def __result(members: dict) -> "SetValue":
+        # int results go back to a bitset when they are dense enough
+        return SetValue.of(members) if members and type(next(iter(members))) is int else SetValue(members=members)
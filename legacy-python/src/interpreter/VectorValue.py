@@ -0,0 +1,46 @@
+from array import array
+from typing import Any, Iterable
+
+# Element types of a vector and the `array` type code of its buffer
+TYPE_CODES: dict[str, str] = {"int": "q", "float": "d", "bool": "b"}
+
+
+class VectorValue(array):
+    """
+    A `vector[T]` value of the interpreter: one contiguous `array` buffer of
+    int, float or bool elements, instead of a list of Python objects.
+
+    Ints are 64 bit and floats double precision, as the interpreter's own
+    numbers are; `array` has no bool type code, so bools are bytes that read
+    back as 0 and 1. Being a buffer, a vector goes to compiled functions
+    without a copy, and `map` over an operator function runs the column
+    arithmetic in C (see `Interpreter.elementwise`).
+    """
+    __slots__ = ("element",)
+
+    def __new__(cls, element: str, values: Iterable[Any] = ()) -> "VectorValue":
+        if element not in TYPE_CODES:
+            raise Exception(f"Vectors hold int, float or bool elements, got '{element}'.")
+        vector = super().__new__(cls, TYPE_CODES[element], values)
+        vector.element = element
+        return vector
+
+    @staticmethod
+    def of(values: Any) -> "VectorValue":
+        """A vector of `values`, of floats if any is a float, as list literals are typed."""
+        if isinstance(values, VectorValue):
+            return VectorValue(values.element, values)
+        values = list(values)
+        kinds = set(map(type, values))
+        if kinds and kinds <= {bool}:
+            return VectorValue("bool", values)
+        return VectorValue("float" if float in kinds else "int", values)
+
+    def __reduce_ex__(self, protocol: int):
+        # `array` pickles by type code, which this constructor doesn't take
+        return VectorValue, (self.element, self.tolist())
+
+    def __repr__(self) -> str:
+        return repr(list(map(bool, self)) if self.element == "bool" else self.tolist())
+
+    __str__ = __repr__
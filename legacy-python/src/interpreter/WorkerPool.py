@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Any, Callable
+
+from src.output.OutputSink import MemorySink
+
+# Lists are split into this many chunks unless a chunk size is configured, in
+# both backends, so chunk boundaries (and with them how a parallel reduce
+# groups its operands) depend only on the length of the list
+DEFAULT_CHUNKS: int = 64
+
+
+def chunk_size(length: int, configured: int | None = None) -> int:
+    if configured is not None:
+        return configured
+    return max(1, -(-length // DEFAULT_CHUNKS))
+
+
+# Interpreter of a worker process, with the program loaded by `_initialize`
+_interpreter = None
+
+
+def _initialize(program) -> None:
+    global _interpreter
+    # imported here, the Interpreter imports this module through its builtins
+    from src.interpreter.Interpreter import Interpreter
+    _interpreter = Interpreter(output=MemorySink())
+    _interpreter.load(program)
+
+
+def _run_chunk(name: str, task: Callable, values: list[Any]) -> tuple[Any, str]:
+    """Runs `task` over a chunk in a worker, returning its result and what it printed."""
+    _interpreter.output = MemorySink()
+    function = _interpreter.global_env.get(name)
+    return task(_interpreter, function, values), _interpreter.output.getvalue()
+
+
+def map_chunk(interpreter, function, values: list[Any]) -> list[Any]:
+    return [interpreter.call_function(function, [value]) for value in values]
+
+
+def reduce_chunk(interpreter, function, values: list[Any]) -> Any:
+    return reduce(lambda left, right: interpreter.call_function(function, [left, right]), values)
+
+
+class WorkerPool:
+    """
+    Process pool behind the interpreter's `par_map` and `par_reduce`.
+
+    Every worker process loads the program once, when it starts. A list is
+    split into chunks of `chunk_size` elements (see `chunk_size`), each chunk
+    runs in some worker, and results are put back together in chunk order,
+    so they don't depend on which worker ran what. Output printed in the
+    workers is replayed the same way, in chunk order.
+
+    A list that fits in one chunk, or a pool of one worker, runs in the
+    calling interpreter without starting any process.
+    """
+    def __init__(self, interpreter, workers: int | None = None, chunk_size: int | None = None) -> None:
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}.")
+        self.interpreter = interpreter
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.executor: ProcessPoolExecutor | None = None
+
+    def map(self, function, values: list[Any]) -> list[Any]:
+        results: list[Any] = []
+        for chunk in self.__run(map_chunk, function, values):
+            results.extend(chunk)
+        return results
+
+    def reduce(self, function, values: list[Any], initial: Any) -> Any:
+        """Folds the chunks' reductions into `initial`, which equals a serial reduce for associative functions."""
+        return reduce(lambda left, right: self.interpreter.call_function(function, [left, right]),
+                      self.__run(reduce_chunk, function, values), initial)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __run(self, task: Callable, function, values: list[Any]) -> list[Any]:
+        size = chunk_size(len(values), self.chunk_size)
+        chunks = [values[start:start + size] for start in range(0, len(values), size)]
+        if len(chunks) <= 1 or self.workers == 1:
+            return [task(self.interpreter, function, chunk) for chunk in chunks]
+
+        if self.interpreter.global_env.store.get(function.name) is not function:
+            raise Exception(f"Only top-level functions can run in parallel, '{function.name}' is not one.")
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initialize,
+                                                initargs=(self.interpreter.program,))
+
+        results = []
+        futures = [self.executor.submit(_run_chunk, function.name, task, chunk) for chunk in chunks]
+        for future in futures:
+            result, printed = future.result()
+            self.interpreter.output.write_bytes(printed.encode("utf-8"))
+            results.append(result)
+        return results
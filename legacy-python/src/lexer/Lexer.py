@@ -148,6 +148,14 @@ class Lexer:
                     token = self.__new_token(TokenType.ILLEGAL, self.current_char)
 
 
+            case "|":
+                if self.__peek_char() == ">":
+                    character = self.current_char
+                    self.__read_char()
+                    token = self.__new_token(TokenType.PIPE, character + self.current_char)
+                else:
+                    token = self.__new_token(TokenType.ILLEGAL, self.current_char)
+
             case ";":
                 token = self.__new_token(TokenType.SEMICOLON, self.current_char)
             case "(":
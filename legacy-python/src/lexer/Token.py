@@ -24,6 +24,8 @@ KEYWORDS: dict[str, TokenType] = {
     "return": TokenType.RETURN,
     "if"    : TokenType.IF, 
     "else"    : TokenType.ELSE,     
+    "for"    : TokenType.FOR,
+    "in"    : TokenType.IN,
     "true"    : TokenType.TRUE, 
     "false"    : TokenType.FALSE,         
 }
@@ -32,9 +34,19 @@ TYPE_KEYWORDS: list[str] = [
     "str",
     "int",
     "float",
+    "bool",
     "list"
 ]
 
+# Types that are also builtin names (`map(xs, f)`, `set(xs)`, `vector(xs)`),
+# so they are lexed as identifiers and only read as types where a type is expected
+TYPE_IDENTIFIERS: list[str] = [
+    "map",
+    "set",
+    "vector",
+    "frame"
+]
+
 def lookup_identifier(identifier:str) -> TokenType:
     tokenType: TokenType | None = KEYWORDS.get(identifier)
     if tokenType is not None:
@@ -20,6 +20,9 @@ class TokenType(Enum):
     POW = "POW"
     MODULUS = "MODULUS"
 
+    # PIPELINES
+    PIPE = "PIPE" # |>
+
     # ASSIGNMENT
     EQ = "EQ"
 
@@ -54,6 +57,8 @@ class TokenType(Enum):
 
     IF = "IF"
     ELSE = "ELSE"
+    FOR = "FOR"
+    IN = "IN"
     TRUE = "TRUE"
     FALSE = "FALSE"
 
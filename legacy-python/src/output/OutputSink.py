@@ -0,0 +1,93 @@
+import sys
+from typing import BinaryIO, TextIO
+
+# Flush policies, with the numbers the compiled runtime uses (`mylang_output_configure`)
+#   size: write when the buffer is full
+#   line: write after every line
+#   exit: write only on flush, at exit or on error, the buffer grows as needed
+FLUSH_POLICIES: dict[str, int] = {"size": 0, "line": 1, "exit": 2}
+
+DEFAULT_BUFFER_SIZE: int = 1 << 16
+
+
+class OutputSink:
+    """
+    Buffered destination for everything a program prints.
+
+    Text is encoded into one byte buffer and handed to `write_out` according
+    to the flush policy. Without a policy, terminals get "line" and anything
+    else "size", like C's stdio. `flush` must be called when the program
+    ends, which the `Interpreter` does even when it fails.
+    """
+    def __init__(self, policy: str | None = None, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        if policy is None:
+            policy = "line" if self.is_terminal() else "size"
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{policy}', expected one of {', '.join(FLUSH_POLICIES)}.")
+        self.policy = policy
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+
+    def write_line(self, text: str) -> None:
+        self.buffer += text.encode("utf-8")
+        self.buffer += b"\n"
+        if self.policy == "line" or (self.policy == "size" and len(self.buffer) >= self.buffer_size):
+            self.flush()
+
+    def write_bytes(self, data: bytes) -> None:
+        """
+        Bulk binary path: `data` is written as is. Unless the policy is exit,
+        data larger than the buffer is handed to `write_out` without a copy.
+        """
+        if self.policy != "exit" and len(data) >= self.buffer_size:
+            self.flush()
+            self.write_out(data)
+            return
+        self.buffer += data
+        if self.policy == "size" and len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.buffer) > 0:
+            self.write_out(bytes(self.buffer))
+            self.buffer.clear()
+
+    def is_terminal(self) -> bool:
+        return False
+
+    def write_out(self, data: bytes) -> None:
+        """Override this in subclasses to write a flushed chunk."""
+        raise NotImplementedError("Output sink must implement 'write_out'.")
+
+
+class FileSink(OutputSink):
+    """Writes to a file, stdout by default. Text streams are written through their binary buffer."""
+    def __init__(self, file: TextIO | BinaryIO | None = None, policy: str | None = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self.file = sys.stdout if file is None else file
+        self.stream: BinaryIO = getattr(self.file, "buffer", self.file)
+        super().__init__(policy, buffer_size)
+
+    def is_terminal(self) -> bool:
+        return hasattr(self.file, "isatty") and self.file.isatty()
+
+    def write_out(self, data: bytes) -> None:
+        # Anything written to a text stream directly goes first
+        if self.stream is not self.file:
+            self.file.flush()
+        self.stream.write(data)
+        self.stream.flush()
+
+
+class MemorySink(OutputSink):
+    """Keeps the output in memory, for embedding and tests. Everything is kept until `getvalue`."""
+    def __init__(self, policy: str | None = "exit", buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(policy, buffer_size)
+        self.written = bytearray()
+
+    def write_out(self, data: bytes) -> None:
+        self.written += data
+
+    def getvalue(self) -> str:
+        self.flush()
+        return self.written.decode("utf-8")
@@ -1,7 +1,7 @@
 from typing import Callable 
 
 from src.lexer.Lexer import Lexer 
-from src.lexer.Token import Token, TokenType 
+from src.lexer.Token import Token, TokenType, TYPE_IDENTIFIERS
 from src.parser.Precedences import PrecedenceType, PRECEDENCES
 
 from src.ast.Program import Program
@@ -17,6 +17,8 @@ from src.ast.statement.IfStatement import IfStatement
 from src.ast.statement.FunctionParameter import FunctionParameter
 from src.ast.expression.CallExpression import CallExpression
 from src.ast.expression.InfixExpression import InfixExpression
+from src.ast.expression.PipeExpression import PipeExpression
+from src.ast.expression.ListComprehension import ListComprehension
 from src.ast.expression.Expression import Expression
 from src.ast.expression.literal.IntegerLiteral import IntegerLiteral
 from src.ast.expression.literal.FloatLiteral import FloatLiteral
@@ -24,6 +26,7 @@ from src.ast.expression.literal.IdentifierLiteral import IdentifierLiteral
 from src.ast.expression.literal.BooleanLiteral import BooleanLiteral
 from src.ast.expression.literal.StringLiteral import StringLiteral
 from src.ast.expression.literal.ListLiteral import ListLiteral
+from src.ast.expression.literal.MapLiteral import MapLiteral
 
 class Parser:
     def __init__(self, lexer: Lexer) -> None:
@@ -59,6 +62,7 @@ class Parser:
             TokenType.LT_EQ: self.__parse_infix_expression,                                                
             TokenType.GT_EQ: self.__parse_infix_expression,
             TokenType.LPAREN: self.__parse_call_expression,
+            TokenType.PIPE: self.__parse_pipe_expression,
         }
 
         self.__next_token()
@@ -82,6 +86,12 @@ class Parser:
             self.__peek_error(tokenType)
             return False
 
+    def __expect_peek_type(self) -> bool:
+        if self.__peek_token_is(TokenType.IDENTIFIER) and self.peek_token.literal in TYPE_IDENTIFIERS:
+            self.__next_token()
+            return True
+        return self.__expect_peek(TokenType.TYPE)
+
     def __current_precedence(self) -> PrecedenceType:
         precedence: int | None = PRECEDENCES.get(self.current_token.type)
         if precedence is None:
@@ -110,6 +120,13 @@ class Parser:
         return program
 
     def __parse_statement(self) -> Statement:
+        line_no: int = self.current_token.line_no
+        statement: Statement = self.__parse_statement_kind()
+        if statement is not None:
+            statement.line_no = line_no
+        return statement
+
+    def __parse_statement_kind(self) -> Statement:
         if self.current_token.type == TokenType.IDENTIFIER and self.__peek_token_is(TokenType.EQ):
             return self.__parse_assignment_statement()
         match self.current_token.type:
@@ -137,9 +154,9 @@ class Parser:
         statement.name = IdentifierLiteral(value=self.current_token.literal)
         if not self.__expect_peek(TokenType.COLON):
             return None
-        if not self.__expect_peek(TokenType.TYPE):
+        if not self.__expect_peek_type():
             return None
-        statement.value_type = self.current_token.literal
+        statement.value_type = self.__parse_type()
         if not self.__expect_peek(TokenType.EQ):
             return None
         self.__next_token()
@@ -158,9 +175,9 @@ class Parser:
         statement.parameters = self.__parse_function_parameters()
         if not self.__expect_peek(TokenType.ARROW):
             return None
-        if not self.__expect_peek(TokenType.TYPE):
+        if not self.__expect_peek_type():
             return None
-        statement.return_type = self.current_token.literal
+        statement.return_type = self.__parse_type()
         if not self.__expect_peek(TokenType.LBRACE):
             return None
         statement.body = self.__parse_block_statement()
@@ -176,7 +193,7 @@ class Parser:
         if not self.__expect_peek(TokenType.COLON):
             return None
         self.__next_token()
-        first_parameter.value_type = self.current_token.literal
+        first_parameter.value_type = self.__parse_type()
         parameters.append(first_parameter)
         while self.__peek_token_is(TokenType.COMMA):
             self.__next_token()
@@ -185,12 +202,57 @@ class Parser:
             if not self.__expect_peek(TokenType.COLON):
                 return None
             self.__next_token()
-            parameter.value_type = self.current_token.literal
+            parameter.value_type = self.__parse_type()
             parameters.append(parameter)
         if not self.__expect_peek(TokenType.RPAREN):
             return None
         return parameters
 
+    def __parse_type(self) -> str:
+        """
+        Reads the type at the current token: a type name, `list[T]` for a
+        typed list, `vector[T]` for a column of T, `set[T]` for a set,
+        `map[K, V]` for a map from K to V, or `frame[a: T, b: U, ...]` for a
+        frame with columns `a` of T, `b` of U, and so on.
+        """
+        name: str = self.current_token.literal
+        if name in ("list", "vector", "set") and self.__peek_token_is(TokenType.LBRACKET):
+            self.__next_token()
+            self.__next_token()
+            element: str = self.__parse_type()
+            if not self.__expect_peek(TokenType.RBRACKET):
+                return name
+            return f"{name}[{element}]"
+        if name == "map" and self.__peek_token_is(TokenType.LBRACKET):
+            self.__next_token()
+            self.__next_token()
+            key: str = self.__parse_type()
+            if not self.__expect_peek(TokenType.COMMA):
+                return name
+            self.__next_token()
+            value: str = self.__parse_type()
+            if not self.__expect_peek(TokenType.RBRACKET):
+                return name
+            return f"map[{key}, {value}]"
+        if name == "frame" and self.__peek_token_is(TokenType.LBRACKET):
+            self.__next_token()
+            columns: list[str] = []
+            while True:
+                if not self.__expect_peek(TokenType.IDENTIFIER):
+                    return name
+                column: str = self.current_token.literal
+                if not self.__expect_peek(TokenType.COLON):
+                    return name
+                self.__next_token()
+                columns.append(f"{column}: {self.__parse_type()}")
+                if not self.__peek_token_is(TokenType.COMMA):
+                    break
+                self.__next_token()
+            if not self.__expect_peek(TokenType.RBRACKET):
+                return name
+            return f"frame[{', '.join(columns)}]"
+        return name
+
     def __parse_return_statement(self) -> ReturnStatement:
         statement: ReturnStatement = ReturnStatement()
         self.__next_token()
@@ -255,6 +317,22 @@ class Parser:
         infix_expression.right_node = self.__parse_expression(precedence)
         return infix_expression
 
+    def __parse_pipe_expression(self, source: Expression) -> Expression:
+        self.__next_token()
+        stage: Expression = self.__parse_expression(PrecedenceType.P_PIPE)
+        # `xs |> f` is short for `xs |> f()`
+        if isinstance(stage, IdentifierLiteral):
+            stage = CallExpression(function=stage, arguments=[])
+        if not isinstance(stage, CallExpression):
+            self.errors.append("Expected a function call after |>")
+            return None
+
+        # stages are left associative, `a |> f() |> g()` is one pipeline
+        if isinstance(source, PipeExpression):
+            source.stages.append(stage)
+            return source
+        return PipeExpression(source=source, stages=[stage])
+
     def __parse_grouped_expression(self) -> Expression:
         self.__next_token()
         expression: Expression = self.__parse_expression(PrecedenceType.P_LOWEST)
@@ -310,11 +388,20 @@ class Parser:
         value = self.current_token.literal
         return StringLiteral(value=value)
 
-    def __parse_list_literal(self) -> ListLiteral:
+    def __parse_list_literal(self) -> ListLiteral | ListComprehension | MapLiteral:
         elements = []
         self.__next_token()
+        # `[:]` is the empty map
+        if self.__curent_token_is(TokenType.COLON):
+            if not self.__expect_peek(TokenType.RBRACKET):
+                return None
+            return MapLiteral(entries=[])
         if not self.__curent_token_is(TokenType.RBRACKET):
             elements.append(self.__parse_expression(PrecedenceType.P_LOWEST))
+            if self.__peek_token_is(TokenType.FOR):
+                return self.__parse_list_comprehension(elements[0])
+            if self.__peek_token_is(TokenType.COLON):
+                return self.__parse_map_literal(elements[0])
             while self.__peek_token_is(TokenType.COMMA):
                 self.__next_token()
                 self.__next_token()
@@ -322,3 +409,39 @@ class Parser:
         if not self.__expect_peek(TokenType.RBRACKET):
             return None
         return ListLiteral(elements=elements)
+
+    def __parse_map_literal(self, first_key: Expression) -> MapLiteral:
+        entries: list[tuple[Expression, Expression]] = []
+        key: Expression = first_key
+        while True:
+            if not self.__expect_peek(TokenType.COLON):
+                return None
+            self.__next_token()
+            entries.append((key, self.__parse_expression(PrecedenceType.P_LOWEST)))
+            if not self.__peek_token_is(TokenType.COMMA):
+                break
+            self.__next_token()
+            self.__next_token()
+            key = self.__parse_expression(PrecedenceType.P_LOWEST)
+        if not self.__expect_peek(TokenType.RBRACKET):
+            return None
+        return MapLiteral(entries=entries)
+
+    def __parse_list_comprehension(self, element: Expression) -> ListComprehension:
+        comprehension: ListComprehension = ListComprehension(element=element)
+        self.__next_token()
+        if not self.__expect_peek(TokenType.IDENTIFIER):
+            return None
+        comprehension.variable = self.current_token.literal
+        if not self.__expect_peek(TokenType.IN):
+            return None
+        self.__next_token()
+        comprehension.iterable = self.__parse_expression(PrecedenceType.P_LOWEST)
+        # parsed here, a leading `if` would otherwise start an if statement
+        if self.__peek_token_is(TokenType.IF):
+            self.__next_token()
+            self.__next_token()
+            comprehension.condition = self.__parse_expression(PrecedenceType.P_LOWEST)
+        if not self.__expect_peek(TokenType.RBRACKET):
+            return None
+        return comprehension
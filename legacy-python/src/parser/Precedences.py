@@ -6,6 +6,7 @@ class PrecedenceType(Enum):
 
     # auto increments based on order of my code (allows to re-arrange stuff later)
     P_LOWEST: int = 0
+    P_PIPE = auto()
     P_EQUALS = auto()
     P_LESSSGREATER = auto()
     P_SUM = auto()
@@ -32,4 +33,6 @@ PRECEDENCES: dict[TokenType, PrecedenceType] = {
     TokenType.GT_EQ : PrecedenceType.P_LESSSGREATER,    
 
     TokenType.LPAREN : PrecedenceType.P_CALL,
+
+    TokenType.PIPE : PrecedenceType.P_PIPE,
 }